@@ -2,6 +2,8 @@
 ASGI config for eylercore project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The live task board streams (main_app.live) need it: under WSGI each open
+stream would hold a worker thread for as long as the page stays open.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
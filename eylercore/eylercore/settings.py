@@ -41,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main_app.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,7 +55,7 @@ ROOT_URLCONF = 'eylercore.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'main_app.instrumentation.TemplateBackend',
         'DIRS': [
             os.path.join(BASE_DIR, 'templates'),
         ],
@@ -76,14 +77,89 @@ WSGI_APPLICATION = 'eylercore.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# WAL lets readers run alongside the single writer, and IMMEDIATE transactions
+# take the write lock up front instead of failing with "database is locked"
+# when a read transaction tries to upgrade.
+#
+# Connections are kept for a minute, which saves WSGI worker threads from
+# rerunning the pragmas on every request. Under ASGI each request's ORM calls
+# run on a thread of their own, so its connection is never reused and is
+# closed when that thread ends. On SQLite that is only a file handle, with no
+# server-side connection limit to run out of, so the setting is harmless there.
+# A server database under ASGI should set CONN_MAX_AGE to 0 and pool instead.
+SQLITE_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-64000',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA temp_store=MEMORY',
+]
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': '; '.join(SQLITE_PRAGMAS),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Rendered fragments are keyed by object versions, so any backend shared by all
+# workers (Redis, Memcached, database) can replace locmem in production.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'eylercore',
+    }
+}
+
+FRAGMENT_CACHE_TIMEOUT = 600
+
+# Per-view query counts and latency percentiles, reported at /perf/stats/ and
+# in Server-Timing headers. The header goes to every client, so this is only on
+# in development; run_benchmark turns it on for its own run.
+
+REQUEST_METRICS = DEBUG
+REQUEST_METRICS_WINDOW = 500
+
+# Deleting a project removes its tasks in batches of PROJECT_PURGE_BATCH_SIZE,
+# one transaction each. With PROJECT_SOFT_DELETE the project is hidden at once
+# and the purge is queued for run_workers instead of running in the request.
+
+PROJECT_SOFT_DELETE = False
+PROJECT_PURGE_BATCH_SIZE = 1000
+
+# Background jobs (manage.py run_workers). A failed job is retried after
+# JOB_RETRY_DELAY seconds, doubling each time; a running job that hasn't
+# reported progress for JOB_LOCK_TIMEOUT seconds is assumed dead and requeued.
+# Export results and pending imports are kept in MEDIA_ROOT/jobs/.
+
+JOB_RETRY_DELAY = 10
+JOB_LOCK_TIMEOUT = 600
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Live task boards stream from /projects/<id>/events/ when served over ASGI
+# (eylercore.asgi). The default broker only reaches clients of the same
+# process; point LIVE_EVENTS_BROKER at a shared one when running several.
+# LIVE_EVENTS_BACKLOG events are kept for clients resuming with Last-Event-ID.
+
+LIVE_EVENTS_BROKER = 'main_app.live.LocalBroker'
+LIVE_EVENTS_BACKLOG = 500
+
+# Task activity older than this is deleted by manage.py prune_activity.
+
+ACTIVITY_RETENTION_DAYS = 365
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,193 @@
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, Max, Min, Q
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+from .models import ACTIVITY_FIELDS, Project, Task, TaskActivity
+
+# The task activity log.
+#
+# Every entry holds only what changed: the new status in its own column, and
+# any other changed fields in a small JSON object keyed by field name. Tag
+# changes are lists of tag ids under 'tags_added' and 'tags_removed'. Signals
+# log single saves; bulk edits and imports build their entries in one pass
+# and write them with one batched INSERT.
+#
+# Cycle time and throughput are single aggregate queries over the
+# (project, created_at) index. Entries older than ACTIVITY_RETENTION_DAYS are
+# removed by manage.py prune_activity, in batches per project.
+
+BATCH_SIZE = 500
+# Descriptions can be long, so the log only notes that one changed.
+SUMMARISED_FIELDS = {'description'}
+
+
+def field_name(attname):
+    return attname[:-3] if attname.endswith('_id') else attname
+
+
+def entry(task, kind, changes=None, created_at=None):
+    changes = dict(changes or {})
+    fields = {'created_at': created_at} if created_at else {}
+    return TaskActivity(
+        project_id=task.project_id, task_id=task.id, kind=kind,
+        status=changes.pop('status', ''), changes=changes, **fields
+    )
+
+
+def compact(values):
+    return {
+        field_name(name): True if name in SUMMARISED_FIELDS else value
+        for name, value in values.items()
+    }
+
+
+def diff(old, new):
+    """The fields of new that differ from old, in log form."""
+    return compact({name: value for name, value in new.items() if name in old and old[name] != value})
+
+
+def created(task, tag_ids=()):
+    values = compact({
+        name: value for name, value in task.activity_state().items()
+        if name != 'project_id' and value not in (None, '')
+    })
+    if tag_ids:
+        values['tags_added'] = sorted(tag_ids)
+    return entry(task, TaskActivity.CREATED, values)
+
+
+def updated(task, old, update_fields=None):
+    new = task.activity_state()
+    if update_fields is not None:
+        new = {name: value for name, value in new.items() if field_name(name) in update_fields or name in update_fields}
+    if old is None:
+        # Saved without a loaded copy, so every written field is recorded.
+        return entry(task, TaskActivity.UPDATED, compact(new))
+    changes = diff(old, new)
+    return entry(task, TaskActivity.UPDATED, changes) if changes else None
+
+
+def deleted(task):
+    return entry(task, TaskActivity.DELETED)
+
+
+def tags_changed(task, added=(), removed=()):
+    changes = {}
+    if added:
+        changes['tags_added'] = sorted(added)
+    if removed:
+        changes['tags_removed'] = sorted(removed)
+    return entry(task, TaskActivity.UPDATED, changes)
+
+
+def tag_changed_on(task_ids, tag_id, added):
+    """One entry per task, for a tag added to or removed from many at once."""
+    key = 'tags_added' if added else 'tags_removed'
+    return [
+        TaskActivity(project_id=project_id, task_id=task_id, kind=TaskActivity.UPDATED, changes={key: [tag_id]})
+        for task_id, project_id in Task.objects.filter(id__in=task_ids).values_list('id', 'project_id')
+    ]
+
+
+def bulk_entries(task_ids, changes, add_tags=(), remove_tags=(), now=None):
+    """
+    Entries for bulk_update_tasks, built before it writes: one query for the
+    current values and one for the tag links, then only real changes are kept.
+    """
+    now = now or timezone.now()
+    fields = [name for name in ACTIVITY_FIELDS if field_name(name) in changes]
+    through = Task.tags.through
+    linked = set(through.objects.filter(
+        task_id__in=task_ids, tag_id__in=[*add_tags, *remove_tags]
+    ).values_list('task_id', 'tag_id'))
+    entries = []
+    for task in Task.objects.filter(id__in=task_ids).only('project', *map(field_name, fields)):
+        new = {name: changes[field_name(name)] for name in fields}
+        if 'assigned_to_id' in new and new['assigned_to_id'] is not None:
+            new['assigned_to_id'] = getattr(new['assigned_to_id'], 'id', new['assigned_to_id'])
+        values = diff(task.activity_state(task.get_deferred_fields()), new)
+        added = [tag_id for tag_id in add_tags if (task.id, tag_id) not in linked]
+        removed = [tag_id for tag_id in remove_tags if (task.id, tag_id) in linked]
+        if added:
+            values['tags_added'] = sorted(added)
+        if removed:
+            values['tags_removed'] = sorted(removed)
+        if values:
+            entries.append(entry(task, TaskActivity.UPDATED, values, created_at=now))
+    return entries
+
+
+def log(entries):
+    entries = [item for item in entries if item is not None]
+    if entries:
+        TaskActivity.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+    return len(entries)
+
+
+# Reports
+
+def date_range(start, end):
+    """Start of the first day to start of the day after the last, in local time."""
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start, time.min), tz),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz),
+    )
+
+
+def cycle_time(project_id, start, end):
+    """
+    How long tasks finished between start and end (dates, inclusive) took,
+    from their first move to in progress (or their first entry, if they
+    never stopped there) to their last move to done in the range.
+    """
+    since, until = date_range(start, end)
+    finished = TaskActivity.objects.filter(
+        project_id=project_id, status='done', created_at__gte=since, created_at__lt=until
+    )
+    per_task = TaskActivity.objects.filter(
+        project_id=project_id, created_at__lt=until, task_id__in=finished.values('task_id')
+    ).values('task_id').annotate(
+        started=Coalesce(Min('created_at', filter=Q(status='in_progress')), Min('created_at')),
+        finished=Max('created_at', filter=Q(status='done', created_at__gte=since)),
+    )
+    duration = F('finished') - F('started')
+    return per_task.aggregate(
+        tasks=Count('task_id'), average=Avg(duration), shortest=Min(duration), longest=Max(duration)
+    )
+
+
+def throughput(project_id, start, end):
+    """Tasks moved to done per day, for every day from start to end."""
+    since, until = date_range(start, end)
+    counts = dict(TaskActivity.objects.filter(
+        project_id=project_id, status='done', created_at__gte=since, created_at__lt=until
+    ).annotate(day=TruncDate('created_at')).values('day').annotate(
+        done=Count('task_id', distinct=True)
+    ).order_by().values_list('day', 'done'))
+    days = (end - start).days + 1
+    return [{'day': day, 'done': counts.get(day, 0)} for day in (start + timedelta(days=n) for n in range(days))]
+
+
+# Retention
+
+def retention_days():
+    return getattr(settings, 'ACTIVITY_RETENTION_DAYS', 365)
+
+
+def prune(before=None, size=None):
+    """Delete entries older than before, a project and a batch at a time."""
+    before = before or timezone.now() - timedelta(days=retention_days())
+    size = size or BATCH_SIZE
+    removed = 0
+    for project_id in Project.all_objects.order_by('id').values_list('id', flat=True):
+        old = TaskActivity.objects.filter(project_id=project_id, created_at__lt=before)
+        while True:
+            ids = list(old.values_list('id', flat=True)[:size])
+            if not ids:
+                break
+            with transaction.atomic():
+                removed += TaskActivity.objects.filter(id__in=ids)._raw_delete(TaskActivity.objects.db)
+    return removed
@@ -1,18 +1,29 @@
 from django.contrib import admin
+from . import search
 from .models import Project, Task, Tag
 
+class FullTextSearchMixin:
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return queryset.filter(id__in=search.matching_ids(self.model._meta.model_name, search_term)), False
+
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ['name', 'user', 'created_at']
     list_filter = ['created_at', 'user']
     search_fields = ['name', 'description']
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ['title', 'project', 'status', 'priority', 'due_date']
     list_filter = ['status', 'priority', 'created_at']
     search_fields = ['title', 'description']
     filter_horizontal = ['tags']
+    list_select_related = ['project']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).for_listing()
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
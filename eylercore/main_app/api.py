@@ -0,0 +1,366 @@
+from datetime import date, timedelta
+from operator import attrgetter
+from django.db.models import Count, Max, Prefetch
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+from . import activity, fragment_cache, inbox
+from .conditional import make_etag, private_condition
+from .decorators import api_login_required
+from .models import Project, ProjectStats, Tag, Task
+from .pagination import paginate_keyset
+
+# Read-only JSON API over projects, tasks and tags.
+#
+# ?fields=a,b picks the fields of each object; only the columns, joins and
+# prefetches those fields need are queried. Lists are keyset-paginated with an
+# opaque ?cursor= and ?limit=. Every GET answers If-None-Match (and, for single
+# objects, If-Modified-Since) from one aggregate query before loading anything.
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+REPORT_DAYS = 30
+MAX_REPORT_DAYS = 366
+
+
+class Field:
+    def __init__(self, value, columns=(), select_related=None, prefetch=None):
+        self.value = value
+        self.columns = columns
+        self.select_related = select_related
+        self.prefetch = prefetch
+
+
+def column(name):
+    return Field(attrgetter(name), columns=[name])
+
+
+class Resource:
+    def __init__(self, fields, keys, prepare=None):
+        self.fields = fields
+        self.keys = keys
+        self.prepare = prepare
+
+    def parse_fields(self, request):
+        requested = request.GET.get('fields')
+        if not requested:
+            return list(self.fields)
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(self.fields)}")
+        return names
+
+    def queryset(self, queryset, names):
+        columns = {'id'} | {name for name, _ in self.keys}
+        for name in names:
+            field = self.fields[name]
+            columns.update(field.columns)
+            if field.select_related:
+                queryset = queryset.select_related(field.select_related)
+            if field.prefetch:
+                queryset = queryset.prefetch_related(field.prefetch)
+        return queryset.only(*columns)
+
+    def serialize(self, objects, names):
+        if self.prepare:
+            self.prepare(objects, names)
+        return [{name: self.fields[name].value(obj) for name in names} for obj in objects]
+
+
+def project_stats(project):
+    return {field: getattr(project.stats, field) for field in STATS_FIELDS}
+
+
+def refresh_stats(projects, names):
+    if 'stats' in names:
+        ProjectStats.ensure_fresh(projects)
+
+
+def assignee(task):
+    if task.assigned_to_id is None:
+        return None
+    return {'id': task.assigned_to.id, 'username': task.assigned_to.username}
+
+
+def task_tags(task):
+    return [{'id': tag.id, 'name': tag.name, 'color': tag.color} for tag in task.tags.all()]
+
+
+STATS_FIELDS = ProjectStats.COUNTER_FIELDS + ['next_due_date', 'last_activity_at', 'overdue_as_of']
+
+PROJECTS = Resource({
+    'id': column('id'),
+    'name': column('name'),
+    'description': column('description'),
+    'created_at': column('created_at'),
+    'updated_at': column('updated_at'),
+    'stats': Field(
+        project_stats, columns=[f'stats__{field}' for field in STATS_FIELDS], select_related='stats'
+    ),
+}, keys=[('created_at', True), ('id', True)], prepare=refresh_stats)
+
+TASKS = Resource({
+    'id': column('id'),
+    'project_id': Field(attrgetter('project_id'), columns=['project']),
+    'title': column('title'),
+    'description': column('description'),
+    'status': column('status'),
+    'priority': column('priority'),
+    'due_date': column('due_date'),
+    'assigned_to': Field(
+        assignee, columns=['assigned_to__id', 'assigned_to__username'], select_related='assigned_to'
+    ),
+    'tags': Field(task_tags, prefetch=Prefetch('tags', queryset=Tag.objects.only('id', 'name', 'color'))),
+    'created_at': column('created_at'),
+    'updated_at': column('updated_at'),
+}, keys=Task.LISTING_KEYS)
+
+TAGS = Resource({
+    'id': column('id'),
+    'name': column('name'),
+    'color': column('color'),
+    'created_at': column('created_at'),
+    'updated_at': column('updated_at'),
+}, keys=[('name', False), ('id', False)])
+
+
+INBOX_TASKS = Resource({
+    'id': column('id'),
+    'project_id': Field(attrgetter('project_id'), columns=['project']),
+    'project_name': Field(attrgetter('project.name'), columns=['project__name'], select_related='project'),
+    'title': column('title'),
+    'status': column('status'),
+    'priority': column('priority'),
+    'due_date': column('due_date'),
+}, keys=inbox.LISTING_KEYS)
+
+
+def page_size(request):
+    try:
+        limit = int(request.GET.get('limit', PAGE_SIZE))
+    except ValueError:
+        raise ValueError('limit must be a number')
+    return min(max(limit, 1), MAX_PAGE_SIZE)
+
+
+def report_range(request):
+    """start and end dates from the query string; the last REPORT_DAYS days by default."""
+    try:
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else timezone.localdate()
+        start = (
+            date.fromisoformat(request.GET['start']) if request.GET.get('start')
+            else end - timedelta(days=REPORT_DAYS - 1)
+        )
+    except ValueError:
+        raise ValueError('start and end must be dates (YYYY-MM-DD)')
+    if start > end:
+        raise ValueError('start must not be after end')
+    if (end - start).days >= MAX_REPORT_DAYS:
+        raise ValueError(f'A report covers at most {MAX_REPORT_DAYS} days')
+    return start, end
+
+
+def seconds(duration):
+    return None if duration is None else round(duration.total_seconds())
+
+
+def list_response(request, resource, queryset):
+    try:
+        names = resource.parse_fields(request)
+        limit = page_size(request)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    items, next_cursor = paginate_keyset(
+        resource.queryset(queryset, names), resource.keys, request.GET.get('cursor'), limit
+    )
+    next_url = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+    return JsonResponse({'results': resource.serialize(items, names), 'next': next_url})
+
+
+def detail_response(request, resource, queryset):
+    try:
+        names = resource.parse_fields(request)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    obj = resource.queryset(queryset, names).first()
+    if obj is None:
+        return JsonResponse({'error': 'Not found.'}, status=404)
+    return JsonResponse(resource.serialize([obj], names)[0])
+
+
+# Validators: one query each, None when the object isn't the user's.
+
+def latest(*values):
+    values = [value for value in values if value]
+    return max(values) if values else None
+
+
+def project_list_validators(request):
+    found = Project.objects.filter(user=request.user).aggregate(
+        count=Count('id'), updated=Max('updated_at'), activity=Max('stats__last_activity_at')
+    )
+    # The date is there because overdue counts roll over at midnight.
+    return make_etag(request.user.id, request.get_full_path(), timezone.localdate(), *found.values()), None
+
+
+def project_validators(request, project_id):
+    found = Project.objects.filter(id=project_id, user=request.user).aggregate(
+        count=Count('id'), updated=Max('updated_at'), activity=Max('stats__last_activity_at')
+    )
+    if not found['count']:
+        return None
+    etag = make_etag(request.user.id, request.get_full_path(), timezone.localdate(), *found.values())
+    return etag, latest(found['updated'], found['activity'])
+
+
+def task_list_validators(request, project_id):
+    # Every task change moves the project's last activity and fragment version,
+    # so the list is validated off those and the tag catalogue's version rather
+    # than by aggregating over its tasks and their tags.
+    found = Project.objects.filter(id=project_id, user=request.user).values(
+        'updated_at', 'stats__last_activity_at'
+    ).first()
+    if found is None:
+        return None
+    project_version = fragment_cache.versions('project', [project_id])[project_id]
+    tags_version = fragment_cache.versions('tags')[None]
+    etag = make_etag(request.user.id, request.get_full_path(), project_version, tags_version, *found.values())
+    return etag, latest(
+        found['updated_at'], found['stats__last_activity_at'],
+        fragment_cache.version_time(project_version), fragment_cache.version_time(tags_version),
+    )
+
+
+def task_validators(request, project_id, task_id):
+    found = Task.objects.owned_by(request.user).filter(id=task_id, project_id=project_id).aggregate(
+        count=Count('id', distinct=True), updated=Max('updated_at'), tags_updated=Max('tags__updated_at')
+    )
+    if not found['count']:
+        return None
+    etag = make_etag(request.user.id, request.get_full_path(), *found.values())
+    return etag, latest(found['updated'], found['tags_updated'])
+
+
+def tag_list_validators(request):
+    found = Tag.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+    return make_etag(request.user.id, request.get_full_path(), *found.values()), None
+
+
+def tag_validators(request, tag_id):
+    found = Tag.objects.filter(id=tag_id).aggregate(count=Count('id'), updated=Max('updated_at'))
+    if not found['count']:
+        return None
+    return make_etag(request.user.id, request.get_full_path(), *found.values()), found['updated']
+
+
+# Views
+
+@require_GET
+@api_login_required
+@private_condition(project_list_validators)
+def project_list(request):
+    return list_response(request, PROJECTS, Project.objects.filter(user=request.user))
+
+
+@require_GET
+@api_login_required
+@private_condition(project_validators)
+def project_detail(request, project_id):
+    return detail_response(request, PROJECTS, Project.objects.filter(id=project_id, user=request.user))
+
+
+@require_GET
+@api_login_required
+@private_condition(task_list_validators)
+def task_list(request, project_id):
+    if not Project.objects.filter(id=project_id, user=request.user).exists():
+        return JsonResponse({'error': 'Not found.'}, status=404)
+    return list_response(request, TASKS, Task.objects.filter(project_id=project_id))
+
+
+@require_GET
+@api_login_required
+@private_condition(task_validators)
+def task_detail(request, project_id, task_id):
+    return detail_response(request, TASKS, Task.objects.owned_by(request.user).filter(
+        id=task_id, project_id=project_id
+    ))
+
+
+@require_GET
+@api_login_required
+def cycle_time(request, project_id):
+    if not Project.objects.filter(id=project_id, user=request.user).exists():
+        return JsonResponse({'error': 'Not found.'}, status=404)
+    try:
+        start, end = report_range(request)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    report = activity.cycle_time(project_id, start, end)
+    return JsonResponse({
+        'start': start,
+        'end': end,
+        'tasks': report['tasks'],
+        'average_seconds': seconds(report['average']),
+        'shortest_seconds': seconds(report['shortest']),
+        'longest_seconds': seconds(report['longest']),
+    })
+
+
+@require_GET
+@api_login_required
+def throughput(request, project_id):
+    if not Project.objects.filter(id=project_id, user=request.user).exists():
+        return JsonResponse({'error': 'Not found.'}, status=404)
+    try:
+        start, end = report_range(request)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    days = activity.throughput(project_id, start, end)
+    return JsonResponse({'start': start, 'end': end, 'done': sum(day['done'] for day in days), 'days': days})
+
+
+@require_GET
+@api_login_required
+@private_condition(tag_list_validators)
+def tag_list(request):
+    return list_response(request, TAGS, Tag.objects.all())
+
+
+@require_GET
+@api_login_required
+@private_condition(tag_validators)
+def tag_detail(request, tag_id):
+    return detail_response(request, TAGS, Tag.objects.filter(id=tag_id))
+
+
+@require_GET
+@api_login_required
+def inbox_list(request):
+    today = timezone.localdate()
+    try:
+        names = INBOX_TASKS.parse_fields(request)
+        limit = page_size(request)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    bucket_counts = inbox.assigned(request.user).aggregate(**inbox.counts(today))
+    tasks, next_cursor = inbox.paginate(
+        INBOX_TASKS.queryset(inbox.assigned(request.user), names), request.GET.get('cursor'), limit
+    )
+    next_url = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+    # Grouping and the cursor need due_date whether or not it was asked for; it is a key, so it's loaded.
+    grouped = inbox.group(tasks, today)
+    return JsonResponse({
+        'counts': bucket_counts,
+        'results': {name: INBOX_TASKS.serialize(grouped[name], names) for name, _ in inbox.BUCKETS},
+        'next': next_url,
+    })
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class MainAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main_app'
+
+    def ready(self):
+        # Signal receivers, and the modules that register job handlers, so
+        # every process (web or worker) knows every kind of job.
+        from . import bulk, exports, imports, purge, signals
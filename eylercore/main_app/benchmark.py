@@ -0,0 +1,184 @@
+import random
+import time
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from . import activity, search, tag_catalogue
+from .instrumentation import percentile
+from .models import Job, Project, ProjectMember, ProjectStats, Tag, Task, TaskActivity
+from .urls import app_name, urlpatterns
+
+# Synthetic data and a per-URL benchmark over it.
+#
+# The distributions are rough guesses at a real board: most tasks are open,
+# few are urgent, a third have no deadline, and tag use is Zipf-shaped so a
+# handful of tags appear on most tasks while the long tail is rare.
+
+STATUS_WEIGHTS = {'todo': 35, 'in_progress': 20, 'review': 10, 'done': 35}
+PRIORITY_WEIGHTS = {'low': 25, 'medium': 45, 'high': 22, 'urgent': 8}
+TAGS_PER_TASK_WEIGHTS = [25, 35, 25, 10, 5]
+USERNAME_PREFIX = 'bench-'
+BATCH_SIZE = 5000
+
+
+def weighted(rng, weights, k):
+    return rng.choices(list(weights), list(weights.values()), k=k)
+
+
+def seed(users=20, projects_per_user=5, tasks_per_project=200, tags=50, rng_seed=0):
+    rng = random.Random(rng_seed)
+    password = make_password(USERNAME_PREFIX + 'password')
+    created_users = User.objects.bulk_create([
+        User(username=f'{USERNAME_PREFIX}{i}', password=password) for i in range(users)
+    ])
+    # The first user is the one the suite logs in as, and can see the staff pages.
+    User.objects.filter(id=created_users[0].id).update(is_staff=True)
+    projects = Project.objects.bulk_create([
+        Project(name=f'Project {u}-{p}', description=f'Benchmark project {p} of {user.username}', user=user)
+        for u, user in enumerate(created_users) for p in range(projects_per_user)
+    ])
+    names = [f'{USERNAME_PREFIX}tag-{i}' for i in range(tags)]
+    Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+    tag_ids = list(Tag.objects.filter(name__in=names).values_list('id', flat=True))
+    tag_weights = [1 / rank for rank in range(1, len(tag_ids) + 1)]
+    today = timezone.localdate()
+    through = Task.tags.through
+    batch = []
+    task_count = 0
+
+    def flush(batch):
+        created = Task.objects.bulk_create(batch)
+        links = set()
+        for task in created:
+            fan_out = rng.choices(range(len(TAGS_PER_TASK_WEIGHTS)), TAGS_PER_TASK_WEIGHTS)[0]
+            for tag_id in rng.choices(tag_ids, tag_weights, k=min(fan_out, len(tag_ids))):
+                links.add((task.id, tag_id))
+        through.objects.bulk_create(
+            [through(task_id=task_id, tag_id=tag_id) for task_id, tag_id in links], batch_size=BATCH_SIZE
+        )
+        # Histories over the last 60 days: finished tasks were started and then
+        # done at random points after they were opened.
+        now = timezone.now()
+        entries = []
+        for task in created:
+            opened = now - timedelta(hours=rng.randint(24, 60 * 24))
+            entries.append(activity.entry(task, TaskActivity.CREATED, {'status': 'todo'}, opened))
+            if task.status == 'done':
+                started = opened + (now - opened) * rng.random()
+                finished = started + (now - started) * rng.random()
+                entries.append(activity.entry(task, TaskActivity.UPDATED, {'status': 'in_progress'}, started))
+                entries.append(activity.entry(task, TaskActivity.UPDATED, {'status': 'done'}, finished))
+        activity.log(entries)
+
+    for project in projects:
+        statuses = weighted(rng, STATUS_WEIGHTS, tasks_per_project)
+        priorities = weighted(rng, PRIORITY_WEIGHTS, tasks_per_project)
+        for i in range(tasks_per_project):
+            assignee = rng.choice(created_users) if rng.random() < 0.6 else None
+            batch.append(Task(
+                title=f'Task {i} of {project.name}',
+                description=f'Benchmark task {i}',
+                project=project,
+                status=statuses[i],
+                priority=priorities[i],
+                due_date=today + timedelta(days=rng.randint(-30, 60)) if rng.random() < 0.7 else None,
+                assigned_to=assignee,
+            ))
+            if len(batch) >= BATCH_SIZE:
+                flush(batch)
+                task_count += len(batch)
+                batch = []
+    if batch:
+        flush(batch)
+        task_count += len(batch)
+    # bulk_create skips signals, so derived data is rebuilt once at the end.
+    ProjectStats.rebuild([project.id for project in projects])
+    ProjectMember.backfill([project.id for project in projects])
+    search.rebuild_index()
+    tag_catalogue.invalidate()
+    return {'users': len(created_users), 'projects': len(projects), 'tasks': task_count, 'tags': len(tag_ids)}
+
+
+def requests_for(user):
+    """One request per main_app URL, built from the user's first project, task, tag and job."""
+    project = Project.objects.filter(user=user).order_by('id').first()
+    task = Task.objects.filter(project=project).order_by('id').first()
+    tag = Tag.objects.filter(name__startswith=USERNAME_PREFIX).order_by('id').first()
+    job = Job.objects.filter(user=user).order_by('id').first() or Job.objects.create(
+        kind='rebuild_project_stats', user=user, status=Job.DONE, result={'rebuilt': 0}
+    )
+    ids = {'project_id': project.id, 'task_id': task.id, 'tag_id': tag.id, 'user_id': user.id, 'job_id': job.id}
+    task_ids = list(Task.objects.filter(project=project).order_by('id').values_list('id', flat=True)[:20])
+    post_data = {
+        'bulk_tasks': lambda i: {'task_ids': task_ids, 'status': ['review', 'todo'][i % 2]},
+        'import_tasks': lambda i: {'file': import_file(i)},
+    }
+    get_query = {'search': {'q': 'benchmark task'}, 'export_tasks': {'format': 'jsonl'}}
+    requests = []
+    for pattern in urlpatterns:
+        kwargs = {name: ids[name] for name in pattern.pattern.converters}
+        url = reverse(f'{app_name}:{pattern.name}', kwargs=kwargs)
+        if pattern.name in post_data:
+            requests.append((pattern.name, 'post', url, post_data[pattern.name]))
+        else:
+            query = get_query.get(pattern.name, {})
+            requests.append((pattern.name, 'get', url, lambda i, query=query: query))
+    return requests
+
+
+def import_file(iteration):
+    rows = ''.join(f'Imported {iteration}-{i},todo,medium\n' for i in range(20))
+    return SimpleUploadedFile('tasks.csv', ('title,status,priority\n' + rows).encode(), 'text/csv')
+
+
+def run(client, user, iterations=20):
+    cache.clear()
+    client.force_login(user)
+    results = {}
+    for name, method, url, data in requests_for(user):
+        timings, query_counts, statuses = [], [], set()
+        # The first pass warms the fragment cache and isn't measured.
+        for i in range(iterations + 1):
+            start = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(client, method)(url, data(i))
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            if i:
+                timings.append((time.perf_counter() - start) * 1000)
+                query_counts.append(len(queries))
+                statuses.add(response.status_code)
+        results[f'{app_name}:{name}'] = {
+            'status': sorted(statuses),
+            'queries': max(query_counts),
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+        }
+    return results
+
+
+def compare(results, baseline, tolerance=0.5, slack_ms=5.0):
+    """
+    Regressions against a stored baseline: any extra query, or a p50 beyond the
+    tolerance. p95 is reported but not gated on; with a few dozen samples it is
+    mostly one GC pause or scheduler hiccup.
+    """
+    regressions = []
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: {current['queries']} queries, baseline {previous['queries']}")
+        limit = previous['p50_ms'] * (1 + tolerance) + slack_ms
+        if current['p50_ms'] > limit:
+            regressions.append(f"{name}: p50 {current['p50_ms']}ms, baseline {previous['p50_ms']}ms")
+        if any(status >= 500 for status in current['status']):
+            regressions.append(f"{name}: server error {current['status']}")
+    return regressions
@@ -0,0 +1,85 @@
+import time
+from contextlib import contextmanager
+from django.db import transaction
+from django.utils import timezone
+from . import activity, fragment_cache, jobs, live
+from .models import ProjectStats, Task, TaskState
+
+
+@contextmanager
+def timed(timings, name):
+    start = time.perf_counter()
+    yield
+    timings[name] = round((time.perf_counter() - start) * 1000, 3)
+
+
+def owned_task_ids(user, project_id, task_ids):
+    return list(Task.objects.owned_by(user).filter(
+        id__in=task_ids, project_id=project_id
+    ).values_list('id', flat=True))
+
+
+def bulk_update_tasks(project_id, task_ids, status=None, priority=None, assigned_to=None,
+                      unassign=False, add_tags=(), remove_tags=()):
+    """
+    Apply field changes and tag additions/removals to many tasks with set-based SQL.
+    
+    Signals are bypassed, so ProjectStats, the activity log and the fragment
+    cache versions are kept up here. Returns the time spent in each operation
+    in milliseconds.
+    """
+    timings = {}
+    now = timezone.now()
+    tasks = Task.objects.filter(id__in=task_ids)
+    Through = Task.tags.through
+    with transaction.atomic():
+        changes = {}
+        if status:
+            changes['status'] = status
+        if priority:
+            changes['priority'] = priority
+        if assigned_to is not None or unassign:
+            changes['assigned_to'] = assigned_to
+        with timed(timings, 'activity_read'):
+            # Read before the writes below, so only real changes are logged.
+            entries = activity.bulk_entries(task_ids, changes, add_tags, remove_tags, now)
+        counted = {name: value for name, value in changes.items() if name in ('status', 'priority')}
+        old_states = []
+        if counted:
+            with timed(timings, 'stats_read'):
+                # The counters move by each task's old and new status and priority.
+                old_states = [TaskState(*row) for row in tasks.values_list(*TaskState._fields)]
+        if changes or add_tags or remove_tags:
+            with timed(timings, 'update'):
+                tasks.update(updated_at=now, **changes)
+        if add_tags:
+            with timed(timings, 'add_tags'):
+                Through.objects.bulk_create(
+                    [Through(task_id=task_id, tag_id=tag_id) for task_id in task_ids for tag_id in add_tags],
+                    batch_size=500, ignore_conflicts=True,
+                )
+        if remove_tags:
+            with timed(timings, 'remove_tags'):
+                Through.objects.filter(task_id__in=task_ids, tag_id__in=remove_tags).delete()
+        with timed(timings, 'activity_write'):
+            activity.log(entries)
+        with timed(timings, 'stats'):
+            if old_states:
+                ProjectStats.apply_changes([(old, old._replace(**counted)) for old in old_states], now)
+            else:
+                ProjectStats.objects.filter(project_id=project_id).update(last_activity_at=now)
+        live.publish('tasks.changed', project_id, {'count': len(task_ids)})
+    fragment_cache.bump('task', *task_ids)
+    fragment_cache.bump('project', project_id)
+    return timings
+
+
+@jobs.handler('bulk_update_tasks')
+def bulk_job(job, project_id, task_ids, **changes):
+    # Every change is a plain assignment, so a retry after a failure is harmless.
+    return bulk_update_tasks(project_id, task_ids, **changes)
+
+
+@jobs.handler('rebuild_project_stats')
+def rebuild_stats_job(job, project_ids=None):
+    return {'rebuilt': ProjectStats.rebuild(project_ids)}
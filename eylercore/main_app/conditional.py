@@ -0,0 +1,73 @@
+import hashlib
+from functools import wraps
+from asgiref.sync import iscoroutinefunction
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def page_etag(request, *parts):
+    """
+    An ETag for a rendered page. The CSRF secret is part of it, so a page whose
+    forms carry a token from before the last login is never revalidated.
+    """
+    get_token(request)  # Creates the secret on a first visit, as rendering the form would.
+    return make_etag(
+        request.user.id, request.user.username, request.META['CSRF_COOKIE'],
+        request.get_full_path(), *parts
+    )
+
+
+def check(request, found):
+    etag, last_modified = found or (None, None)
+    etag = quote_etag(etag) if etag else None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return etag, timestamp, get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def finish(response, etag, timestamp):
+    if response.status_code in (200, 304):
+        if etag and not response.has_header('ETag'):
+            response['ETag'] = etag
+        if timestamp and not response.has_header('Last-Modified'):
+            response['Last-Modified'] = http_date(timestamp)
+    patch_vary_headers(response, ['Cookie'])
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def private_condition(validators):
+    """
+    Like django.views.decorators.http.condition(), but with one function that
+    returns (etag, last_modified) from a single query, or None to let the view
+    answer (e.g. with a 404). Responses are per-user: they vary on Cookie and
+    are marked private and always revalidated.
+
+    Async views take async validators.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return await view_func(request, *args, **kwargs)
+                etag, timestamp, response = check(request, await validators(request, *args, **kwargs))
+                if response is None:
+                    response = await view_func(request, *args, **kwargs)
+                return finish(response, etag, timestamp)
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            etag, timestamp, response = check(request, validators(request, *args, **kwargs))
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+            return finish(response, etag, timestamp)
+        return wrapper
+    return decorator
@@ -0,0 +1,29 @@
+from functools import wraps
+from django.contrib.auth.views import redirect_to_login
+from django.http import JsonResponse
+
+
+def async_login_required(view_func):
+    """
+    login_required for async views. The session user is loaded with the async
+    ORM and pinned on request.user, so templates (and the fragment cache) can
+    read it from the event loop without a synchronous database lookup.
+    """
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        request.user = user
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def api_login_required(view_func):
+    """A 401 JSON error instead of a redirect to the login page."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required.'}, status=401)
+        return view_func(request, *args, **kwargs)
+    return wrapper
@@ -1,7 +1,64 @@
 from django import forms
-from .models import Project, Task, Tag
+from django.urls import reverse, reverse_lazy
+from . import tag_catalogue
+from .models import Project, ProjectMember, Task, Tag
 from django.contrib.auth.models import User
 
+class AutocompleteMixin:
+    """
+    Renders only the selected options; autocomplete.js fills in the rest from
+    the JSON endpoint at data-autocomplete-url as the user types.
+    """
+    class Media:
+        js = ['main_app/js/autocomplete.js']
+    
+    def __init__(self, url, labels, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+        self.labels = labels
+    
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocomplete-url'] = str(self.url)
+        return context
+    
+    def optgroups(self, name, value, attrs=None):
+        self.choices = self.labels(value)
+        return super().optgroups(name, value, attrs)
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    pass
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    pass
+
+def selected_ids(values):
+    return {int(value) for value in values if str(value).isdigit()}
+
+def user_labels(values):
+    # The empty choice stays so a task can be unassigned.
+    users = User.objects.filter(id__in=selected_ids(values)).values_list('id', 'username')
+    return [('', '---------')] + list(users)
+
+def tag_labels(values):
+    return [(tag.id, tag.name) for tag in tag_catalogue.get().entries(selected_ids(values))]
+
+class TagChoiceField(forms.TypedMultipleChoiceField):
+    """Tag ids, checked against the tag catalogue rather than a queryset."""
+    
+    def __init__(self, **kwargs):
+        kwargs.setdefault('widget', AutocompleteSelectMultiple(
+            reverse_lazy('main_app:tags_autocomplete'), tag_labels, attrs={'class': 'form-control'}
+        ))
+        super().__init__(coerce=int, **kwargs)
+    
+    def prepare_value(self, value):
+        # A bound edit form starts from the task's Tag objects.
+        return [getattr(item, 'pk', item) for item in value or []]
+    
+    def valid_value(self, value):
+        return str(value).isdigit() and tag_catalogue.known([int(value)])
+
 class ProjectForm(forms.ModelForm):
     class Meta:
         model = Project
@@ -21,6 +78,9 @@ class TagForm(forms.ModelForm):
         }
 
 class TaskForm(forms.ModelForm):
+    tags = TagChoiceField(required=False)
+    assigned_to = forms.ModelChoiceField(queryset=User.objects.none(), required=False)
+    
     class Meta:
         model = Task
         fields = ['title', 'description', 'status', 'priority', 'due_date', 'tags', 'assigned_to']
@@ -30,8 +90,6 @@ class TaskForm(forms.ModelForm):
             'status': forms.Select(attrs={'class': 'form-control'}),
             'priority': forms.Select(attrs={'class': 'form-control'}),
             'due_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
-            'tags': forms.SelectMultiple(attrs={'class': 'form-control'}),
-            'assigned_to': forms.Select(attrs={'class': 'form-control'}),
         }
     
     def __init__(self, *args, **kwargs):
@@ -39,8 +97,120 @@ class TaskForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         
         if project:
-            self.fields['assigned_to'].queryset = User.objects.filter(
-                project__user=project.user
-            ).distinct()
-            
-            self.fields['tags'].queryset = Tag.objects.all()
\ No newline at end of file
+            # Validating a choice is one indexed lookup; nothing lists the members.
+            assigned_to = self.fields['assigned_to']
+            assigned_to.queryset = User.objects.filter(project_memberships__project=project)
+            assigned_to.widget = AutocompleteSelect(
+                reverse('main_app:members_autocomplete', args=[project.id]), user_labels,
+                attrs={'class': 'form-control'},
+            )
+
+class TaskFilterForm(forms.Form):
+    tag = forms.IntegerField(required=False, widget=forms.HiddenInput)
+    status = forms.ChoiceField(
+        choices=[('', 'Any status')] + Task.STATUS_CHOICES, required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    priority = forms.ChoiceField(
+        choices=[('', 'Any priority')] + Task.PRIORITY_CHOICES, required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    assigned_to = forms.TypedChoiceField(
+        coerce=int, empty_value=None, required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    due_after = forms.DateField(
+        required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    due_before = forms.DateField(
+        required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    
+    def __init__(self, *args, **kwargs):
+        project = kwargs.pop('project', None)
+        # Async views load the (id, username) pairs themselves and pass them in.
+        assignees = kwargs.pop('assignees', None)
+        super().__init__(*args, **kwargs)
+        if assignees is None:
+            assignees = self.assignee_choices(project)
+        self.fields['assigned_to'].choices = [('', 'Anyone')] + list(assignees)
+    
+    @staticmethod
+    def assignee_choices(project):
+        if not project:
+            return User.objects.none().values_list('id', 'username')
+        return User.objects.filter(assigned_tasks__project=project).distinct().order_by(
+            'username'
+        ).values_list('id', 'username')
+    
+    def filter(self, tasks):
+        if not self.is_valid():
+            return tasks
+        data = self.cleaned_data
+        if data['tag']:
+            tasks = tasks.filter(tags__id=data['tag'])
+        if data['status']:
+            tasks = tasks.filter(status=data['status'])
+        if data['priority']:
+            # The rank column is the one in the (project, -priority_rank, ...) index.
+            tasks = tasks.filter(priority_rank=Task.PRIORITY_RANKS[data['priority']])
+        if data['assigned_to']:
+            tasks = tasks.filter(assigned_to_id=data['assigned_to'])
+        if data['due_after']:
+            tasks = tasks.filter(due_date__gte=data['due_after'])
+        if data['due_before']:
+            tasks = tasks.filter(due_date__lte=data['due_before'])
+        return tasks
+
+
+class IntegerListField(forms.Field):
+    widget = forms.MultipleHiddenInput
+    
+    def to_python(self, value):
+        if not value:
+            return []
+        try:
+            return sorted({int(item) for item in value})
+        except (TypeError, ValueError):
+            raise forms.ValidationError('Enter a list of whole numbers.')
+
+class BulkTaskForm(forms.Form):
+    task_ids = IntegerListField()
+    status = forms.ChoiceField(choices=Task.STATUS_CHOICES, required=False)
+    priority = forms.ChoiceField(choices=Task.PRIORITY_CHOICES, required=False)
+    assigned_to = forms.ModelChoiceField(queryset=User.objects.none(), required=False)
+    unassign = forms.BooleanField(required=False)
+    add_tags = IntegerListField(required=False)
+    remove_tags = IntegerListField(required=False)
+    background = forms.BooleanField(required=False)
+    
+    def __init__(self, *args, **kwargs):
+        project_id = kwargs.pop('project_id', None)
+        super().__init__(*args, **kwargs)
+        self.fields['assigned_to'].queryset = User.objects.filter(project_memberships__project_id=project_id)
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        tag_ids = set(cleaned_data.get('add_tags') or []) | set(cleaned_data.get('remove_tags') or [])
+        if tag_ids and not tag_catalogue.known(tag_ids):
+            raise forms.ValidationError('Unknown tag selected.')
+        if cleaned_data.get('assigned_to') and cleaned_data.get('unassign'):
+            raise forms.ValidationError('Choose an assignee or unassign, not both.')
+        return cleaned_data
+
+
+class MemberForm(forms.Form):
+    username = forms.CharField(max_length=150, widget=forms.TextInput(attrs={'class': 'form-control'}))
+    
+    def __init__(self, *args, **kwargs):
+        self.project = kwargs.pop('project')
+        super().__init__(*args, **kwargs)
+    
+    def clean_username(self):
+        username = self.cleaned_data['username'].strip()
+        self.user = User.objects.filter(username=username).first()
+        if self.user is None:
+            raise forms.ValidationError(f'No user called {username!r}.')
+        if ProjectMember.objects.filter(project=self.project, user=self.user).exists():
+            raise forms.ValidationError(f'{username} is already a member.')
+        return username
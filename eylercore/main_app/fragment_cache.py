@@ -0,0 +1,142 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.cache import cache
+
+HITS_KEY = 'main_app:fragments:hits'
+MISSES_KEY = 'main_app:fragments:misses'
+
+
+def version_key(kind, object_id=None):
+    return f'main_app:version:{kind}' if object_id is None else f'main_app:version:{kind}:{object_id}'
+
+
+def bump(kind, *object_ids):
+    # A fresh token rather than incr() so a version never repeats after eviction.
+    token = time.time_ns()
+    keys = [version_key(kind, object_id) for object_id in object_ids] or [version_key(kind)]
+    cache.set_many({key: token for key in keys}, timeout=None)
+
+
+def versions(kind, object_ids=None):
+    keys = {version_key(kind, object_id): object_id for object_id in (object_ids or [None])}
+    found = cache.get_many(list(keys))
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return {object_id: found[key] for key, object_id in keys.items()}
+
+
+async def aversions(kind, object_ids=None):
+    """versions() for async views; a database cache backend can't be called from the event loop."""
+    keys = {version_key(kind, object_id): object_id for object_id in (object_ids or [None])}
+    found = await cache.aget_many(list(keys))
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        found.update(missing)
+    return {object_id: found[key] for key, object_id in keys.items()}
+
+
+def version_time(token):
+    """Version tokens are time_ns() values, so they double as change times."""
+    return datetime.fromtimestamp(token / 1e9, tz=timezone.utc)
+
+
+async def aattach_task_versions(tasks):
+    tasks = list(tasks)
+    task_versions = await aversions('task', [task.id for task in tasks])
+    tags_version = (await aversions('tags'))[None]
+    for task in tasks:
+        task.fragment_version = f'{task.updated_at.timestamp()}:{task_versions[task.id]}:{tags_version}'
+    return tasks
+
+
+async def aattach_project_version(project):
+    project_version = (await aversions('project', [project.id]))[project.id]
+    tags_version = (await aversions('tags'))[None]
+    project.fragment_version = f'{project.updated_at.timestamp()}:{project_version}:{tags_version}'
+    return project
+
+
+def fragment_key(name, user_id, *parts):
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'main_app:fragment:{name}:{user_id}:{digest}'
+
+
+def count(hits=0, misses=0):
+    for key, amount in ((HITS_KEY, hits), (MISSES_KEY, misses)):
+        if amount:
+            try:
+                cache.incr(key, amount)
+            except ValueError:
+                cache.add(key, amount, timeout=None)
+
+
+async def acount(hits=0, misses=0):
+    for key, amount in ((HITS_KEY, hits), (MISSES_KEY, misses)):
+        if amount:
+            try:
+                await cache.aincr(key, amount)
+            except ValueError:
+                await cache.aadd(key, amount, timeout=None)
+
+
+def get_fragment(key):
+    content = cache.get(key)
+    if content is None:
+        count(misses=1)
+    else:
+        count(hits=1)
+    return content
+
+
+class Prefetched:
+    """
+    A page's fragments, read with one get_many and counted once. Fragments
+    rendered on a miss are held here and written together by asave() after
+    the template has rendered, since the template can't await the cache.
+    """
+
+    def __init__(self, keys, found):
+        self.keys = keys
+        self.found = found
+        self.rendered = {}
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def get(self, key):
+        return self.found.get(key)
+
+    def store(self, key, content):
+        self.rendered[key] = content
+
+    async def asave(self):
+        if self.rendered:
+            await cache.aset_many(self.rendered, timeout=getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 600))
+            self.rendered = {}
+
+
+async def aprefetch(name, user_id, objects):
+    """
+    For async views: every object's fragment up front, keyed as
+    {% fragment name object.id object.fragment_version %} keys them.
+    """
+    keys = {fragment_key(name, user_id, obj.id, obj.fragment_version) for obj in objects}
+    found = await cache.aget_many(list(keys)) if keys else {}
+    await acount(hits=len(found), misses=len(keys) - len(found))
+    return Prefetched(keys, found)
+
+
+def set_fragment(key, content):
+    cache.set(key, content, timeout=getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 600))
+
+
+def stats():
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counters.get(HITS_KEY, 0), counters.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': hits / total if total else None}
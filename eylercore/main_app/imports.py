@@ -0,0 +1,167 @@
+import csv
+import io
+import json
+import time
+from django import forms
+from django.core.files.storage import default_storage
+from django.db import transaction
+from . import activity, fragment_cache, jobs, live, search, tag_catalogue
+from .forms import TaskForm
+from .models import Project, ProjectMember, ProjectStats, Tag, Task
+
+# Reused form fields from TaskForm, so rows get the same rules without a form per row.
+FIELDS = ['title', 'description', 'status', 'priority', 'due_date']
+MAX_REPORTED_ERRORS = 100
+
+
+def read_rows(stream, import_format):
+    if import_format == 'csv':
+        for row in csv.DictReader(stream):
+            row['tags'] = [name for name in (row.get('tags') or '').split('|') if name]
+            yield row
+        return
+    for line in stream:
+        if line.strip():
+            try:
+                row = json.loads(line)
+            except ValueError as error:
+                # Passed on for clean_row to report, so one bad line doesn't end the import.
+                yield error
+                continue
+            if isinstance(row, dict) and isinstance(row.get('tags'), str):
+                row['tags'] = [name for name in row['tags'].split('|') if name]
+            yield row
+
+
+def clean_row(row):
+    if isinstance(row, ValueError):
+        return None, {'__all__': [f'Could not read line: {row}']}
+    if not isinstance(row, dict):
+        return None, {'__all__': ['Each line must be a JSON object.']}
+    cleaned = {}
+    errors = {}
+    for name in FIELDS:
+        field = TaskForm.base_fields[name]
+        value = row.get(name)
+        if value in (None, '') and Task._meta.get_field(name).has_default():
+            cleaned[name] = Task._meta.get_field(name).get_default()
+            continue
+        try:
+            cleaned[name] = field.clean(value)
+        except forms.ValidationError as error:
+            errors[name] = error.messages
+    cleaned['tags'] = [str(name).strip()[:50] for name in row.get('tags') or [] if str(name).strip()]
+    cleaned['assigned_to'] = str(row.get('assigned_to') or '').strip() or None
+    return cleaned, errors
+
+
+class TaskImporter:
+    def __init__(self, project, batch_size=1000):
+        self.project = project
+        self.batch_size = batch_size
+        self.tag_ids = {}
+        self.user_ids = {}
+        self.created = 0
+        self.errors = []
+        self.error_count = 0
+
+    def resolve_tags(self, names):
+        missing = set(names) - set(self.tag_ids)
+        if not missing:
+            return
+        self.tag_ids.update(Tag.objects.filter(name__in=missing).values_list('name', 'id'))
+        new = missing - set(self.tag_ids)
+        if new:
+            Tag.objects.bulk_create([Tag(name=name) for name in new], ignore_conflicts=True)
+            # bulk_create skips the post_save that would refresh the catalogue.
+            tag_catalogue.invalidate()
+            self.tag_ids.update(Tag.objects.filter(name__in=new).values_list('name', 'id'))
+
+    def resolve_users(self, usernames):
+        missing = set(usernames) - set(self.user_ids)
+        if missing:
+            found = dict(ProjectMember.objects.filter(
+                project=self.project, user__username__in=missing
+            ).values_list('user__username', 'user_id'))
+            self.user_ids.update({username: found.get(username) for username in missing})
+
+    def add_error(self, line, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def write_batch(self, batch):
+        self.resolve_tags({name for _, row in batch for name in row['tags']})
+        self.resolve_users({row['assigned_to'] for _, row in batch if row['assigned_to']})
+        tasks = []
+        tag_names = []
+        for line, row in batch:
+            assignee = row['assigned_to']
+            if assignee and self.user_ids.get(assignee) is None:
+                self.add_error(line, {'assigned_to': [f'{assignee!r} is not a member of this project.']})
+                continue
+            tasks.append(Task(
+                project=self.project,
+                assigned_to_id=self.user_ids.get(assignee) if assignee else None,
+                **{name: row[name] for name in FIELDS}
+            ))
+            tag_names.append(row['tags'])
+        with transaction.atomic():
+            Task.objects.bulk_create(tasks)
+            Task.tags.through.objects.bulk_create([
+                Task.tags.through(task_id=task.id, tag_id=self.tag_ids[name])
+                for task, names in zip(tasks, tag_names) for name in set(names)
+            ], batch_size=self.batch_size)
+            search.index_objects('task', tasks)
+            activity.log([
+                activity.created(task, {self.tag_ids[name] for name in names})
+                for task, names in zip(tasks, tag_names)
+            ])
+            live.publish('tasks.changed', self.project.id, {'count': len(tasks)})
+        self.created += len(tasks)
+
+    def run(self, rows, progress=None):
+        start = time.perf_counter()
+        batch = []
+        try:
+            for line, row in enumerate(rows, start=1):
+                cleaned, errors = clean_row(row)
+                if errors:
+                    self.add_error(line, errors)
+                    continue
+                batch.append((line, cleaned))
+                if len(batch) >= self.batch_size:
+                    self.write_batch(batch)
+                    batch = []
+                    if progress:
+                        progress(line)
+            if batch:
+                self.write_batch(batch)
+        finally:
+            # Batches already written stay, so the stats must count them even when the file breaks off.
+            ProjectStats.rebuild([self.project.id])
+            fragment_cache.bump('project', self.project.id)
+        elapsed = time.perf_counter() - start
+        return {
+            'created': self.created,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(self.created / elapsed, 1) if elapsed else None,
+        }
+
+
+@jobs.handler('import_tasks')
+def import_job(job, project_id, path, import_format):
+    # Enqueued with a single attempt: a rerun would import the committed batches twice.
+    try:
+        project = Project.objects.get(id=project_id)
+        with default_storage.open(path, 'rb') as upload:
+            stream = io.TextIOWrapper(upload, encoding='utf-8', newline='')
+            return TaskImporter(project).run(read_rows(stream, import_format), progress=job.report_progress)
+    except Project.DoesNotExist:
+        raise jobs.PermanentError('The project was deleted.')
+    except (ValueError, csv.Error) as error:
+        raise jobs.PermanentError(f'Could not read file: {error}')
+    finally:
+        default_storage.delete(path)
@@ -0,0 +1,116 @@
+from datetime import timedelta
+from django.db.models import Count, Q
+from .models import Task
+from .pagination import decode_cursor, keyset_page_queryset, split_page
+
+# A user's open assignments across projects, dated ones first.
+#
+# Everything is filtered on (assigned_to, status != done).
+# task_assignee_open_due_idx holds exactly the open tasks, keyed by assignee
+# and then (due_date, id), which is the listing's order: a page is one range
+# read stopping after the rows it returns, with no sort, and the bucket counts
+# read the same range (plus each row's project, by primary key, to leave out
+# soft-deleted ones). The condition has to be written as status != 'done',
+# the way the partial index is, for SQLite to match the two.
+#
+# SQLite sorts NULLs first, but tasks with no due date belong at the end, so a
+# page is read as two ranges of that index: the dated tasks after the cursor,
+# then the undated ones by id. A cursor with no due date is in the second.
+
+BUCKETS = [
+    ('overdue', 'Overdue'),
+    ('today', 'Due today'),
+    ('this_week', 'Due this week'),
+    ('later', 'Due later'),
+    ('no_date', 'No due date'),
+]
+LISTING_KEYS = [('due_date', False), ('id', False)]
+UNDATED_KEYS = [('id', False)]
+PAGE_SIZE = 200
+
+
+def week_end(today):
+    return today + timedelta(days=6 - today.weekday())
+
+
+def assigned(user):
+    # Soft-deleted projects are hidden here, so the counts and the list agree.
+    return Task.objects.filter(
+        assigned_to=user, project__deleted_at__isnull=True
+    ).exclude(status='done')
+
+
+def listing(user):
+    return assigned(user).select_related('project').only(
+        'id', 'title', 'status', 'priority', 'due_date',
+        'project__id', 'project__name', 'project__user_id',
+    )
+
+
+def page_querysets(queryset, cursor=None):
+    """The ranges a page is read from, in order."""
+    undated = queryset.filter(due_date__isnull=True)
+    values = decode_cursor(queryset.model, LISTING_KEYS, cursor) if cursor else None
+    if values is not None and values[0] is None:
+        return [keyset_page_queryset(undated, UNDATED_KEYS).filter(id__gt=values[1])]
+    dated = keyset_page_queryset(queryset.filter(due_date__isnull=False), LISTING_KEYS, cursor)
+    return [dated, keyset_page_queryset(undated, UNDATED_KEYS)]
+
+
+def paginate(queryset, cursor=None, page_size=PAGE_SIZE):
+    items = []
+    for part in page_querysets(queryset, cursor):
+        items += part[:page_size + 1 - len(items)]
+        if len(items) > page_size:
+            break
+    return split_page(items, LISTING_KEYS, page_size)
+
+
+async def apaginate(queryset, cursor=None, page_size=PAGE_SIZE):
+    items = []
+    for part in page_querysets(queryset, cursor):
+        items += [item async for item in part[:page_size + 1 - len(items)]]
+        if len(items) > page_size:
+            break
+    return split_page(items, LISTING_KEYS, page_size)
+
+
+def bucket_filters(today):
+    end = week_end(today)
+    return {
+        'overdue': Q(due_date__lt=today),
+        'today': Q(due_date=today),
+        'this_week': Q(due_date__gt=today, due_date__lte=end),
+        'later': Q(due_date__gt=end),
+        'no_date': Q(due_date__isnull=True),
+    }
+
+
+def counts(today):
+    """Aggregates for assigned()."""
+    return {name: Count('id', filter=condition) for name, condition in bucket_filters(today).items()}
+
+
+def bucket_of(task, today):
+    if task.due_date is None:
+        return 'no_date'
+    if task.due_date < today:
+        return 'overdue'
+    if task.due_date == today:
+        return 'today'
+    return 'this_week' if task.due_date <= week_end(today) else 'later'
+
+
+def group(tasks, today):
+    grouped = {name: [] for name, _ in BUCKETS}
+    for task in tasks:
+        grouped[bucket_of(task, today)].append(task)
+    return grouped
+
+
+def sections(tasks, bucket_counts, today):
+    grouped = group(tasks, today)
+    return [
+        {'name': name, 'label': label, 'count': bucket_counts[name], 'tasks': grouped[name]}
+        for name, label in BUCKETS
+    ]
@@ -0,0 +1,180 @@
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates, Template
+
+# Per-request DB, template and wall timings, keyed by URL name.
+#
+# The current request's RequestMetrics lives in a context variable, which
+# asgiref copies into sync_to_async threads, so queries made by async views are
+# attributed to the right request. Samples are kept in memory per process, a
+# rolling window per view.
+
+current = ContextVar('request_metrics', default=None)
+PERCENTILES = [50, 95, 99]
+FIELDS = ['wall_ms', 'db_ms', 'template_ms', 'queries', 'duplicate_queries']
+
+lock = threading.Lock()
+samples = defaultdict(lambda: deque(maxlen=getattr(settings, 'REQUEST_METRICS_WINDOW', 500)))
+repeated_sql = defaultdict(Counter)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.sql = Counter()
+
+    def duplicates(self):
+        """Queries that ran again with the same SQL: the shape of an N+1."""
+        return {sql: count for sql, count in self.sql.items() if count > 1}
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - start
+        metrics.queries += 1
+        metrics.sql[sql] += 1
+
+
+def install_wrapper(connection, **kwargs):
+    # First in the list, so connection.execute_wrapper() blocks still pop their own.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = current.get()
+        if metrics is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - start
+
+
+class TemplateBackend(DjangoTemplates):
+    """DjangoTemplates that times top-level renders (queries run while rendering included)."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(int(round(pct / 100 * len(ordered))) - 1, 0)]
+
+
+def record(view_name, metrics, wall_time):
+    duplicates = metrics.duplicates()
+    sample = (
+        wall_time * 1000, metrics.db_time * 1000, metrics.template_time * 1000,
+        metrics.queries, sum(count - 1 for count in duplicates.values()),
+    )
+    with lock:
+        samples[view_name].append(sample)
+        for sql, count in duplicates.items():
+            if count > repeated_sql[view_name][sql]:
+                repeated_sql[view_name][sql] = count
+    return sample
+
+
+def server_timing(sample):
+    wall, db, template, queries, duplicates = sample
+    parts = [
+        f'db;dur={db:.1f};desc="{queries} queries"',
+        f'tpl;dur={template:.1f}',
+        f'total;dur={wall:.1f}',
+    ]
+    if duplicates:
+        parts.append(f'dup;desc="{duplicates} duplicate queries"')
+    return ', '.join(parts)
+
+
+def report():
+    with lock:
+        snapshot = {name: list(values) for name, values in samples.items()}
+        repeated = {name: repeated_sql[name].most_common(5) for name in snapshot}
+    result = {}
+    for name, values in sorted(snapshot.items()):
+        columns = list(zip(*values))
+        result[name] = {'count': len(values)}
+        for field, column in zip(FIELDS, columns):
+            result[name][field] = {f'p{pct}': round(percentile(column, pct), 2) for pct in PERCENTILES}
+        result[name]['repeated_sql'] = [
+            {'sql': sql, 'max_per_request': count} for sql, count in repeated[name]
+        ]
+    return result
+
+
+def reset():
+    with lock:
+        samples.clear()
+        repeated_sql.clear()
+
+
+class InstrumentationMiddleware:
+    """
+    Records query count, DB time, template time and wall time per URL name and
+    adds a Server-Timing header. Removed from the stack entirely unless
+    settings.REQUEST_METRICS is on, so it costs nothing when disabled.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(install_wrapper, dispatch_uid='main_app.instrumentation')
+        for connection in connections.all(initialized_only=True):
+            install_wrapper(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        match = request.resolver_match
+        view_name = match.view_name if match else '(unresolved)'
+        sample = record(view_name, metrics, time.perf_counter() - metrics.start)
+        response['Server-Timing'] = server_timing(sample)
+        return response
@@ -0,0 +1,128 @@
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Job
+
+# A small database-backed job queue.
+#
+# Handlers are registered with @handler('kind') in the module that owns the
+# work and are called as handler(job, **payload). run_workers runs work() in a
+# pool of processes. Claiming uses SELECT ... FOR UPDATE SKIP LOCKED where the
+# database has it; SQLite doesn't, but it only ever has one writer, so a
+# conditional UPDATE on the status works as a compare-and-set instead.
+
+HANDLERS = {}
+CLAIM_CANDIDATES = 10
+
+
+class PermanentError(Exception):
+    """Raised by a handler when retrying can't help."""
+
+
+def handler(kind):
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, user=None, max_attempts=None, **payload):
+    if kind not in HANDLERS:
+        raise ValueError(f'No job handler for {kind!r}')
+    job = Job(kind=kind, user=user, payload=payload)
+    if max_attempts is not None:
+        job.max_attempts = max_attempts
+    job.save()
+    return job
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker):
+    now = timezone.now()
+    claimable = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by('run_after', 'id')
+    running = {
+        'status': Job.RUNNING, 'locked_by': worker, 'locked_at': now, 'attempts': F('attempts') + 1,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = claimable.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            Job.objects.filter(id=job.id).update(**running)
+    else:
+        for job_id in claimable.values_list('id', flat=True)[:CLAIM_CANDIDATES]:
+            # Another worker may have taken it since the SELECT; then try the next.
+            if Job.objects.filter(id=job_id, status=Job.QUEUED).update(**running):
+                break
+        else:
+            return None
+        job = Job(id=job_id)
+    job.refresh_from_db()
+    return job
+
+
+def backoff(attempts):
+    return timedelta(seconds=getattr(settings, 'JOB_RETRY_DELAY', 10) * 2 ** (attempts - 1))
+
+
+def run(job):
+    func = HANDLERS.get(job.kind)
+    finished = {'locked_by': '', 'locked_at': None}
+    try:
+        if func is None:
+            raise PermanentError(f'No job handler for {job.kind!r}')
+        result = func(job, **job.payload)
+    except Exception as error:
+        now = timezone.now()
+        finished['error'] = traceback.format_exc()
+        if isinstance(error, PermanentError) or job.attempts >= job.max_attempts:
+            finished.update(status=Job.FAILED, finished_at=now)
+        else:
+            finished.update(status=Job.QUEUED, run_after=now + backoff(job.attempts))
+    else:
+        finished.update(status=Job.DONE, result=result, error='', finished_at=timezone.now())
+    Job.objects.filter(id=job.id).update(**finished)
+    for field, value in finished.items():
+        setattr(job, field, value)
+    return job
+
+
+def run_next(worker=None):
+    job = claim(worker or worker_name())
+    return run(job) if job else None
+
+
+def requeue_stale():
+    """Jobs whose worker stopped reporting: back in the queue, or failed if out of attempts."""
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'JOB_LOCK_TIMEOUT', 600))
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, error='Worker stopped responding.', finished_at=timezone.now(),
+        locked_by='', locked_at=None,
+    )
+    return failed + stale.update(status=Job.QUEUED, locked_by='', locked_at=None)
+
+
+def work(poll_interval=1.0, burst=False):
+    """Claim and run jobs until stopped, or until the queue is empty with burst."""
+    worker = worker_name()
+    processed = 0
+    while True:
+        job = run_next(worker)
+        if job is not None:
+            processed += 1
+            continue
+        if burst:
+            return processed
+        requeue_stale()
+        connection.close_if_unusable_or_obsolete()
+        time.sleep(poll_interval)
@@ -0,0 +1,200 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque, namedtuple
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.dateformat import format as date_format
+from django.utils.module_loading import import_string
+
+# Live task board updates over server-sent events.
+#
+# Model signals call publish(), which hands the event to the broker once the
+# transaction commits. The broker numbers events, keeps the last few hundred
+# so a reconnecting client can be sent what it missed (Last-Event-ID), and
+# fans them out to the open streams of the event's project. An event with no
+# project (a tag renamed) goes to every stream.
+#
+# LocalBroker only reaches streams in the same process. Something shared
+# (Redis pub/sub, Postgres LISTEN) can replace it through LIVE_EVENTS_BROKER,
+# as long as it has the same publish/last_id/subscribe/unsubscribe methods.
+#
+# The board page carries the position it was rendered at, but a 304 can hand
+# back that page long after the broker has moved on or restarted. Its ETag
+# already vouches that the cards are current, so an unknown page position
+# starts the stream from now; only a reconnect (Last-Event-ID) is told to reset.
+#
+# Writes that skip signals (bulk edits, imports) send one 'tasks.changed'
+# instead of an event per task; clients reload for it, as they do for 'reset'.
+
+HEARTBEAT = 15
+RETRY_MS = 3000
+QUEUE_SIZE = 1000
+
+lock = threading.Lock()
+current = None
+
+Event = namedtuple('Event', ['id', 'kind', 'project_id', 'data'], defaults=[None, {}])
+
+
+def encode(event):
+    payload = json.dumps(event.data, cls=DjangoJSONEncoder)
+    return f'id: {event.id}\nevent: {event.kind}\ndata: {payload}\n\n'
+
+
+class Subscription:
+    """One open stream: an asyncio queue fed from whichever thread publishes."""
+
+    def __init__(self, project_id, loop):
+        self.project_id = project_id
+        self.loop = loop
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+
+    def deliver(self, event):
+        self.loop.call_soon_threadsafe(self.put, event)
+
+    def put(self, event):
+        if self.queue.full():
+            # Too far behind to catch up event by event; start it over.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = Event(event.id, 'reset')
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class LocalBroker:
+    def __init__(self, backlog=None):
+        # Ids are '<epoch>-<sequence>', so an id from another process or an
+        # earlier run is recognised as unknown instead of being misread.
+        self.epoch = str(time.time_ns())
+        self.sequence = 0
+        self.history = deque(maxlen=backlog or getattr(settings, 'LIVE_EVENTS_BACKLOG', 500))
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    def last_id(self):
+        with self.lock:
+            return f'{self.epoch}-{self.sequence}'
+
+    def publish(self, kind, project_id=None, data=None):
+        with self.lock:
+            self.sequence += 1
+            event = Event(f'{self.epoch}-{self.sequence}', kind, project_id, data or {})
+            self.history.append((self.sequence, event))
+            targets = [
+                subscription for key, subscriptions in self.subscribers.items()
+                if project_id is None or key == project_id
+                for subscription in subscriptions
+            ]
+        for subscription in targets:
+            try:
+                subscription.deliver(event)
+            except RuntimeError:
+                # Its event loop has closed; the stream's own cleanup never ran.
+                self.unsubscribe(subscription)
+        return event
+
+    def missed(self, project_id, last_event_id):
+        """Events after last_event_id for the project, or None when they aren't all kept."""
+        epoch, _, sequence = (last_event_id or '').partition('-')
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        sequence = int(sequence)
+        if sequence > self.sequence or self.history and sequence < self.history[0][0] - 1:
+            return None
+        return [
+            event for number, event in self.history
+            if number > sequence and event.project_id in (None, project_id)
+        ]
+
+    def subscribe(self, project_id, last_event_id=None, reset=True):
+        """
+        Returns the subscription and what to send before live events: the
+        missed events, or when they can't be replayed a single 'reset' (or,
+        with reset=False, nothing).
+        """
+        subscription = Subscription(project_id, asyncio.get_running_loop())
+        with self.lock:
+            self.subscribers.setdefault(project_id, set()).add(subscription)
+            if last_event_id is None:
+                return subscription, []
+            replay = self.missed(project_id, last_event_id)
+            if replay is None:
+                replay = [Event(f'{self.epoch}-{self.sequence}', 'reset', project_id)] if reset else []
+        return subscription, replay
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscribers.get(subscription.project_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.subscribers.pop(subscription.project_id, None)
+
+
+def broker():
+    global current
+    if current is None:
+        with lock:
+            if current is None:
+                current = import_string(getattr(settings, 'LIVE_EVENTS_BROKER', 'main_app.live.LocalBroker'))()
+    return current
+
+
+def can_stream(request):
+    """
+    Only an ASGI server can hold a stream open. Under WSGI the never-ending
+    generator would be drained into a list on a worker thread, forever.
+    """
+    return isinstance(request, ASGIRequest)
+
+
+def publish(kind, project_id=None, data=None):
+    """Sent once the surrounding transaction commits, never for a rollback."""
+    transaction.on_commit(lambda: broker().publish(kind, project_id, data))
+
+
+async def stream(subscription, replay, heartbeat=HEARTBEAT):
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        for event in replay:
+            yield encode(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), heartbeat)
+            except asyncio.TimeoutError:
+                # A comment line keeps proxies from closing an idle connection.
+                yield ': keep-alive\n\n'
+                continue
+            yield encode(event)
+    finally:
+        broker().unsubscribe(subscription)
+
+
+# Payloads
+
+def task_data(task):
+    return {
+        'id': task.id,
+        'title': task.title,
+        'status': task.status,
+        'status_display': task.get_status_display(),
+        'priority': task.priority,
+        'priority_display': task.get_priority_display(),
+        'due_date': task.due_date,
+        'due_display': date_format(task.due_date, 'M j, Y') if task.due_date else 'No deadline',
+        'assigned_to': task.assigned_to_id,
+    }
+
+
+def tag_data(tag):
+    return {'id': tag.id, 'name': tag.name, 'color': tag.color}
+
+
+def tags_data(entries):
+    return [entry._asdict() for entry in entries]
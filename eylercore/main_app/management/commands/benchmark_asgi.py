@@ -0,0 +1,132 @@
+import asyncio
+import statistics
+import threading
+import time
+from wsgiref.util import setup_testing_defaults
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from main_app.management.scratch import scratch_database, seed_project
+
+
+class Command(BaseCommand):
+    help = 'Compare WSGI and ASGI throughput of the read-heavy views with slow clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=64, help='Concurrent clients')
+        parser.add_argument('--requests', type=int, default=10, help='Requests per client')
+        parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads')
+        parser.add_argument('--client-latency-ms', type=float, default=100,
+                            help='Time each client takes to read a response')
+        parser.add_argument('--tasks', type=int, default=200)
+
+    def handle(self, *args, **options):
+        # Both handlers are driven in-process, so this compares Django's two
+        # serving paths rather than any particular server. A WSGI thread is held
+        # while a slow client reads its response; under ASGI only a coroutine is.
+        with scratch_database():
+            user, project, task_ids = seed_project(options['tasks'])
+            client = Client()
+            client.force_login(user)
+            self.cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+            self.urls = [
+                reverse('main_app:projects_index'),
+                reverse('main_app:projects_detail', args=[project.id]),
+                reverse('main_app:tasks_index', args=[project.id]),
+                reverse('main_app:task_detail', args=[project.id, task_ids[0]]),
+                reverse('main_app:tags_index'),
+            ]
+            connections.close_all()
+            for name, run in [('wsgi', self.run_wsgi), ('asgi', self.run_asgi)]:
+                start = time.perf_counter()
+                timings, errors = run(options)
+                elapsed = time.perf_counter() - start
+                timings.sort()
+                self.stdout.write(
+                    f'{name}: {len(timings) / elapsed:8.1f} req/s, '
+                    f'p50 {statistics.median(timings):.1f}ms, '
+                    f'p95 {timings[max(int(len(timings) * 0.95) - 1, 0)]:.1f}ms, '
+                    f'{errors} errors'
+                )
+
+    def run_wsgi(self, options):
+        application = get_wsgi_application()
+        workers = threading.Semaphore(options['threads'])
+        latency = options['client_latency_ms'] / 1000
+        timings, errors = [], []
+
+        def client(number):
+            for i in range(options['requests']):
+                environ = {
+                    'PATH_INFO': self.urls[(number + i) % len(self.urls)],
+                    'HTTP_HOST': 'localhost',
+                    'HTTP_COOKIE': self.cookie,
+                }
+                setup_testing_defaults(environ)
+                statuses = []
+                start = time.perf_counter()
+                with workers:
+                    body = application(environ, lambda status, headers: statuses.append(status))
+                    b''.join(body)
+                    body.close()
+                    time.sleep(latency)
+                timings.append((time.perf_counter() - start) * 1000)
+                if not statuses[0].startswith('200'):
+                    errors.append(statuses[0])
+
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(options['clients'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timings, len(errors)
+
+    def run_asgi(self, options):
+        application = get_asgi_application()
+        latency = options['client_latency_ms'] / 1000
+        timings, errors = [], []
+
+        async def request(path):
+            statuses = []
+            received = False
+
+            async def receive():
+                nonlocal received
+                if not received:
+                    received = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # Nothing more to send; ASGIHandler waits here for a disconnect.
+                await asyncio.Event().wait()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+                elif not message.get('more_body'):
+                    await asyncio.sleep(latency)
+
+            await application({
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+                'query_string': b'', 'root_path': '',
+                'headers': [(b'host', b'localhost'), (b'cookie', self.cookie.encode())],
+                'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+            }, receive, send)
+            return statuses[0]
+
+        async def client(number):
+            for i in range(options['requests']):
+                start = time.perf_counter()
+                status = await request(self.urls[(number + i) % len(self.urls)])
+                timings.append((time.perf_counter() - start) * 1000)
+                if status != 200:
+                    errors.append(status)
+
+        async def main():
+            await asyncio.gather(*(client(n) for n in range(options['clients'])))
+
+        asyncio.run(main())
+        return timings, len(errors)
@@ -0,0 +1,92 @@
+import random
+import statistics
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from main_app import search
+from main_app.models import Project, Task
+
+SYLLABLES = 'ka ro mi te su na lo vi ra en to shi ber gan dor eth ul'.split()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Seed tasks and time ranked full-text search queries against them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tasks', type=int, default=1_000_000, help='The p95 budget is set for a million tasks'
+        )
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--vocabulary', type=int, default=5000)
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--budget-ms', type=float, default=50.0, help='Fail if p95 exceeds this')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.vocabulary(rng, options['vocabulary'])
+        try:
+            with transaction.atomic():
+                users = self.seed(rng, options)
+                timings = self.run_queries(rng, users, options['queries'])
+                if not options['keep']:
+                    raise Rollback
+        except Rollback:
+            pass
+        timings.sort()
+        p50 = statistics.median(timings)
+        p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+        self.stdout.write(
+            f"{options['tasks']} tasks, {len(timings)} queries: "
+            f"p50 {p50:.2f}ms, p95 {p95:.2f}ms, max {timings[-1]:.2f}ms"
+        )
+        if p95 > options['budget_ms']:
+            raise CommandError(f"p95 {p95:.2f}ms is over the {options['budget_ms']}ms budget")
+
+    def vocabulary(self, rng, size):
+        # Zipf-weighted pseudo-words, so a few terms are common and most are rare.
+        words = sorted({''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(size)})
+        rng.shuffle(words)
+        self.words = words
+        self.weights = [1 / rank for rank in range(1, len(words) + 1)]
+
+    def sentence(self, rng, length):
+        return ' '.join(rng.choices(self.words, self.weights, k=length))
+
+    def seed(self, rng, options):
+        start = time.perf_counter()
+        users = User.objects.bulk_create([
+            User(username=f'search-benchmark-{i}') for i in range(options['users'])
+        ])
+        projects = Project.objects.bulk_create([
+            Project(name=self.sentence(rng, 2), description=self.sentence(rng, 8), user=user)
+            for user in users for _ in range(5)
+        ])
+        batch = []
+        for i in range(options['tasks']):
+            batch.append(Task(
+                title=self.sentence(rng, 4), description=self.sentence(rng, 20),
+                project=projects[i % len(projects)]
+            ))
+            if len(batch) == 5000:
+                Task.objects.bulk_create(batch)
+                batch = []
+        Task.objects.bulk_create(batch)
+        search.rebuild_index()
+        self.stdout.write(f'Seeded in {time.perf_counter() - start:.1f}s')
+        return users
+
+    def run_queries(self, rng, users, count):
+        timings = []
+        for _ in range(count):
+            text = self.sentence(rng, rng.choice([1, 2]))
+            start = time.perf_counter()
+            search.ranked_ids('task', text, rng.choice(users), limit=21)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
@@ -0,0 +1,112 @@
+import re
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from main_app import urls as main_app_urls
+from main_app.models import Job, Project, ProjectMember, ProjectStats, Task, Tag
+
+# Tag is a global catalogue that tags_index lists in full, so scanning it is expected.
+# 'subquery' is the derived table Django wraps an aggregate of aggregates in
+# (the cycle time report); scanning it reads the grouped rows, not a table.
+ALLOWED_SCANS = {'main_app_tag', 'subquery'}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN every query issued by the main_app views and fail on full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=5)
+        parser.add_argument('--tasks', type=int, default=200, help='Tasks per project')
+        parser.add_argument('--tags', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.failures = []
+        try:
+            with transaction.atomic():
+                seed = self.seed(options)
+                self.check_views(seed)
+                raise Rollback
+        except Rollback:
+            pass
+        if self.failures:
+            for url, sql, plan in self.failures:
+                self.stderr.write(f'{url}\n  {sql}\n  {plan}')
+            raise CommandError(f'{len(self.failures)} queries perform a full table scan')
+        self.stdout.write(self.style.SUCCESS('No full table scans found'))
+
+    def seed(self, options):
+        user = User.objects.create_user(username='query-plan-check', password='query-plan-check')
+        tags = Tag.objects.bulk_create([
+            Tag(name=f'query-plan-check-{i}') for i in range(options['tags'])
+        ])
+        projects = Project.objects.bulk_create([
+            Project(name=f'Project {i}', description='Seeded', user=user)
+            for i in range(options['projects'])
+        ])
+        statuses = list(Task.STATUS_RANKS)
+        priorities = list(Task.PRIORITY_RANKS)
+        tasks = Task.objects.bulk_create([
+            Task(
+                title=f'Task {i}', project=project, assigned_to=user,
+                status=statuses[i % len(statuses)], priority=priorities[i % len(priorities)]
+            )
+            for project in projects for i in range(options['tasks'])
+        ])
+        Task.tags.through.objects.bulk_create([
+            Task.tags.through(task_id=task.id, tag_id=tags[i % len(tags)].id)
+            for i, task in enumerate(tasks)
+        ])
+        ProjectStats.rebuild([project.id for project in projects])
+        ProjectMember.backfill([project.id for project in projects])
+        return {
+            'user': user,
+            'user_id': user.id,
+            'job_id': Job.objects.create(kind='rebuild_project_stats', user=user, status=Job.DONE).id,
+            'project_id': projects[0].id,
+            'task_id': tasks[0].id,
+            'tag_id': tags[0].id,
+        }
+
+    def check_views(self, seed):
+        client = Client(SERVER_NAME='localhost')
+        client.force_login(seed['user'])
+        for pattern in main_app_urls.urlpatterns:
+            kwargs = {name: seed[name] for name in pattern.pattern.converters}
+            url = reverse(f'{main_app_urls.app_name}:{pattern.name}', kwargs=kwargs)
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            for query in ctx.captured_queries:
+                self.check_query(url, query['sql'])
+
+    def check_query(self, url, sql):
+        if not sql.lstrip().upper().startswith('SELECT'):
+            return
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = [row[-1] for row in cursor.fetchall()]
+                scans = [line for line in plan if self.is_sqlite_scan(line)]
+            else:
+                cursor.execute(f'EXPLAIN {sql}')
+                plan = [row[0] for row in cursor.fetchall()]
+                scans = [line for line in plan if self.is_seq_scan(line)]
+        for line in scans:
+            self.failures.append((url, sql, line))
+
+    def is_sqlite_scan(self, line):
+        # 'SCAN t USING [COVERING] INDEX i' still reads every entry of i; only SEARCH is a seek.
+        match = re.match(r'SCAN (\w+)', line)
+        return bool(match) and match.group(1) not in ALLOWED_SCANS
+
+    def is_seq_scan(self, line):
+        match = re.search(r'Seq Scan on (\w+)', line)
+        return bool(match) and match.group(1) not in ALLOWED_SCANS
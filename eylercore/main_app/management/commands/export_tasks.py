@@ -0,0 +1,34 @@
+import sys
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from main_app import exports
+from main_app.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Stream tasks with their project, tags and assignee as CSV or JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('--user', help='Only export projects owned by this username')
+        parser.add_argument('--project', type=int, help='Only export this project id')
+        parser.add_argument('--output', help='File to write instead of stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.all()
+        if options['user']:
+            try:
+                tasks = exports.user_tasks(User.objects.get(username=options['user']))
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']!r} does not exist")
+        if options['project']:
+            tasks = tasks.filter(project_id=options['project'])
+        rows = exports.export_rows(tasks, chunk_size=options['chunk_size'])
+        output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            for line in exports.render(rows, options['format']):
+                output.write(line)
+        finally:
+            if output is not sys.stdout:
+                output.close()
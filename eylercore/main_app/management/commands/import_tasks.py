@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from main_app import exports, imports
+from main_app.models import Project
+
+
+class Command(BaseCommand):
+    help = 'Bulk import tasks into a project from a CSV or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--project', type=int, required=True)
+        parser.add_argument('--format', choices=sorted(exports.FORMATS))
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            project = Project.objects.get(id=options['project'])
+        except Project.DoesNotExist:
+            raise CommandError(f"Project {options['project']} does not exist")
+        import_format = options['format'] or ('jsonl' if options['path'].endswith(('.jsonl', '.ndjson')) else 'csv')
+        importer = imports.TaskImporter(project, batch_size=options['batch_size'])
+        with open(options['path'], newline='', encoding='utf-8') as stream:
+            report = importer.run(imports.read_rows(stream, import_format))
+        for error in report['errors']:
+            self.stderr.write(f"Line {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} tasks ({report['error_count']} rejected) "
+            f"in {report['seconds']}s, {report['rows_per_second']} rows/sec"
+        ))
@@ -0,0 +1,82 @@
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.test import Client
+from django.urls import reverse
+from main_app.management.scratch import scratch_database, seed_project, use_database
+
+# Django's stock SQLite setup: rollback journal, full fsync, deferred transactions.
+BASELINE_OPTIONS = {'init_command': 'PRAGMA journal_mode=DELETE; PRAGMA synchronous=FULL'}
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent read/write throughput of the stock and tuned SQLite settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--tasks', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('load_test compares SQLite settings only')
+        tuned = connections.settings['default'].get('OPTIONS', {})
+        with scratch_database() as path:
+            self.user, self.project, self.task_ids = seed_project(options['tasks'])
+            for name, db_options in [('baseline', BASELINE_OPTIONS), ('tuned', tuned)]:
+                use_database(path, db_options)
+                results = self.run_phase(options)
+                self.stdout.write(
+                    f"{name:>8}: {results['reads'] / options['seconds']:8.1f} reads/s "
+                    f"{results['writes'] / options['seconds']:8.1f} writes/s "
+                    f"{results['errors']} locked errors"
+                )
+
+    def run_phase(self, options):
+        results = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+        read_urls = [
+            reverse('main_app:projects_index'),
+            reverse('main_app:projects_detail', args=[self.project.id]),
+            reverse('main_app:tasks_index', args=[self.project.id]),
+        ]
+
+        def worker(kind, number, client):
+            count = errors = 0
+            while time.monotonic() < deadline:
+                try:
+                    if kind == 'reads':
+                        client.get(read_urls[count % len(read_urls)])
+                    elif count % 2:
+                        task_id = self.task_ids[(number + count) % len(self.task_ids)]
+                        client.post(reverse('main_app:edit_task', args=[self.project.id, task_id]), {
+                            'title': f'Edited {count}', 'status': 'review', 'priority': 'high',
+                        })
+                    else:
+                        client.post(reverse('main_app:add_task', args=[self.project.id]), {
+                            'title': f'Added {count}', 'status': 'todo', 'priority': 'low',
+                        })
+                    count += 1
+                except OperationalError:
+                    errors += 1
+            connections.close_all()
+            with lock:
+                results[kind] += count
+                results['errors'] += errors
+
+        threads = []
+        for kind in ('reads', 'writes'):
+            for number in range(options['readers' if kind == 'reads' else 'writers']):
+                # Logging in up front keeps session writes out of the measured window.
+                client = Client(SERVER_NAME='localhost')
+                client.force_login(self.user)
+                threads.append(threading.Thread(target=worker, args=(kind, number, client)))
+        connections.close_all()
+        deadline = time.monotonic() + options['seconds']
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
@@ -0,0 +1,19 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from main_app import activity
+
+
+class Command(BaseCommand):
+    help = 'Delete task activity entries older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Keep this many days of activity (default ACTIVITY_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Entries deleted per transaction')
+
+    def handle(self, *args, **options):
+        days = options['days'] or activity.retention_days()
+        removed = activity.prune(timezone.now() - timedelta(days=days), options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {removed} activity entries older than {days} days'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from main_app import purge
+
+
+class Command(BaseCommand):
+    help = 'Purge soft-deleted projects whose background purge never finished'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Tasks deleted per transaction (default PROJECT_PURGE_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        purged = purge.purge_deleted(options['batch_size'])
+        for project_id, result in purged.items():
+            self.stdout.write(
+                f"Project {project_id}: {result['tasks']} tasks, {result['tag_links']} tag links, "
+                f"{result['activity']} activity entries in {result['seconds']}s"
+            )
+        self.stdout.write(self.style.SUCCESS(f'Purged {len(purged)} projects'))
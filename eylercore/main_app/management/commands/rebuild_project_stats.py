@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from main_app.models import ProjectStats
+
+
+class Command(BaseCommand):
+    help = 'Recompute ProjectStats from the task table, or check them for drift with --check'
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_ids', nargs='*', type=int)
+        parser.add_argument('--check', action='store_true', help='Report drift instead of rebuilding')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        project_ids = options['project_ids'] or None
+        if options['check']:
+            drift = list(ProjectStats.find_drift(project_ids))
+            for project_id, field, stored, actual in drift:
+                self.stderr.write(f'Project {project_id}: {field} is {stored}, expected {actual}')
+            if drift:
+                raise CommandError(f'{len(drift)} stale ProjectStats values')
+            self.stdout.write(self.style.SUCCESS('ProjectStats are consistent'))
+            return
+        rebuilt = ProjectStats.rebuild(project_ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {rebuilt} projects'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from main_app import search
+
+
+class Command(BaseCommand):
+    help = 'Refill the full-text search tables from the task and project tables (after loaddata, say)'
+
+    def handle(self, *args, **options):
+        search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Rebuilt the search index'))
@@ -0,0 +1,55 @@
+import json
+from pathlib import Path
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from main_app import benchmark
+from main_app.management.scratch import scratch_database
+
+BASELINE = Path(benchmark.__file__).with_name('benchmark_baseline.json')
+
+
+class Command(BaseCommand):
+    help = 'Drive every main_app URL against seeded data and compare with the stored baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--projects-per-user', type=int, default=5)
+        parser.add_argument('--tasks-per-project', type=int, default=200)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--tolerance', type=float, default=0.5,
+                            help='Allowed p50 slowdown as a fraction of the baseline')
+        parser.add_argument('--baseline', default=str(BASELINE))
+        parser.add_argument('--update-baseline', action='store_true')
+
+    def handle(self, *args, **options):
+        volumes = {
+            name: options[name]
+            for name in ['users', 'projects_per_user', 'tasks_per_project', 'tags']
+        }
+        with scratch_database(), override_settings(REQUEST_METRICS=True):
+            benchmark.seed(**volumes)
+            user = User.objects.get(username=f'{benchmark.USERNAME_PREFIX}0')
+            results = benchmark.run(Client(SERVER_NAME='localhost'), user, options['iterations'])
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<36} {result['queries']:>3} queries  p50 {result['p50_ms']:>8.2f}ms  "
+                f"p95 {result['p95_ms']:>8.2f}ms  {result['status']}"
+            )
+        path = Path(options['baseline'])
+        if options['update_baseline']:
+            path.write_text(json.dumps({'volumes': volumes, 'views': results}, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Wrote {path}'))
+            return
+        if not path.exists():
+            raise CommandError(f'No baseline at {path}; run with --update-baseline first')
+        baseline = json.loads(path.read_text())
+        if baseline['volumes'] != volumes:
+            self.stderr.write(f"Baseline was recorded with {baseline['volumes']}; latencies may not compare")
+        regressions = benchmark.compare(results, baseline['views'], options['tolerance'])
+        for regression in regressions:
+            self.stderr.write(regression)
+        if regressions:
+            raise CommandError(f'{len(regressions)} regressions against {path}')
+        self.stdout.write(self.style.SUCCESS('No regressions'))
@@ -0,0 +1,36 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connections
+from main_app import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        arguments = (options['poll_interval'], options['burst'])
+        if options['processes'] == 1:
+            processed = jobs.work(*arguments)
+        else:
+            # Forked children inherit the loaded settings and app registry; the
+            # parent's connections are closed first so none is shared.
+            connections.close_all()
+            pool = ProcessPoolExecutor(
+                max_workers=options['processes'], mp_context=multiprocessing.get_context('fork')
+            )
+            try:
+                with pool:
+                    futures = [pool.submit(jobs.work, *arguments) for _ in range(options['processes'])]
+                    processed = sum(future.result() for future in futures)
+            except KeyboardInterrupt:
+                pool.shutdown(wait=False, cancel_futures=True)
+                return
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} jobs'))
@@ -0,0 +1,31 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from main_app import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Generate benchmark users, projects, tasks and tags with bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--projects-per-user', type=int, default=5)
+        parser.add_argument('--tasks-per-project', type=int, default=200)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith=benchmark.USERNAME_PREFIX).exists():
+            raise CommandError(f'Benchmark users ({benchmark.USERNAME_PREFIX}*) already exist')
+        start = time.perf_counter()
+        with transaction.atomic():
+            counts = benchmark.seed(
+                users=options['users'],
+                projects_per_user=options['projects_per_user'],
+                tasks_per_project=options['tasks_per_project'],
+                tags=options['tags'],
+                rng_seed=options['seed'],
+            )
+        summary = ', '.join(f'{count} {name}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Seeded {summary} in {time.perf_counter() - start:.1f}s'))
@@ -0,0 +1,46 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connections
+from main_app import search
+from main_app.models import Project, ProjectStats, Task
+
+# Helpers for the benchmark commands, which run against a throwaway SQLite file
+# so the real database is never touched.
+
+
+def use_database(name, options):
+    connections.close_all()
+    connections.settings['default']['NAME'] = name
+    connections.settings['default']['OPTIONS'] = dict(options)
+
+
+@contextmanager
+def scratch_database():
+    database = connections.settings['default']
+    original = database['NAME'], database.get('OPTIONS', {})
+    fd, path = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(fd)
+    try:
+        use_database(path, original[1])
+        call_command('migrate', verbosity=0)
+        yield path
+    finally:
+        use_database(*original)
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def seed_project(task_count, username='load-test'):
+    user = User.objects.create_user(username=username, password=username)
+    project = Project.objects.create(name='Load test', description='Seeded', user=user)
+    Task.objects.bulk_create([
+        Task(title=f'Task {i}', project=project, status=['todo', 'done'][i % 2])
+        for i in range(task_count)
+    ])
+    ProjectStats.rebuild([project.id])
+    search.rebuild_index()
+    return user, project, list(Task.objects.values_list('id', flat=True))
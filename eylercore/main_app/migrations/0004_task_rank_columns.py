@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+STATUS_RANKS = {'todo': 1, 'in_progress': 2, 'review': 3, 'done': 4}
+PRIORITY_RANKS = {'low': 1, 'medium': 2, 'high': 3, 'urgent': 4}
+
+
+def fill_ranks(apps, schema_editor):
+    Task = apps.get_model('main_app', 'Task')
+    for status, rank in STATUS_RANKS.items():
+        Task.objects.filter(status=status).update(status_rank=rank)
+    for priority, rank in PRIORITY_RANKS.items():
+        Task.objects.filter(priority=priority).update(priority_rank=rank)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0003_alter_tag_created_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='task',
+            options={'ordering': ['-priority_rank', 'due_date', 'created_at']},
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='priority_rank',
+            field=models.PositiveSmallIntegerField(default=2, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='status_rank',
+            field=models.PositiveSmallIntegerField(default=1, editable=False),
+        ),
+        migrations.RunPython(fill_ranks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', '-priority_rank', 'due_date', 'created_at'], name='task_project_priority_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0004_task_rank_columns'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['user', '-created_at'], name='project_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'status', 'due_date'], name='task_assignee_status_due_idx'),
+        ),
+        # The auto-created Task.tags table only has (task_id, tag_id) unique plus
+        # single-column FK indexes; tag -> tasks lookups want the reverse pair.
+        migrations.RunSQL(
+            'CREATE INDEX task_tags_tag_task_idx ON main_app_task_tags (tag_id, task_id)',
+            'DROP INDEX task_tags_tag_task_idx',
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:44
+
+import datetime
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def create_stale_stats(apps, schema_editor):
+    # Rows start out stale so ProjectStats.ensure_fresh() (or rebuild_project_stats)
+    # fills in the real counts on first read.
+    Project = apps.get_model('main_app', 'Project')
+    ProjectStats = apps.get_model('main_app', 'ProjectStats')
+    ProjectStats.objects.bulk_create(
+        [ProjectStats(project_id=project_id, overdue_as_of=datetime.date.min)
+         for project_id in Project.objects.values_list('id', flat=True)],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0005_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectStats',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='main_app.project')),
+                ('task_count', models.IntegerField(default=0)),
+                ('todo_count', models.IntegerField(default=0)),
+                ('in_progress_count', models.IntegerField(default=0)),
+                ('review_count', models.IntegerField(default=0)),
+                ('done_count', models.IntegerField(default=0)),
+                ('low_priority_count', models.IntegerField(default=0)),
+                ('medium_priority_count', models.IntegerField(default=0)),
+                ('high_priority_count', models.IntegerField(default=0)),
+                ('urgent_priority_count', models.IntegerField(default=0)),
+                ('overdue_count', models.IntegerField(default=0)),
+                ('next_due_date', models.DateField(blank=True, null=True)),
+                ('overdue_as_of', models.DateField(default=django.utils.timezone.localdate)),
+                ('last_activity_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(create_stale_stats, migrations.RunPython.noop),
+    ]
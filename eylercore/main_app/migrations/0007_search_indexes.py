@@ -0,0 +1,59 @@
+from django.db import migrations
+
+# The SQL is written out here rather than taken from main_app.search, so later
+# changes to that module can't change what this migration did.
+SQLITE_FORWARDS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS main_app_task_fts "
+    "USING fts5(owner, title, description, tokenize='unicode61')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS main_app_project_fts "
+    "USING fts5(owner, name, description, tokenize='unicode61')",
+    "INSERT INTO main_app_task_fts(rowid, owner, title, description) "
+    "SELECT t.id, 'u' || p.user_id, t.title, t.description "
+    "FROM main_app_task t JOIN main_app_project p ON p.id = t.project_id",
+    "INSERT INTO main_app_project_fts(rowid, owner, name, description) "
+    "SELECT id, 'u' || user_id, name, description FROM main_app_project",
+]
+SQLITE_BACKWARDS = [
+    'DROP TABLE IF EXISTS main_app_task_fts',
+    'DROP TABLE IF EXISTS main_app_project_fts',
+]
+POSTGRESQL_FORWARDS = [
+    "CREATE INDEX IF NOT EXISTS main_app_task_search_idx ON main_app_task USING GIN "
+    "((to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, ''))))",
+    "CREATE INDEX IF NOT EXISTS main_app_project_search_idx ON main_app_project USING GIN "
+    "((to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, ''))))",
+]
+POSTGRESQL_BACKWARDS = [
+    'DROP INDEX IF EXISTS main_app_task_search_idx',
+    'DROP INDEX IF EXISTS main_app_project_search_idx',
+]
+
+STATEMENTS = {
+    'sqlite': (SQLITE_FORWARDS, SQLITE_BACKWARDS),
+    'postgresql': (POSTGRESQL_FORWARDS, POSTGRESQL_BACKWARDS),
+}
+
+
+def run(schema_editor, backwards):
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    for sql in statements[backwards] if statements else []:
+        schema_editor.execute(sql)
+
+
+def create_search_indexes(apps, schema_editor):
+    run(schema_editor, backwards=False)
+
+
+def drop_search_indexes(apps, schema_editor):
+    run(schema_editor, backwards=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0006_project_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
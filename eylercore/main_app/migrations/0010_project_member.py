@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def add_existing_members(apps, schema_editor):
+    # Owners, plus everyone already assigned a task, so no assignment becomes invalid.
+    Project = apps.get_model('main_app', 'Project')
+    Task = apps.get_model('main_app', 'Task')
+    ProjectMember = apps.get_model('main_app', 'ProjectMember')
+    pairs = set(Project.objects.values_list('id', 'user_id', 'user__username'))
+    pairs.update(Task.objects.filter(assigned_to__isnull=False).values_list(
+        'project_id', 'assigned_to_id', 'assigned_to__username'
+    ).distinct())
+    ProjectMember.objects.bulk_create(
+        [ProjectMember(project_id=project_id, user_id=user_id, search_name=username.casefold())
+         for project_id, user_id, username in pairs],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0009_task_project_updated_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('search_name', models.CharField(max_length=150)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='main_app.project')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='project_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'search_name'], name='member_project_search_idx')],
+                'constraints': [models.UniqueConstraint(fields=('project', 'user'), name='project_member_unique')],
+            },
+        ),
+        migrations.RunPython(add_existing_members, migrations.RunPython.noop),
+    ]
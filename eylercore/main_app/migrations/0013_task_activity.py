@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:58
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0012_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, 'Created'), (2, 'Updated'), (3, 'Deleted')])),
+                ('status', models.CharField(blank=True, choices=[('todo', '📝 To Do'), ('in_progress', '⚡ In Progress'), ('review', '👁️ Review'), ('done', '✅ Done')], max_length=20)),
+                ('changes', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='main_app.project')),
+                ('task', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='activity', to='main_app.task')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'created_at'], name='activity_project_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0013_task_activity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'done'), _negated=True), fields=['assigned_to', 'due_date', 'id'], name='task_assignee_open_due_idx'),
+        ),
+    ]
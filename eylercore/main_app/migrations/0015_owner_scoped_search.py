@@ -0,0 +1,69 @@
+import re
+from django.db import migrations
+
+# Rebuilds the FTS5 tables from 0007 with each word stored behind its owner
+# ("u<user id>_<word>"), so a user's search reads only their own postings.
+# The SQL and the word splitting are written out here so later changes to
+# main_app.search can't change what this migration did.
+WORD = re.compile(r'[^\W_]+')
+BATCH_SIZE = 5000
+
+TABLES = [
+    (
+        'main_app_task_fts', ['title', 'description'],
+        "SELECT t.id, p.user_id, t.title, t.description "
+        "FROM main_app_task t JOIN main_app_project p ON p.id = t.project_id",
+    ),
+    (
+        'main_app_project_fts', ['name', 'description'],
+        "SELECT id, user_id, name, description FROM main_app_project",
+    ),
+]
+
+
+def owned_text(owner_id, text):
+    return ' '.join(f'u{owner_id}_{word}' for word in WORD.findall(text or ''))
+
+
+def owned_row(object_id, owner_id, *values):
+    return [object_id] + [owned_text(owner_id, value) for value in values]
+
+
+def owner_row(object_id, owner_id, *values):
+    # 0007's layout: an owner token column and the text as it is.
+    return [object_id, f'u{owner_id}', *values]
+
+
+def rebuild(schema_editor, owner_column, tokenize, make_row):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor, schema_editor.connection.cursor() as writer:
+        for table, columns, source in TABLES:
+            fields = ', '.join(['owner', *columns] if owner_column else columns)
+            placeholders = ', '.join(['%s'] * (len(columns) + 1 + owner_column))
+            cursor.execute(f'DROP TABLE IF EXISTS {table}')
+            cursor.execute(f'CREATE VIRTUAL TABLE {table} USING fts5({fields}, tokenize={tokenize})')
+            cursor.execute(source)
+            while rows := cursor.fetchmany(BATCH_SIZE):
+                writer.executemany(
+                    f'INSERT INTO {table}(rowid, {fields}) VALUES ({placeholders})', [make_row(*row) for row in rows]
+                )
+
+
+def forwards(apps, schema_editor):
+    rebuild(schema_editor, False, '"unicode61 tokenchars \'_\'"', owned_row)
+
+
+def backwards(apps, schema_editor):
+    rebuild(schema_editor, True, "'unicode61'", owner_row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0014_task_assignee_open_due_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -1,24 +1,125 @@
-from django.db import models
+from collections import Counter, defaultdict, namedtuple
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import Count, F, Max, Min, OuterRef, Q, Subquery
+from django.db.models.query import ModelIterable
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth.models import User
 
+class ProjectQuerySet(models.QuerySet):
+    def with_task_summary(self):
+        today = timezone.localdate()
+        open_tasks = ~Q(tasks__status='done')
+        return self.annotate(
+            task_count=Count('tasks'),
+            todo_count=Count('tasks', filter=Q(tasks__status='todo')),
+            in_progress_count=Count('tasks', filter=Q(tasks__status='in_progress')),
+            review_count=Count('tasks', filter=Q(tasks__status='review')),
+            done_count=Count('tasks', filter=Q(tasks__status='done')),
+            low_priority_count=Count('tasks', filter=Q(tasks__priority='low')),
+            medium_priority_count=Count('tasks', filter=Q(tasks__priority='medium')),
+            high_priority_count=Count('tasks', filter=Q(tasks__priority='high')),
+            urgent_priority_count=Count('tasks', filter=Q(tasks__priority='urgent')),
+            overdue_count=Count('tasks', filter=open_tasks & Q(tasks__due_date__lt=today)),
+            next_due_date=Min('tasks__due_date', filter=open_tasks & Q(tasks__due_date__gte=today)),
+            last_task_update=Max('tasks__updated_at'),
+        )
+
+class ProjectManager(models.Manager.from_queryset(ProjectQuerySet)):
+    def get_queryset(self):
+        # Soft-deleted projects only wait for purge.purge_project(); nothing else sees them.
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 class Project(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    
+    objects = ProjectManager()
+    all_objects = ProjectQuerySet.as_manager()
     
     def __str__(self):
         return self.name
     
     def get_absolute_url(self):
         return reverse('projects_detail', kwargs={'project_id': self.id})
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='project_user_created_idx'),
+        ]
+
+class ProjectMemberQuerySet(models.QuerySet):
+    def search(self, prefix):
+        # A range over search_name rather than LIKE, so the (project, search_name)
+        # index serves the match and the ordering.
+        prefix = prefix.casefold()
+        members = self.order_by('search_name')
+        if prefix:
+            members = members.filter(search_name__gte=prefix, search_name__lt=prefix + '\U0010ffff')
+        return members
+
+class ProjectMember(models.Model):
+    """Who tasks in a project can be assigned to. The owner is always one."""
+    LISTING_KEYS = [('search_name', False), ('id', False)]
+    
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='memberships')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='project_memberships')
+    # The username casefolded, kept in step by a User post_save signal.
+    search_name = models.CharField(max_length=150)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = ProjectMemberQuerySet.as_manager()
+    
+    def __str__(self):
+        return f'{self.user} in {self.project}'
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'user'], name='project_member_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['project', 'search_name'], name='member_project_search_idx'),
+        ]
+    
+    @classmethod
+    def add(cls, project_id, users):
+        return cls.objects.bulk_create([
+            cls(project_id=project_id, user_id=user.id, search_name=user.username.casefold())
+            for user in users
+        ], ignore_conflicts=True)
+    
+    @classmethod
+    def backfill(cls, project_ids):
+        """Owners and current assignees, for projects whose rows skipped the signals."""
+        pairs = set(Project.objects.filter(id__in=project_ids).values_list('id', 'user_id', 'user__username'))
+        pairs.update(Task.objects.filter(project_id__in=project_ids, assigned_to__isnull=False).values_list(
+            'project_id', 'assigned_to_id', 'assigned_to__username'
+        ).distinct())
+        return cls.objects.bulk_create([
+            cls(project_id=project_id, user_id=user_id, search_name=username.casefold())
+            for project_id, user_id, username in pairs
+        ], batch_size=500, ignore_conflicts=True)
+
+class TagQuerySet(models.QuerySet):
+    def for_project(self, project):
+        # Grouped over the Task.tags through table joined to the project's tasks.
+        return self.filter(tasks__project=project).annotate(
+            usage_count=Count('tasks')
+        ).order_by('-usage_count', 'name')
 
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
     color = models.CharField(max_length=7, default='#8b0000')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = TagQuerySet.as_manager()
     
     def __str__(self):
         return self.name
@@ -26,6 +127,52 @@ class Tag(models.Model):
     class Meta:
         ordering = ['name']
 
+class TaskQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        if 'status' in kwargs:
+            kwargs['status_rank'] = Task.STATUS_RANKS[kwargs['status']]
+        if 'priority' in kwargs:
+            kwargs['priority_rank'] = Task.PRIORITY_RANKS[kwargs['priority']]
+        return super().update(**kwargs)
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.set_ranks()
+        return super().bulk_create(objs, *args, **kwargs)
+    
+    def owned_by(self, user):
+        return self.filter(project__user=user, project__deleted_at__isnull=True)
+    
+    def for_listing(self):
+        """
+        What a task list renders: the assignee joined, and task.tag_list set
+        from the tag catalogue with one query over the through table once the
+        rows are loaded (sync or async).
+        """
+        clone = self.select_related('assigned_to')
+        clone.with_tag_list = True
+        return clone
+    
+    with_tag_list = False
+    
+    def _clone(self):
+        clone = super()._clone()
+        clone.with_tag_list = self.with_tag_list
+        return clone
+    
+    def _fetch_all(self):
+        loading = self._result_cache is None
+        super()._fetch_all()
+        if loading and self.with_tag_list and self._iterable_class is ModelIterable:
+            from . import tag_catalogue
+            tag_catalogue.attach(self._result_cache)
+
+TaskState = namedtuple('TaskState', ['project_id', 'status', 'priority', 'due_date'])
+
+# Fields whose changes go to the activity log, by attname.
+ACTIVITY_FIELDS = ['project_id', 'title', 'description', 'status', 'priority', 'due_date', 'assigned_to_id']
+
 class Task(models.Model):
     STATUS_CHOICES = [
         ('todo', '📝 To Do'),
@@ -41,10 +188,19 @@ class Task(models.Model):
         ('urgent', '⚡ Urgent'),
     ]
     
+    # Ranks follow the order of the choices above and are what the database sorts on.
+    STATUS_RANKS = {value: rank for rank, (value, label) in enumerate(STATUS_CHOICES, start=1)}
+    PRIORITY_RANKS = {value: rank for rank, (value, label) in enumerate(PRIORITY_CHOICES, start=1)}
+    
+    # Meta.ordering plus the primary key as a tiebreaker, used for keyset pages.
+    LISTING_KEYS = [('priority_rank', True), ('due_date', False), ('created_at', False), ('id', False)]
+    
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='todo')
     priority = models.CharField(max_length=20, choices=PRIORITY_CHOICES, default='medium')
+    status_rank = models.PositiveSmallIntegerField(default=1, editable=False)
+    priority_rank = models.PositiveSmallIntegerField(default=2, editable=False)
     due_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -52,11 +208,296 @@ class Task(models.Model):
     tags = models.ManyToManyField(Tag, blank=True, related_name='tasks')
     assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_tasks')
     
+    objects = TaskQuerySet.as_manager()
+    
     def __str__(self):
         return self.title
     
     def get_absolute_url(self):
         return reverse('task_detail', kwargs={'task_id': self.id})
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        deferred = instance.get_deferred_fields()
+        if not deferred & set(TaskState._fields):
+            instance._stats_state = instance.stats_state()
+        instance._activity_state = instance.activity_state(deferred)
+        return instance
+    
+    def stats_state(self):
+        return TaskState(self.project_id, self.status, self.priority, self.due_date)
+    
+    def activity_state(self, deferred=()):
+        return {name: getattr(self, name) for name in ACTIVITY_FIELDS if name not in deferred}
+    
+    def set_ranks(self):
+        self.status_rank = self.STATUS_RANKS[self.status]
+        self.priority_rank = self.PRIORITY_RANKS[self.priority]
+    
+    def save(self, *args, **kwargs):
+        self.set_ranks()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'status' in update_fields:
+                update_fields.add('status_rank')
+            if 'priority' in update_fields:
+                update_fields.add('priority_rank')
+            kwargs['update_fields'] = update_fields
+        # Keeps the ProjectStats update from the post_save signal in the same transaction.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+    
+    class Meta:
+        ordering = ['-priority_rank', 'due_date', 'created_at']
+        indexes = [
+            models.Index(
+                fields=['project', '-priority_rank', 'due_date', 'created_at'],
+                name='task_project_priority_idx'
+            ),
+            models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+            models.Index(fields=['assigned_to', 'status', 'due_date'], name='task_assignee_status_due_idx'),
+            # The inbox: open tasks of one assignee in due date order, read off the index.
+            models.Index(
+                fields=['assigned_to', 'due_date', 'id'], condition=~models.Q(status='done'),
+                name='task_assignee_open_due_idx'
+            ),
+            models.Index(fields=['project', 'updated_at'], name='task_project_updated_idx'),
+        ]
+
+class ProjectStats(models.Model):
+    COUNTER_FIELDS = [
+        'task_count', 'todo_count', 'in_progress_count', 'review_count', 'done_count',
+        'low_priority_count', 'medium_priority_count', 'high_priority_count', 'urgent_priority_count',
+        'overdue_count',
+    ]
+    
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    task_count = models.IntegerField(default=0)
+    todo_count = models.IntegerField(default=0)
+    in_progress_count = models.IntegerField(default=0)
+    review_count = models.IntegerField(default=0)
+    done_count = models.IntegerField(default=0)
+    low_priority_count = models.IntegerField(default=0)
+    medium_priority_count = models.IntegerField(default=0)
+    high_priority_count = models.IntegerField(default=0)
+    urgent_priority_count = models.IntegerField(default=0)
+    overdue_count = models.IntegerField(default=0)
+    next_due_date = models.DateField(null=True, blank=True)
+    # overdue_count and next_due_date depend on the date, so they are rebuilt once it moves on.
+    overdue_as_of = models.DateField(default=timezone.localdate)
+    last_activity_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f'Stats for {self.project}'
+    
+    @staticmethod
+    def counters_for(state, today):
+        fields = ['task_count', f'{state.status}_count', f'{state.priority}_priority_count']
+        if state.status != 'done' and state.due_date and state.due_date < today:
+            fields.append('overdue_count')
+        return fields
+    
+    @staticmethod
+    def next_due_date_subquery(today):
+        return Subquery(
+            Task.objects.filter(project=OuterRef('project'), due_date__gte=today)
+            .exclude(status='done').order_by('due_date').values('due_date')[:1]
+        )
+    
+    @classmethod
+    def apply_changes(cls, changes, now=None):
+        """
+        Move the counters by (old, new) TaskState pairs, None on either side for
+        a created or deleted task, with one UPDATE per project touched.
+        """
+        today = timezone.localdate()
+        deltas = defaultdict(Counter)
+        touches_due_date = set()
+        for old, new in changes:
+            for state, sign in ((old, -1), (new, 1)):
+                if state:
+                    for field in cls.counters_for(state, today):
+                        deltas[state.project_id][field] += sign
+                    if state.due_date:
+                        touches_due_date.add(state.project_id)
+        for project_id, counter in deltas.items():
+            updates = {field: F(field) + delta for field, delta in counter.items() if delta}
+            if project_id in touches_due_date:
+                updates['next_due_date'] = cls.next_due_date_subquery(today)
+            cls.objects.filter(project_id=project_id).update(
+                last_activity_at=now or timezone.now(), **updates
+            )
+    
+    @classmethod
+    def rebuild(cls, project_ids=None, batch_size=500):
+        projects = Project.objects.order_by()
+        if project_ids is not None:
+            projects = projects.filter(id__in=project_ids)
+        today = timezone.localdate()
+        rebuilt = 0
+        batch = []
+        for project in projects.with_task_summary().iterator(chunk_size=batch_size):
+            batch.append(cls(
+                project_id=project.id,
+                next_due_date=project.next_due_date,
+                overdue_as_of=today,
+                last_activity_at=project.last_task_update or project.updated_at,
+                **{field: getattr(project, field) for field in cls.COUNTER_FIELDS}
+            ))
+            if len(batch) >= batch_size:
+                rebuilt += cls._upsert(batch)
+                batch = []
+        if batch:
+            rebuilt += cls._upsert(batch)
+        return rebuilt
+    
+    @classmethod
+    def _upsert(cls, batch):
+        cls.objects.bulk_create(
+            batch, update_conflicts=True, unique_fields=['project'],
+            update_fields=cls.COUNTER_FIELDS + ['next_due_date', 'overdue_as_of', 'last_activity_at'],
+        )
+        return len(batch)
+    
+    @classmethod
+    def find_drift(cls, project_ids=None):
+        projects = Project.objects.order_by().select_related('stats')
+        if project_ids is not None:
+            projects = projects.filter(id__in=project_ids)
+        for project in projects.with_task_summary().iterator(chunk_size=500):
+            stats = getattr(project, 'stats', None)
+            if stats is None:
+                yield project.id, 'stats', None, 'missing'
+                continue
+            for field in cls.COUNTER_FIELDS + ['next_due_date']:
+                stored, actual = getattr(stats, field), getattr(project, field)
+                if stored != actual:
+                    yield project.id, field, stored, actual
+    
+    @classmethod
+    def stale_ids(cls, projects):
+        today = timezone.localdate()
+        return [
+            project.id for project in projects
+            if getattr(project, 'stats', None) is None or project.stats.overdue_as_of < today
+        ]
+    
+    @classmethod
+    def attach(cls, projects, fresh):
+        for project in projects:
+            if project.id in fresh:
+                project.stats = fresh[project.id]
+        return projects
+    
+    @classmethod
+    def ensure_fresh(cls, projects):
+        stale = cls.stale_ids(projects)
+        if stale:
+            cls.rebuild(stale)
+            cls.attach(projects, cls.objects.in_bulk(stale))
+        return projects
+    
+    @classmethod
+    async def aensure_fresh(cls, projects):
+        stale = cls.stale_ids(projects)
+        if stale:
+            # The upsert is rare (once a day per project), so it runs in a thread.
+            await sync_to_async(cls.rebuild)(stale)
+            cls.attach(projects, await cls.objects.ain_bulk(stale))
+        return projects
+
+
+class Job(models.Model):
+    """A unit of background work, claimed and run by manage.py run_workers."""
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    # Also the heartbeat: progress reports move it, so only stuck jobs look stale.
+    locked_at = models.DateTimeField(null=True, blank=True)
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f'{self.kind} #{self.id} ({self.status})'
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_claim_idx'),
+        ]
+    
+    def report_progress(self, done, total=None):
+        self.progress_done = done
+        if total is not None:
+            self.progress_total = total
+        Job.objects.filter(id=self.id).update(
+            progress_done=done, progress_total=self.progress_total, locked_at=timezone.now()
+        )
+    
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': {'done': self.progress_done, 'total': self.progress_total},
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'result': self.result,
+            'error': self.error.strip().splitlines()[-1] if self.error else None,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class TaskActivity(models.Model):
+    """
+    Append-only history of task changes, one row per save, delete or tag
+    change. Written by main_app.activity.
+    """
+    CREATED, UPDATED, DELETED = 1, 2, 3
+    KIND_CHOICES = [
+        (CREATED, 'Created'),
+        (UPDATED, 'Updated'),
+        (DELETED, 'Deleted'),
+    ]
+    
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='activity')
+    # No database constraint: a deleted task's history is kept.
+    task = models.ForeignKey(Task, on_delete=models.DO_NOTHING, db_constraint=False, related_name='activity')
+    kind = models.PositiveSmallIntegerField(choices=KIND_CHOICES)
+    # The status the task moved to, blank when it didn't move. Reports filter
+    # on it, so it is a column rather than a key in changes.
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES, blank=True)
+    # Only what changed, by field name, with the new value.
+    changes = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f'{self.get_kind_display()} task #{self.task_id}'
+    
     class Meta:
-        ordering = ['-priority', 'due_date', 'created_at']
\ No newline at end of file
+        indexes = [
+            models.Index(fields=['project', 'created_at'], name='activity_project_created_idx'),
+        ]
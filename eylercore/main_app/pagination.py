@@ -0,0 +1,96 @@
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+
+
+def keyset_order(keys):
+    return [f'-{name}' if descending else name for name, descending in keys]
+
+
+def keyset_filter(model, keys, values, nulls_largest):
+    # Lexicographic "comes after" for the plain ORDER BY of keyset_order().
+    # NULLs are left where the backend puts them natively so the ordering can
+    # be read straight off an index; every branch is a plain comparison or
+    # IS NULL on an ordering column, which keeps the predicate sargable.
+    (name, descending), rest = keys[0], keys[1:]
+    value = values[0]
+    nulls_last = descending != nulls_largest
+    nullable = model._meta.get_field(name).null
+    after_rest = keyset_filter(model, rest, values[1:], nulls_largest) if rest else Q(pk__in=[])
+    if value is None:
+        condition = Q(**{f'{name}__isnull': True}) & after_rest
+        if not nulls_last:
+            condition |= Q(**{f'{name}__isnull': False})
+        return condition
+    lookup = 'lt' if descending else 'gt'
+    condition = Q(**{f'{name}__{lookup}': value}) | (Q(**{name: value}) & after_rest)
+    if nullable and nulls_last:
+        condition |= Q(**{f'{name}__isnull': True})
+    return condition
+
+
+def keyset_bound(model, keys, values, nulls_largest):
+    # The predicate above is an OR of branches, which SQLite (and others) can't
+    # turn into an index range. This redundant bound on the leading key can be,
+    # so a later page seeks to the cursor instead of walking the index up to it.
+    (name, descending), value = keys[0], values[0]
+    if value is None:
+        return Q()
+    condition = Q(**{f'{name}__{"lte" if descending else "gte"}': value})
+    if model._meta.get_field(name).null and descending != nulls_largest:
+        condition |= Q(**{f'{name}__isnull': True})
+    return condition
+
+
+def encode_cursor(obj, keys):
+    values = []
+    for name, _ in keys:
+        value = getattr(obj, name)
+        values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(model, keys, cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(values) != len(keys):
+            return None
+        return [
+            None if value is None else model._meta.get_field(name).to_python(value)
+            for (name, _), value in zip(keys, values)
+        ]
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def keyset_page_queryset(queryset, keys, cursor=None):
+    queryset = queryset.order_by(*keyset_order(keys))
+    if cursor:
+        values = decode_cursor(queryset.model, keys, cursor)
+        if values is not None:
+            nulls_largest = connections[queryset.db].features.nulls_order_largest
+            queryset = queryset.filter(
+                keyset_bound(queryset.model, keys, values, nulls_largest),
+                keyset_filter(queryset.model, keys, values, nulls_largest),
+            )
+    return queryset
+
+
+def split_page(items, keys, page_size):
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor(items[-1], keys)
+    return items, next_cursor
+
+
+def paginate_keyset(queryset, keys, cursor=None, page_size=50):
+    queryset = keyset_page_queryset(queryset, keys, cursor)
+    return split_page(list(queryset[:page_size + 1]), keys, page_size)
+
+
+async def apaginate_keyset(queryset, keys, cursor=None, page_size=50):
+    queryset = keyset_page_queryset(queryset, keys, cursor)
+    return split_page([item async for item in queryset[:page_size + 1]], keys, page_size)
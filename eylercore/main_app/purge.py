@@ -0,0 +1,85 @@
+import time
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from . import fragment_cache, jobs, search
+from .models import Project, Task, TaskActivity
+
+# Deleting a project without Django's collector.
+#
+# project.delete() loads every task and tag link into memory so it can send
+# per-row signals; for a big project that is minutes inside one write
+# transaction. Here the links, tasks and activity entries go in id batches
+# with plain DELETEs, each batch its own transaction so other writers get the
+# database in between, and only the (by then empty) project goes through the
+# ORM delete. The per-task signals are skipped on purpose: what they maintain
+# (stats, fragment versions, search rows, the activity log) belongs to the
+# project and is removed with it.
+
+
+def batch_size():
+    return getattr(settings, 'PROJECT_PURGE_BATCH_SIZE', 1000)
+
+
+def purge_project(project_id, size=None, progress=None):
+    """Delete a project, soft-deleted or not, and return what was removed."""
+    size = size or batch_size()
+    start = time.perf_counter()
+    through = Task.tags.through
+    tasks = links = 0
+    total = Task.objects.filter(project_id=project_id).count() if progress else None
+    while True:
+        task_ids = list(
+            Task.objects.filter(project_id=project_id).order_by().values_list('id', flat=True)[:size]
+        )
+        if not task_ids:
+            break
+        with transaction.atomic():
+            links += through.objects.filter(task_id__in=task_ids)._raw_delete(through.objects.db)
+            tasks += Task.objects.filter(id__in=task_ids)._raw_delete(Task.objects.db)
+            search.unindex('task', task_ids)
+        if progress:
+            progress(tasks, total)
+    # The project's activity log, including that of tasks deleted earlier.
+    log = TaskActivity.objects.filter(project_id=project_id)
+    entries = 0
+    while True:
+        entry_ids = list(log.values_list('id', flat=True)[:size])
+        if not entry_ids:
+            break
+        with transaction.atomic():
+            entries += TaskActivity.objects.filter(id__in=entry_ids)._raw_delete(TaskActivity.objects.db)
+    # Memberships and stats cascade with single DELETEs; the post_delete
+    # signals drop the project's search row and fragment version.
+    project = Project.all_objects.filter(id=project_id).first()
+    if project is not None:
+        project.delete()
+    return {
+        'tasks': tasks,
+        'tag_links': links,
+        'activity': entries,
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def soft_delete(project, user=None):
+    """Hide the project now and queue its purge; returns the job."""
+    with transaction.atomic():
+        Project.all_objects.filter(id=project.id).update(deleted_at=timezone.now())
+        search.unindex('project', [project.id])
+        job = jobs.enqueue('purge_project', user=user, project_id=project.id)
+    fragment_cache.bump('project', project.id)
+    return job
+
+
+@jobs.handler('purge_project')
+def purge_job(job, project_id):
+    # Safe to retry: every batch is committed, and a rerun picks up what's left.
+    return purge_project(project_id, progress=job.report_progress)
+
+
+def purge_deleted(size=None):
+    return {
+        project_id: purge_project(project_id, size)
+        for project_id in Project.all_objects.filter(deleted_at__isnull=False).values_list('id', flat=True)
+    }
@@ -0,0 +1,186 @@
+import re
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from .models import Project
+
+# Full-text search over Task and Project.
+#
+# SQLite keeps an FTS5 table per model whose rowid is the model's id, kept in
+# sync from model signals (and explicitly by bulk paths). Every word is stored
+# with its owner in front ("u<user id>_<word>", '_' being a token character
+# there), so a user's query reads only their own postings: prefix expansion,
+# the document counts bm25 needs and the matches themselves stay the size of
+# one user's tasks rather than everyone's. PostgreSQL uses GIN expression
+# indexes over to_tsvector(), which need no syncing.
+#
+# Ranking is bounded too: bm25 scores the newest SEARCH_CANDIDATES matches, so
+# a term that appears in most of a user's tasks costs the same as a rarer one.
+# Results past that many are not offered.
+
+INDEXES = {
+    'task': {
+        'table': 'main_app_task', 'fts': 'main_app_task_fts', 'columns': ['title', 'description'],
+        'source_sql': (
+            "SELECT t.id, p.user_id, t.title, t.description "
+            "FROM main_app_task t JOIN main_app_project p ON p.id = t.project_id"
+        ),
+    },
+    'project': {
+        'table': 'main_app_project', 'fts': 'main_app_project_fts', 'columns': ['name', 'description'],
+        'source_sql': "SELECT id, user_id, name, description FROM main_app_project",
+    },
+}
+
+SEARCH_CANDIDATES = 1000
+REBUILD_BATCH_SIZE = 5000
+# Owners per MATCH when searching everyone's objects (the admin).
+OWNERS_PER_QUERY = 100
+
+# unicode61 splits on everything but letters, numbers and (here) '_'; words
+# never contain '_', so it only ever ends an owner prefix.
+WORD = re.compile(r'[^\W_]+')
+
+
+def uses_fts5(conn=connection):
+    return conn.vendor == 'sqlite'
+
+
+def tsvector_sql(kind, alias=None):
+    # Must match the expression migration 0007 indexes, for PostgreSQL to use the GIN index.
+    prefix = f'{alias}.' if alias else ''
+    columns = " || ' ' || ".join(f"coalesce({prefix}{column}, '')" for column in INDEXES[kind]['columns'])
+    return f"to_tsvector('english', {columns})"
+
+
+def owned_text(owner_id, text):
+    return ' '.join(f'u{owner_id}_{word}' for word in WORD.findall(text or ''))
+
+
+def owned_row(object_id, owner_id, *values):
+    return [object_id] + [owned_text(owner_id, value) for value in values]
+
+
+def insert_sql(kind, verb='INSERT'):
+    index = INDEXES[kind]
+    return (
+        f"{verb} INTO {index['fts']}(rowid, {', '.join(index['columns'])}) "
+        f"VALUES (%s, {', '.join(['%s'] * len(index['columns']))})"
+    )
+
+
+def rebuild_index(conn=connection):
+    if not uses_fts5(conn):
+        return
+    with conn.cursor() as cursor, conn.cursor() as writer:
+        for kind, index in INDEXES.items():
+            cursor.execute(f"DELETE FROM {index['fts']}")
+            cursor.execute(index['source_sql'])
+            while rows := cursor.fetchmany(REBUILD_BATCH_SIZE):
+                writer.executemany(insert_sql(kind), [owned_row(*row) for row in rows])
+
+
+def owners(kind, objects):
+    """Owner id per object; tasks read it from a cached project, or one query for the rest."""
+    if kind == 'project':
+        return {obj.id: obj.user_id for obj in objects}
+    found = {obj.id: obj.project.user_id for obj in objects if obj.__class__.project.is_cached(obj)}
+    missing = {obj.project_id for obj in objects if obj.id not in found}
+    if missing:
+        project_owners = dict(Project.all_objects.filter(id__in=missing).values_list('id', 'user_id'))
+        found.update({
+            obj.id: project_owners[obj.project_id] for obj in objects
+            if obj.id not in found and obj.project_id in project_owners
+        })
+    return found
+
+
+def index_objects(kind, objects):
+    if not uses_fts5():
+        return
+    objects = list(objects)
+    columns = INDEXES[kind]['columns']
+    owner_ids = owners(kind, objects)
+    with connection.cursor() as cursor:
+        cursor.executemany(insert_sql(kind, 'INSERT OR REPLACE'), [
+            owned_row(obj.id, owner_ids[obj.id], *[getattr(obj, column) for column in columns])
+            for obj in objects if obj.id in owner_ids
+        ])
+
+
+def unindex(kind, object_ids):
+    if not uses_fts5():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"DELETE FROM {INDEXES[kind]['fts']} WHERE rowid = %s", [[object_id] for object_id in object_ids]
+        )
+
+
+def fts5_query(text, owner_id):
+    # Each word becomes a quoted prefix term, so user input can't inject FTS5 syntax.
+    return ' '.join(f'"u{owner_id}_{word}"*' for word in WORD.findall(text))
+
+
+def matching_ids(kind, text):
+    """An id subquery for QuerySet.filter(id__in=...), unranked, over every owner."""
+    index = INDEXES[kind]
+    if uses_fts5():
+        if not WORD.search(text):
+            return []
+        owner_ids = list(Project.all_objects.order_by().values_list('user_id', flat=True).distinct())
+        groups = [owner_ids[i:i + OWNERS_PER_QUERY] for i in range(0, len(owner_ids), OWNERS_PER_QUERY)]
+        if not groups:
+            return []
+        return RawSQL(
+            ' UNION ALL '.join([f"SELECT rowid FROM {index['fts']} WHERE {index['fts']} MATCH %s"] * len(groups)),
+            [' OR '.join(f'({fts5_query(text, owner_id)})' for owner_id in group) for group in groups],
+        )
+    return RawSQL(
+        f"SELECT id FROM {index['table']} WHERE {tsvector_sql(kind)} "
+        f"@@ plainto_tsquery('english', %s)",
+        [text],
+    )
+
+
+def ranked_ids(kind, text, user, limit, offset=0):
+    """Ids of the user's matching objects, best match first."""
+    index = INDEXES[kind]
+    if uses_fts5():
+        query = fts5_query(text, user.id)
+        if not query:
+            return []
+        # Title matches weigh more than description matches.
+        sql = (
+            f"SELECT rowid FROM ("
+            f"SELECT rowid, bm25({index['fts']}, 10, 1) AS score FROM {index['fts']} "
+            f"WHERE {index['fts']} MATCH %s ORDER BY rowid DESC LIMIT %s"
+            f") ORDER BY score LIMIT %s OFFSET %s"
+        )
+        params = [query, SEARCH_CANDIDATES, limit, offset]
+    else:
+        owner = 'p.user_id' if kind == 'task' else 'o.user_id'
+        join = 'JOIN main_app_project p ON p.id = o.project_id' if kind == 'task' else ''
+        vector = tsvector_sql(kind, 'o')
+        sql = (
+            f"SELECT o.id FROM {index['table']} o {join} "
+            f"WHERE {vector} @@ plainto_tsquery('english', %s) AND {owner} = %s "
+            f"ORDER BY ts_rank({vector}, plainto_tsquery('english', %s)) DESC LIMIT %s OFFSET %s"
+        )
+        params = [text, user.id, text, limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search(model, text, user, page=1, page_size=20):
+    kind = model._meta.model_name
+    ids = ranked_ids(kind, text, user, page_size + 1, (page - 1) * page_size)
+    has_next = len(ids) > page_size
+    ids = ids[:page_size]
+    queryset = model.objects.filter(id__in=ids)
+    if kind == 'task':
+        queryset = queryset.owned_by(user).select_related('project')
+    else:
+        queryset = queryset.filter(user=user)
+    found = queryset.in_bulk()
+    return [found[object_id] for object_id in ids if object_id in found], has_next
@@ -0,0 +1,257 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from . import activity, fragment_cache, live, search, tag_catalogue
+from .models import Project, ProjectMember, ProjectStats, Tag, Task
+
+
+@receiver(post_save, sender=Project)
+def create_project_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        ProjectStats.objects.create(project=instance, last_activity_at=instance.created_at)
+
+
+@receiver(post_save, sender=Project)
+def add_owner_membership(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        ProjectMember.add(instance.id, [instance.user])
+
+
+@receiver(post_save, sender=User)
+def rename_memberships(sender, instance, update_fields=None, raw=False, **kwargs):
+    # Logins save last_login alone; only a username change matters here.
+    if raw or (update_fields is not None and 'username' not in update_fields):
+        return
+    ProjectMember.objects.filter(user=instance).exclude(
+        search_name=instance.username.casefold()
+    ).update(search_name=instance.username.casefold())
+
+
+@receiver(post_save, sender=Task)
+def track_task_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = None if created else getattr(instance, '_stats_state', None)
+    if not created and old is None:
+        # Saved without a loaded snapshot, so the old counters are unknown.
+        ProjectStats.rebuild([instance.project_id])
+    else:
+        ProjectStats.apply_changes([(old, instance.stats_state())])
+    instance._stats_state = instance.stats_state()
+
+
+@receiver(post_delete, sender=Task)
+def track_task_delete(sender, instance, **kwargs):
+    ProjectStats.apply_changes([(getattr(instance, '_stats_state', instance.stats_state()), None)])
+
+
+@receiver(m2m_changed, sender=Task.tags.through)
+def track_task_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        stats = ProjectStats.objects.filter(project_id=instance.project_id)
+    elif pk_set:
+        stats = ProjectStats.objects.filter(project__tasks__in=pk_set)
+    else:
+        return
+    stats.update(last_activity_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Task.tags.through)
+def touch_tagged_tasks(sender, instance, action, reverse, pk_set, **kwargs):
+    # Tags are part of a task, so changing them moves updated_at like any other
+    # edit does (bulk_update_tasks does the same).
+    now = timezone.now()
+    if not reverse and (action == 'post_clear' or action in ('post_add', 'post_remove') and pk_set):
+        Task.objects.filter(id=instance.id).update(updated_at=now)
+        instance.updated_at = now
+    elif reverse and action in ('post_add', 'post_remove') and pk_set:
+        Task.objects.filter(id__in=pk_set).update(updated_at=now)
+    elif reverse and action == 'pre_clear':
+        Task.objects.filter(tags=instance).update(updated_at=now)
+
+
+@receiver(pre_delete, sender=Tag)
+def touch_tasks_losing_tag(sender, instance, **kwargs):
+    # The cascade removes through rows without an m2m_changed signal.
+    Task.objects.filter(tags=instance).update(updated_at=timezone.now())
+
+
+# Fragment cache versions
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def bump_project_version(sender, instance, **kwargs):
+    fragment_cache.bump('project', instance.id)
+
+
+# Assignee usernames and project names are drawn on fragments whose versions
+# no task save moves, so renames are noted before the save and bumped after.
+RENAMED_FIELDS = {User: 'username', Project: 'name'}
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=Project)
+def note_rename(sender, instance, update_fields=None, raw=False, **kwargs):
+    field = RENAMED_FIELDS[sender]
+    instance._renamed = False
+    if raw or instance.pk is None or (update_fields is not None and field not in update_fields):
+        return
+    old = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    instance._renamed = old is not None and old != getattr(instance, field)
+
+
+@receiver(post_save, sender=User)
+def bump_renamed_user_versions(sender, instance, **kwargs):
+    if not getattr(instance, '_renamed', False):
+        return
+    tasks = list(Task.objects.filter(assigned_to=instance).values_list('id', 'project_id'))
+    project_ids = {project_id for _, project_id in tasks}
+    project_ids.update(Project.objects.filter(user=instance).values_list('id', flat=True))
+    if tasks:
+        fragment_cache.bump('task', *[task_id for task_id, _ in tasks])
+    if project_ids:
+        fragment_cache.bump('project', *project_ids)
+
+
+@receiver(post_save, sender=Project)
+def bump_renamed_project_versions(sender, instance, **kwargs):
+    if not getattr(instance, '_renamed', False):
+        return
+    task_ids = list(Task.objects.filter(project=instance).values_list('id', flat=True))
+    if task_ids:
+        fragment_cache.bump('task', *task_ids)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def bump_task_version(sender, instance, **kwargs):
+    fragment_cache.bump('task', instance.id)
+    fragment_cache.bump('project', instance.project_id)
+
+
+@receiver(m2m_changed, sender=Task.tags.through)
+def bump_task_tags_version(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        fragment_cache.bump('task', instance.id)
+        fragment_cache.bump('project', instance.project_id)
+    elif pk_set:
+        tasks = Task.objects.filter(id__in=pk_set).values_list('id', 'project_id')
+        fragment_cache.bump('task', *pk_set)
+        fragment_cache.bump('project', *{project_id for _, project_id in tasks})
+    else:
+        # Reverse clear() does not say which tasks lost the tag.
+        fragment_cache.bump('tags')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tags_version(sender, instance, **kwargs):
+    tag_catalogue.invalidate()
+
+
+# Activity log
+
+@receiver(post_save, sender=Task)
+def log_task_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if created:
+        activity.log([activity.created(instance)])
+    else:
+        activity.log([activity.updated(instance, getattr(instance, '_activity_state', None), update_fields)])
+    instance._activity_state = instance.activity_state()
+
+
+@receiver(post_delete, sender=Task)
+def log_task_delete(sender, instance, origin=None, **kwargs):
+    # Tasks going with their project or owner leave no history to keep.
+    if getattr(origin, 'model', type(origin)) is Task:
+        activity.log([activity.deleted(instance)])
+
+
+@receiver(m2m_changed, sender=Task.tags.through)
+def log_task_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    # clear() has no pk_set, so what it removes is read just before.
+    through = Task.tags.through.objects
+    if action == 'pre_clear':
+        pk_set = set(through.filter(**{'tag_id' if reverse else 'task_id': instance.id}).values_list(
+            'task_id' if reverse else 'tag_id', flat=True
+        ))
+    elif action not in ('post_add', 'post_remove'):
+        return
+    if not pk_set:
+        return
+    added = action == 'post_add'
+    if reverse:
+        activity.log(activity.tag_changed_on(pk_set, instance.id, added))
+    else:
+        activity.log([activity.tags_changed(instance, pk_set if added else (), () if added else pk_set)])
+
+
+@receiver(pre_delete, sender=Tag)
+def log_tag_delete(sender, instance, **kwargs):
+    activity.log(activity.tag_changed_on(
+        Task.tags.through.objects.filter(tag_id=instance.id).values_list('task_id', flat=True),
+        instance.id, added=False,
+    ))
+
+
+# Live updates
+
+@receiver(post_save, sender=Task)
+def publish_task_save(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        live.publish('task.created' if created else 'task.updated', instance.project_id, live.task_data(instance))
+
+
+@receiver(post_delete, sender=Task)
+def publish_task_delete(sender, instance, **kwargs):
+    live.publish('task.deleted', instance.project_id, {'id': instance.id})
+
+
+@receiver(m2m_changed, sender=Task.tags.through)
+def publish_task_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        tag_ids = Task.tags.through.objects.filter(task_id=instance.id).values_list('tag_id', flat=True)
+        live.publish('task.tags', instance.project_id, {
+            'id': instance.id, 'tags': live.tags_data(tag_catalogue.get().entries(tag_ids)),
+        })
+    elif pk_set:
+        for project_id in set(Task.objects.filter(id__in=pk_set).values_list('project_id', flat=True)):
+            live.publish('tasks.changed', project_id)
+    else:
+        live.publish('tasks.changed')
+
+
+@receiver(post_save, sender=Tag)
+def publish_tag_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        live.publish('tag.changed', data=live.tag_data(instance))
+
+
+@receiver(post_delete, sender=Tag)
+def publish_tag_delete(sender, instance, **kwargs):
+    live.publish('tag.deleted', data={'id': instance.id})
+
+
+# Search index
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Task)
+def index_for_search(sender, instance, raw=False, **kwargs):
+    # Fixtures may load a task before its project; rebuild_search_index indexes them afterwards.
+    if not raw:
+        search.index_objects(sender._meta.model_name, [instance])
+
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Task)
+def unindex_for_search(sender, instance, **kwargs):
+    search.unindex(sender._meta.model_name, [instance.id])
@@ -0,0 +1,72 @@
+// Adds a search box above every <select data-autocomplete-url>. The select only
+// holds the chosen options; matches come from the endpoint as the user types
+// and are added to the select when picked. Click a chosen option to drop it.
+(function () {
+    function setup(select) {
+        var input = document.createElement('input');
+        input.type = 'search';
+        input.className = 'form-control autocomplete-input';
+        input.placeholder = 'Type to search…';
+        var results = document.createElement('div');
+        results.className = 'autocomplete-results';
+        select.parentNode.insertBefore(input, select);
+        select.parentNode.insertBefore(results, select);
+        var timer = null;
+
+        function choose(item) {
+            if (!select.multiple) {
+                // Keep the empty choice so the value can be cleared again.
+                Array.prototype.slice.call(select.options).forEach(function (option) {
+                    if (option.value) { option.remove(); }
+                });
+            }
+            var option = select.querySelector('option[value="' + item.id + '"]');
+            if (!option) {
+                option = new Option(item.name || item.username, item.id);
+                select.appendChild(option);
+            }
+            option.selected = true;
+            results.innerHTML = '';
+            input.value = '';
+        }
+
+        function show(items) {
+            results.innerHTML = '';
+            items.forEach(function (item) {
+                var button = document.createElement('button');
+                button.type = 'button';
+                button.className = 'autocomplete-result';
+                button.textContent = item.name || item.username;
+                button.addEventListener('click', function () { choose(item); });
+                results.appendChild(button);
+            });
+        }
+
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(function () {
+                var url = select.dataset.autocompleteUrl + '?q=' + encodeURIComponent(input.value);
+                fetch(url, {credentials: 'same-origin'})
+                    .then(function (response) { return response.json(); })
+                    .then(function (data) { show(data.results || []); });
+            }, 150);
+        });
+
+        select.addEventListener('mousedown', function (event) {
+            if (select.multiple && event.target.tagName === 'OPTION') {
+                event.preventDefault();
+                event.target.remove();
+            }
+        });
+        // Everything left in the select is what the user chose.
+        select.form.addEventListener('submit', function () {
+            if (select.multiple) {
+                Array.prototype.forEach.call(select.options, function (option) { option.selected = true; });
+            }
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('select[data-autocomplete-url]').forEach(setup);
+    });
+})();
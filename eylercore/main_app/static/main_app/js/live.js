@@ -0,0 +1,82 @@
+// Keeps an open task board current from the project's event stream. Changes
+// to cards already on the page are applied in place; anything that would move
+// cards around (new tasks, bulk edits, a stream that had to start over) shows
+// a notice asking for a reload instead of reordering under the reader.
+(function () {
+    var notice = document.querySelector('.live-notice[data-live-url]');
+    if (!notice || !window.EventSource) { return; }
+    var url = notice.dataset.liveUrl + '?since=' + encodeURIComponent(notice.dataset.liveSince);
+    var source = new EventSource(url);
+
+    function card(id) {
+        return document.querySelector('.task-card[data-task-id="' + id + '"]');
+    }
+
+    function changed() {
+        notice.hidden = false;
+    }
+
+    function tagChip(tag) {
+        var chip = document.createElement('span');
+        chip.className = 'task-tag';
+        chip.dataset.tagId = tag.id;
+        chip.style.background = tag.color;
+        chip.textContent = tag.name;
+        return chip;
+    }
+
+    function on(kind, apply) {
+        source.addEventListener(kind, function (event) { apply(JSON.parse(event.data)); });
+    }
+
+    on('task.created', changed);
+    on('tasks.changed', changed);
+    on('reset', changed);
+
+    on('task.updated', function (task) {
+        var element = card(task.id);
+        if (!element) { return; }
+        element.querySelector('.task-title').textContent = task.title;
+        var status = element.querySelector('.task-status');
+        status.className = 'task-status task-status-' + task.status;
+        status.textContent = task.status_display;
+        var priority = element.querySelector('.task-priority');
+        priority.className = 'task-priority task-priority-' + task.priority;
+        priority.textContent = task.priority_display;
+        element.querySelector('.task-due').textContent = task.due_display;
+        // Only the assignee's id is sent; a new name arrives with the reload.
+        if (element.dataset.assignedTo !== String(task.assigned_to || '')) { changed(); }
+    });
+
+    on('task.deleted', function (task) {
+        var element = card(task.id);
+        if (element) { element.remove(); }
+    });
+
+    on('task.tags', function (task) {
+        var element = card(task.id);
+        if (!element) { return; }
+        var strip = element.querySelector('.task-tags');
+        if (!strip) {
+            strip = document.createElement('div');
+            strip.className = 'task-tags';
+            strip.innerHTML = '<strong>Tags:</strong>';
+            element.insertBefore(strip, element.querySelector('.task-actions'));
+        }
+        strip.querySelectorAll('.task-tag').forEach(function (chip) { chip.remove(); });
+        task.tags.forEach(function (tag) { strip.appendChild(tagChip(tag)); });
+        strip.hidden = !task.tags.length;
+    });
+
+    on('tag.changed', function (tag) {
+        document.querySelectorAll('.task-tag[data-tag-id="' + tag.id + '"]').forEach(function (chip) {
+            chip.replaceWith(tagChip(tag));
+        });
+    });
+
+    on('tag.deleted', function (tag) {
+        document.querySelectorAll('.task-tag[data-tag-id="' + tag.id + '"]').forEach(function (chip) {
+            chip.remove();
+        });
+    });
+}());
@@ -0,0 +1,142 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from django.db import transaction
+from . import fragment_cache
+from .models import Tag, Task
+
+# Tags are one small global table read by nearly every page, so each process
+# keeps an id -> (name, color) copy of it.
+#
+# The copy is stamped with the shared 'tags' version (the one the fragment
+# cache already uses), which Tag save/delete bump; a process that sees a newer
+# token reloads with one query. Task -> tag links still come from the through
+# table, but without the join to the tag rows.
+
+TagEntry = namedtuple('TagEntry', ['id', 'name', 'color'])
+TagUsage = namedtuple('TagUsage', ['id', 'name', 'color', 'usage_count'])
+
+AUTOCOMPLETE_LIMIT = 20
+
+lock = threading.Lock()
+loaded = None
+
+
+class Catalogue:
+    def __init__(self, version, rows):
+        self.version = version
+        self.by_id = {row[0]: TagEntry(*row) for row in rows}
+        # Tag.Meta orders by name; sorting here matches it.
+        self.ordered = sorted(self.by_id.values(), key=lambda tag: (tag.name, tag.id))
+        self.folded = sorted((tag.name.casefold(), tag.id) for tag in self.ordered)
+
+    def __contains__(self, tag_id):
+        return tag_id in self.by_id
+
+    def __iter__(self):
+        return iter(self.ordered)
+
+    def __len__(self):
+        return len(self.ordered)
+
+    def has_all(self, tag_ids):
+        return all(tag_id in self.by_id for tag_id in tag_ids)
+
+    def entries(self, tag_ids):
+        """The known tags among tag_ids, ordered by name."""
+        found = [self.by_id[tag_id] for tag_id in set(tag_ids) if tag_id in self.by_id]
+        return sorted(found, key=lambda tag: (tag.name, tag.id))
+
+    def search(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        """Case-insensitive name prefix match, by binary search over the folded names."""
+        prefix = prefix.casefold()
+        matches = []
+        for name, tag_id in self.folded[bisect_left(self.folded, (prefix, 0)):]:
+            if not name.startswith(prefix) or len(matches) >= limit:
+                break
+            matches.append(self.by_id[tag_id])
+        return matches
+
+
+def rows_query():
+    return Tag.objects.order_by().values_list('id', 'name', 'color')
+
+
+def store(version, rows):
+    global loaded
+    catalogue = Catalogue(version, rows)
+    with lock:
+        # Never replace a copy with one built from an older token.
+        if loaded is None or loaded.version <= version:
+            loaded = catalogue
+    return catalogue
+
+
+def get(reload=False):
+    version = fragment_cache.versions('tags')[None]
+    catalogue = loaded
+    if reload or catalogue is None or catalogue.version != version:
+        catalogue = store(version, list(rows_query()))
+    return catalogue
+
+
+async def aget(reload=False):
+    version = (await fragment_cache.aversions('tags'))[None]
+    catalogue = loaded
+    if reload or catalogue is None or catalogue.version != version:
+        catalogue = store(version, [row async for row in rows_query()])
+    return catalogue
+
+
+def known(tag_ids):
+    """Whether every id is a tag, reloading once before saying no."""
+    tag_ids = set(tag_ids)
+    return get().has_all(tag_ids) or get(reload=True).has_all(tag_ids)
+
+
+def invalidate():
+    """
+    Bumped now for this process and again on commit, so a process that reloads
+    between the two can't keep rows from before the transaction.
+    """
+    fragment_cache.bump('tags')
+    transaction.on_commit(lambda: fragment_cache.bump('tags'))
+
+
+# Tag strips
+
+def links_query(tasks):
+    return Task.tags.through.objects.filter(
+        task_id__in=[task.id for task in tasks]
+    ).values_list('task_id', 'tag_id')
+
+
+def assign(tasks, links, catalogue):
+    tag_ids = defaultdict(list)
+    for task_id, tag_id in links:
+        tag_ids[task_id].append(tag_id)
+    for task in tasks:
+        task.tag_list = catalogue.entries(tag_ids[task.id])
+    return tasks
+
+
+def attach(tasks):
+    """
+    Sets task.tag_list on each task from one query over the through table.
+    TaskQuerySet.for_listing() calls it as its rows load.
+    """
+    tasks = list(tasks)
+    links = list(links_query(tasks))
+    catalogue = get()
+    # A link to a tag this process hasn't seen yet: some other process made it.
+    if not catalogue.has_all(tag_id for _, tag_id in links):
+        catalogue = get(reload=True)
+    return assign(tasks, links, catalogue)
+
+
+async def aproject_tags(project):
+    """Tag.objects.for_project() as TagUsage rows, most used first."""
+    return [
+        TagUsage(*row) async for row in
+        Tag.objects.for_project(project).values_list('id', 'name', 'color', 'usage_count')
+    ]
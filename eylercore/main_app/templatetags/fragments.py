@@ -0,0 +1,49 @@
+from django import template
+from main_app import fragment_cache
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, name, parts, nodelist):
+        self.name = name
+        self.parts = parts
+        self.nodelist = nodelist
+
+    def render(self, context):
+        request = context.get('request')
+        user_id = request.user.id if request else None
+        parts = [part.resolve(context) for part in self.parts]
+        key = fragment_cache.fragment_key(self.name.resolve(context), user_id, *parts)
+        prefetched = context.get('fragments')
+        if prefetched is not None and key in prefetched:
+            content = prefetched.get(key)
+            if content is None:
+                content = self.nodelist.render(context)
+                prefetched.store(key, content)
+            return content
+        content = fragment_cache.get_fragment(key)
+        if content is None:
+            content = self.nodelist.render(context)
+            fragment_cache.set_fragment(key, content)
+        return content
+
+
+@register.tag
+def fragment(parser, token):
+    """
+    Cache the enclosed template per user, keyed by the given version values.
+
+        {% fragment 'task_card' task.id task.fragment_version %}...{% endfragment %}
+
+    Async views read their fragments up front with fragment_cache.aprefetch(),
+    pass them to the template as 'fragments' and save them once it has rendered.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires a fragment name")
+    nodelist = parser.parse(('endfragment',))
+    parser.delete_first_token()
+    return FragmentNode(
+        parser.compile_filter(bits[1]), [parser.compile_filter(bit) for bit in bits[2:]], nodelist
+    )
@@ -1,3 +1,1225 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from tempfile import TemporaryDirectory
+from datetime import date, datetime, timedelta
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core import serializers
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from . import activity, benchmark, bulk, exports, fragment_cache, imports, inbox, instrumentation, jobs, live, purge, search, tag_catalogue, urls, views
+from .forms import TaskForm
+from .management.commands import check_query_plans
+from .models import Job, Project, ProjectMember, ProjectStats, Task, TaskActivity, Tag
+from .pagination import encode_cursor, keyset_order, keyset_page_queryset
 
-# Create your tests here.
+
+class TaskListingQueryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.project = Project.objects.create(name='Castle', description='Keep', user=self.user)
+        self.tags = [Tag.objects.create(name=f'tag-{i}') for i in range(3)]
+        self.client.force_login(self.user)
+
+    def add_tasks(self, count):
+        for i in range(count):
+            task = Task.objects.create(
+                title=f'Task {i}', project=self.project, assigned_to=self.user
+            )
+            task.tags.set(self.tags)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_for_listing_loads_assignee_and_tags(self):
+        self.add_tasks(5)
+        tag_catalogue.get()
+        with self.assertNumQueries(2):
+            tasks = list(Task.objects.filter(project=self.project).for_listing())
+        with self.assertNumQueries(0):
+            for task in tasks:
+                task.assigned_to.username
+                self.assertEqual([tag.name for tag in task.tag_list], ['tag-0', 'tag-1', 'tag-2'])
+
+    def test_admin_changelist_uses_for_listing(self):
+        self.add_tasks(3)
+        self.user.is_staff = self.user.is_superuser = True
+        self.user.save()
+        response = self.client.get(reverse('admin:main_app_task_changelist'))
+        self.assertTrue(all(hasattr(task, 'tag_list') for task in response.context['cl'].result_list))
+
+    def test_tasks_index_query_count_is_constant(self):
+        url = reverse('main_app:tasks_index', args=[self.project.id])
+        self.add_tasks(1)
+        # The first request also loads the tag catalogue.
+        self.count_queries(url)
+        few = self.count_queries(url)
+        self.add_tasks(20)
+        many = self.count_queries(url)
+        self.assertEqual(few, many)
+
+
+class TaskFilterPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.project = Project.objects.create(name='Castle', description='Keep', user=self.user)
+        self.tag = Tag.objects.create(name='bug')
+        self.client.force_login(self.user)
+        self.url = reverse('main_app:tasks_index', args=[self.project.id])
+
+    def test_filters_by_status_and_tag(self):
+        tagged = Task.objects.create(title='Tagged', project=self.project, status='done')
+        tagged.tags.add(self.tag)
+        Task.objects.create(title='Other', project=self.project, status='done')
+        Task.objects.create(title='Todo', project=self.project, status='todo')
+        response = self.client.get(self.url, {'status': 'done', 'tag': self.tag.id})
+        self.assertEqual([t.title for t in response.context['tasks']], ['Tagged'])
+
+    def test_priority_filter_uses_the_indexed_rank(self):
+        Task.objects.create(title='Urgent', project=self.project, priority='urgent')
+        Task.objects.create(title='Low', project=self.project, priority='low')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'priority': 'urgent'})
+        self.assertEqual([t.title for t in response.context['tasks']], ['Urgent'])
+        listing = next(q['sql'] for q in queries.captured_queries if 'FROM "main_app_task"' in q['sql'])
+        self.assertIn('"priority_rank" = 4', listing)
+
+    def test_keyset_pages_cover_every_task_once(self):
+        for i in range(7):
+            Task.objects.create(
+                title=f'Task {i}', project=self.project,
+                priority=['low', 'high'][i % 2],
+                due_date=None if i % 3 == 0 else date(2025, 1, i + 1)
+            )
+        seen = []
+        params = {}
+        with mock.patch.object(views, 'TASKS_PAGE_SIZE', 3):
+            while True:
+                response = self.client.get(self.url, params)
+                seen.extend(t.id for t in response.context['tasks'])
+                if not response.context['next_query']:
+                    break
+                params = QueryDict(response.context['next_query'])
+        expected = [t.id for t in Task.objects.filter(project=self.project).order_by(
+            *keyset_order(Task.LISTING_KEYS)
+        )]
+        self.assertEqual(seen, expected)
+
+    def test_later_pages_seek_on_the_leading_key(self):
+        task = Task.objects.create(title='Siege', project=self.project, priority='high')
+        tasks = keyset_page_queryset(
+            Task.objects.filter(project=self.project), Task.LISTING_KEYS, encode_cursor(task, Task.LISTING_KEYS)
+        )
+        self.assertIn('priority_rank<', tasks.explain())
+
+
+class TaskRankTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.project = Project.objects.create(name='Castle', description='Keep', user=self.user)
+
+    def test_default_ordering_follows_priority_rank(self):
+        for priority in ['high', 'low', 'urgent', 'medium']:
+            Task.objects.create(title=priority, project=self.project, priority=priority)
+        self.assertEqual(
+            [t.priority for t in Task.objects.all()],
+            ['urgent', 'high', 'medium', 'low']
+        )
+
+    def test_queryset_update_keeps_ranks_in_sync(self):
+        task = Task.objects.create(title='Siege', project=self.project)
+        Task.objects.filter(id=task.id).update(status='done', priority='urgent')
+        task.refresh_from_db()
+        self.assertEqual(task.status_rank, Task.STATUS_RANKS['done'])
+        self.assertEqual(task.priority_rank, Task.PRIORITY_RANKS['urgent'])
+
+
+class ProjectSummaryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.client.force_login(self.user)
+
+    def test_summary_counts(self):
+        project = Project.objects.create(name='Castle', description='Keep', user=self.user)
+        today = timezone.localdate()
+        Task.objects.create(title='Late', project=project, due_date=today - timedelta(days=2))
+        Task.objects.create(title='Soon', project=project, status='review', due_date=today + timedelta(days=3))
+        Task.objects.create(title='Done', project=project, status='done', due_date=today - timedelta(days=5))
+        summary = Project.objects.with_task_summary().get(id=project.id)
+        self.assertEqual(summary.task_count, 3)
+        self.assertEqual(summary.todo_count, 1)
+        self.assertEqual(summary.review_count, 1)
+        self.assertEqual(summary.done_count, 1)
+        self.assertEqual(summary.overdue_count, 1)
+        self.assertEqual(summary.next_due_date, today + timedelta(days=3))
+
+    def test_projects_index_query_count_is_constant(self):
+        url = reverse('main_app:projects_index')
+        Project.objects.create(name='First', description='Keep', user=self.user)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        for i in range(5):
+            project = Project.objects.create(name=f'Project {i}', description='Keep', user=self.user)
+            Task.objects.create(title='Task', project=project)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url)
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+
+
+class ProjectStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.project = Project.objects.create(name='Castle', description='Keep', user=self.user)
+
+    def stats(self):
+        return ProjectStats.objects.get(project=self.project)
+
+    def test_incremental_updates_match_rebuild(self):
+        today = timezone.localdate()
+        task = Task.objects.create(title='Late', project=self.project, due_date=today - timedelta(days=1))
+        Task.objects.create(title='Soon', project=self.project, priority='urgent', due_date=today + timedelta(days=2))
+        self.assertEqual(self.stats().overdue_count, 1)
+        task = Task.objects.get(id=task.id)
+        task.status = 'done'
+        task.save()
+        stats = self.stats()
+        self.assertEqual((stats.task_count, stats.todo_count, stats.done_count), (2, 1, 1))
+        self.assertEqual(stats.overdue_count, 0)
+        self.assertEqual(stats.urgent_priority_count, 1)
+        self.assertEqual(stats.next_due_date, today + timedelta(days=2))
+        task.delete()
+        self.assertEqual(self.stats().task_count, 1)
+        self.assertEqual(list(ProjectStats.find_drift()), [])
+
+    def test_tag_changes_record_activity(self):
+        task = Task.objects.create(title='Siege', project=self.project)
+        ProjectStats.objects.filter(project=self.project).update(last_activity_at=None)
+        task.tags.add(Tag.objects.create(name='bug'))
+        self.assertIsNotNone(self.stats().last_activity_at)
+
+    def test_stale_stats_are_rebuilt_on_read(self):
+        Task.objects.create(title='Siege', project=self.project)
+        ProjectStats.objects.filter(project=self.project).update(task_count=0, overdue_as_of=date.min)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('main_app:projects_index'))
+        self.assertEqual(response.context['projects'][0].stats.task_count, 1)
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.project = Project.objects.create(name='Castle', description='Keep', user=self.user)
+        self.task = Task.objects.create(title='Siege', project=self.project)
+        self.tag = Tag.objects.create(name='bug')
+        self.task.tags.add(self.tag)
+        self.client.force_login(self.user)
+        self.url = reverse('main_app:tasks_index', args=[self.project.id])
+
+    def test_second_render_hits_cache(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.assertEqual(fragment_cache.stats()['hits'], 1)
+        self.assertEqual(fragment_cache.stats()['misses'], 1)
+
+    def test_cards_are_read_once_per_page(self):
+        for i in range(4):
+            Task.objects.create(title=f'Task {i}', project=self.project)
+        with mock.patch.object(cache, 'aset_many', wraps=cache.aset_many) as aset_many:
+            self.client.get(self.url)
+        fragment_writes = [call for call in aset_many.call_args_list if 'fragment:' in next(iter(call.args[0]))]
+        self.assertEqual([len(call.args[0]) for call in fragment_writes], [5])
+        with mock.patch.object(fragment_cache, 'get_fragment') as get_fragment, \
+                mock.patch.object(cache, 'aget_many', wraps=cache.aget_many) as aget_many, \
+                mock.patch.object(cache, 'aincr', wraps=cache.aincr) as aincr:
+            self.client.get(self.url)
+        get_fragment.assert_not_called()
+        fragment_reads = [call for call in aget_many.call_args_list if 'fragment:' in call.args[0][0]]
+        self.assertEqual([len(call.args[0]) for call in fragment_reads], [5])
+        self.assertEqual(aincr.call_count, 1)
+        self.assertEqual(fragment_cache.stats(), {'hits': 5, 'misses': 5, 'hit_rate': 0.5})
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'main_app_test_cache',
+    }})
+    def test_async_views_work_with_the_database_cache(self):
+        call_command('createcachetable', verbosity=0)
+        urls = [
+            self.url,
+            reverse('main_app:task_detail', args=[self.project.id, self.task.id]),
+            reverse('main_app:projects_detail', args=[self.project.id]),
+            reverse('main_app:tags_index'),
+        ]
+        for _ in range(2):
+            for url in urls:
+                self.assertEqual(self.client.get(url).status_code, 200, url)
+        self.assertEqual(fragment_cache.stats()['hits'], 3)
+
+    def test_tag_rename_invalidates_cards(self):
+        self.client.get(self.url)
+        self.tag.name = 'defect'
+        self.tag.save()
+        self.assertContains(self.client.get(self.url), 'defect')
+
+    def test_tag_removal_invalidates_cards(self):
+        self.client.get(self.url)
+        self.task.tags.remove(self.tag)
+        self.assertNotContains(self.client.get(self.url), 'task-tag')
+
+    def test_renames_invalidate_cards_and_pages(self):
+        assignee = User.objects.create_user(username='kira', password='secret-pass-123')
+        self.task.assigned_to = assignee
+        self.task.save()
+        detail_url = reverse('main_app:task_detail', args=[self.project.id, self.task.id])
+        summary_url = reverse('main_app:projects_detail', args=[self.project.id])
+        etags = {url: self.client.get(url)['ETag'] for url in [self.url, detail_url, summary_url]}
+        for renamed, text, urls in [
+            (assignee, 'kira-renamed', [self.url, detail_url]),
+            (self.project, 'Fortress', [detail_url]),
+            (self.user, 'eyler-renamed', [summary_url]),
+        ]:
+            setattr(renamed, 'name' if renamed is self.project else 'username', text)
+            renamed.save()
+            for url in urls:
+                self.assertContains(self.client.get(url, HTTP_IF_NONE_MATCH=etags[url]), text)
+
+    def test_logins_do_not_look_for_renames(self):
+        self.user.last_login = timezone.now()
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=['last_login'])
+
+
+class ProjectTagsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.project = Project.objects.create(name='Castle', description='Keep', user=self.user)
+        self.bug, self.idea = Tag.objects.create(name='bug'), Tag.objects.create(name='idea')
+        Tag.objects.create(name='unused')
+
+    def test_for_project_counts_distinct_tags(self):
+        for i in range(12):
+            task = Task.objects.create(title=f'Task {i}', project=self.project)
+            task.tags.add(self.bug)
+        task.tags.add(self.idea)
+        tags = list(Tag.objects.for_project(self.project))
+        self.assertEqual([(t.name, t.usage_count) for t in tags], [('bug', 12), ('idea', 1)])
+        usage = async_to_sync(tag_catalogue.aproject_tags)(self.project)
+        self.assertEqual([(t.name, t.usage_count) for t in usage], [('bug', 12), ('idea', 1)])
+
+    def test_projects_detail_tag_strip_is_one_query(self):
+        task = Task.objects.create(title='Siege', project=self.project)
+        task.tags.add(self.bug, self.idea)
+        with self.assertNumQueries(1):
+            async_to_sync(tag_catalogue.aproject_tags)(self.project)
+        self.client.force_login(self.user)
+        self.assertContains(
+            self.client.get(reverse('main_app:projects_detail', args=[self.project.id])), 'idea (1)'
+        )
+
+
+class TagCatalogueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.project = Project.objects.create(name='Castle', description='Keep', user=self.user)
+        self.tags = [Tag.objects.create(name=name) for name in ['Bug', 'build', 'docs']]
+        self.client.force_login(self.user)
+
+    def test_loaded_once_and_reloaded_after_a_tag_change(self):
+        tag_catalogue.get()
+        with self.assertNumQueries(0):
+            self.assertEqual([tag.name for tag in tag_catalogue.get()], ['Bug', 'build', 'docs'])
+        self.tags[2].name = 'Docs'
+        self.tags[2].save()
+        with self.assertNumQueries(1):
+            self.assertEqual(tag_catalogue.get().by_id[self.tags[2].id].name, 'Docs')
+
+    def test_unseen_tags_reload_the_strip(self):
+        task = Task.objects.create(title='Siege', project=self.project)
+        tag_catalogue.get()
+        # As if another process created the tag and this one missed the bump.
+        with mock.patch.object(tag_catalogue, 'invalidate'):
+            fresh = Tag.objects.bulk_create([Tag(name='fresh')])[0]
+        task.tags.add(fresh, self.tags[0])
+        [task] = tag_catalogue.attach([task])
+        self.assertEqual([tag.name for tag in task.tag_list], ['Bug', 'fresh'])
+
+    def test_autocomplete_prefix_matches_ignoring_case(self):
+        url = reverse('main_app:tags_autocomplete')
+        results = self.client.get(url, {'q': 'b'}).json()['results']
+        self.assertEqual([tag['name'] for tag in results], ['Bug', 'build'])
+        results = self.client.get(url, {'q': 'B', 'limit': 1}).json()['results']
+        self.assertEqual(results, [{'id': self.tags[0].id, 'name': 'Bug', 'color': self.tags[0].color}])
+        self.assertEqual(self.client.get(url, {'q': 'z'}).json()['results'], [])
+
+    def test_task_form_renders_only_selected_tags(self):
+        task = Task.objects.create(title='Siege', project=self.project)
+        task.tags.add(self.tags[1])
+        html = str(TaskForm(instance=task)['tags'])
+        self.assertIn('data-autocomplete-url="/tags/autocomplete/"', html)
+        self.assertIn('build', html)
+        self.assertNotIn('docs', html)
+        form = TaskForm({'title': 'Storm', 'status': 'todo', 'priority': 'low', 'tags': [self.tags[2].id]},
+                        instance=task)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        self.assertEqual(list(task.tags.values_list('name', flat=True)), ['docs'])
+        form = TaskForm({'title': 'Storm', 'status': 'todo', 'priority': 'low', 'tags': ['999']})
+        self.assertIn('tags', form.errors)
+
+
+class ProjectMemberTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.project = Project.objects.create(name='Castle', description='Keep', user=self.user)
+        self.alice = User.objects.create_user(username='Alice', password='secret-pass-123')
+        self.alan = User.objects.create_user(username='alan', password='secret-pass-123')
+        self.bob = User.objects.create_user(username='bob', password='secret-pass-123')
+        ProjectMember.add(self.project.id, [self.alice, self.alan])
+        self.client.force_login(self.user)
+
+    def test_owner_is_a_member_and_renames_follow(self):
+        self.assertTrue(ProjectMember.objects.filter(project=self.project, user=self.user).exists())
+        self.alice.username = 'Alicia'
+        self.alice.save()
+        self.assertEqual(ProjectMember.objects.get(user=self.alice).search_name, 'alicia')
+
+    def test_autocomplete_searches_members_by_prefix(self):
+        url = reverse('main_app:members_autocomplete', args=[self.project.id])
+        results = self.client.get(url, {'q': 'AL'}).json()['results']
+        self.assertEqual(results, [{'id': self.alan.id, 'username': 'alan'}, {'id': self.alice.id, 'username': 'Alice'}])
+        self.assertEqual(self.client.get(url, {'q': 'bo'}).json()['results'], [])
+        self.client.force_login(self.bob)
+        self.assertEqual(self.client.get(url, {'q': 'al'}).status_code, 404)
+
+    def test_task_form_renders_and_accepts_only_members(self):
+        task = Task.objects.create(title='Siege', project=self.project, assigned_to=self.alice)
+        html = str(TaskForm(instance=task, project=self.project)['assigned_to'])
+        self.assertIn('Alice', html)
+        self.assertNotIn('alan', html)
+        data = {'title': 'Storm', 'status': 'todo', 'priority': 'low'}
+        self.assertIn('assigned_to', TaskForm({**data, 'assigned_to': self.bob.id}, project=self.project).errors)
+        url = reverse('main_app:add_task', args=[self.project.id])
+        tag = Tag.objects.create(name='bug')
+        self.client.post(url, {**data, 'assigned_to': self.alan.id, 'tags': [tag.id]})
+        storm = Task.objects.get(title='Storm')
+        self.assertEqual((storm.assigned_to, list(storm.tags.all())), (self.alan, [tag]))
+
+    def test_removing_a_member_unassigns_their_tasks(self):
+        task = Task.objects.create(title='Siege', project=self.project, assigned_to=self.alice)
+        url = reverse('main_app:remove_member', args=[self.project.id, self.alice.id])
+        self.assertEqual(self.client.post(url).status_code, 302)
+        task.refresh_from_db()
+        self.assertIsNone(task.assigned_to)
+        self.assertFalse(ProjectMember.objects.filter(project=self.project, user=self.alice).exists())
+        owner_url = reverse('main_app:remove_member', args=[self.project.id, self.user.id])
+        self.assertEqual(self.client.post(owner_url).status_code, 400)
+
+    def test_import_only_assigns_members(self):
+        report = imports.TaskImporter(self.project).run(iter([
+            {'title': 'Siege', 'assigned_to': 'alan', 'tags': []},
+            {'title': 'Storm', 'assigned_to': 'bob', 'tags': []},
+        ]))
+        self.assertEqual(report['created'], 1)
+        self.assertIn('not a member', report['errors'][0]['errors']['assigned_to'][0])
+
+
+@mock.patch('django.utils.timezone.localdate', return_value=date(2026, 10, 14))
+class InboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.owner = User.objects.create_user(username='kira', password='secret-pass-123')
+        self.mine = Project.objects.create(name='Castle', user=self.user)
+        self.theirs = Project.objects.create(name='Tower', user=self.owner)
+        ProjectMember.add(self.theirs.id, [self.user])
+        wednesday = date(2026, 10, 14)
+        for title, project, days, status in [
+            ('Late', self.mine, -3, 'todo'),
+            ('Now', self.theirs, 0, 'in_progress'),
+            ('Friday', self.mine, 2, 'todo'),
+            ('Sunday', self.theirs, 4, 'todo'),
+            ('Next week', self.mine, 5, 'todo'),
+            ('Finished', self.mine, -1, 'done'),
+        ]:
+            Task.objects.create(
+                title=title, project=project, assigned_to=self.user, status=status,
+                due_date=wednesday + timedelta(days=days),
+            )
+        Task.objects.create(title='Not mine', project=self.mine, assigned_to=self.owner, due_date=wednesday)
+        self.client.force_login(self.user)
+
+    def test_groups_every_open_assignment(self, localdate):
+        response = self.client.get(reverse('main_app:inbox'))
+        sections = {section['name']: [task.title for task in section['tasks']] for section in response.context['sections']}
+        self.assertEqual(sections, {
+            'overdue': ['Late'], 'today': ['Now'], 'this_week': ['Friday', 'Sunday'], 'later': ['Next week'], 'no_date': [],
+        })
+        self.assertEqual(response.context['total'], 5)
+        # Only tasks in the user's own projects link to a page they can open.
+        self.assertContains(response, reverse('main_app:task_detail', args=[self.mine.id, Task.objects.get(title='Late').id]))
+        self.assertNotContains(response, reverse('main_app:task_detail', args=[self.theirs.id, Task.objects.get(title='Now').id]))
+
+    def test_lists_undated_and_far_off_tasks_last(self, localdate):
+        user = User.objects.create_user(username='mira', password='secret-pass-123')
+        for title, due_date in [('Someday', None), ('Next month', date(2026, 11, 13)), ('Today', date(2026, 10, 14))]:
+            Task.objects.create(title=title, project=self.mine, assigned_to=user, due_date=due_date)
+        self.client.force_login(user)
+        response = self.client.get(reverse('main_app:inbox'))
+        sections = {section['name']: [task.title for task in section['tasks']] for section in response.context['sections']}
+        self.assertEqual(sections, {
+            'overdue': [], 'today': ['Today'], 'this_week': [], 'later': ['Next month'], 'no_date': ['Someday'],
+        })
+        self.assertEqual(response.context['total'], 3)
+        # The dated range runs out part way through a page and the undated one fills the rest.
+        titles, url = [], reverse('main_app:api_inbox') + '?limit=1&fields=title'
+        while url:
+            body = self.client.get(url).json()
+            titles += [task['title'] for tasks in body['results'].values() for task in tasks]
+            url = body['next']
+        self.assertEqual(titles, ['Today', 'Next month', 'Someday'])
+        body = self.client.get(reverse('main_app:api_inbox'), {'limit': 2, 'fields': 'title'}).json()
+        self.assertEqual(body['counts'], {'overdue': 0, 'today': 1, 'this_week': 0, 'later': 1, 'no_date': 1})
+        self.assertEqual(self.client.get(body['next']).json()['results']['no_date'], [{'title': 'Someday'}])
+
+    def test_hides_soft_deleted_projects(self, localdate):
+        Project.objects.filter(id=self.theirs.id).update(deleted_at=timezone.now())
+        titles = [task.title for task in inbox.listing(self.user).order_by('due_date')]
+        self.assertEqual(titles, ['Late', 'Friday', 'Next week'])
+        response = self.client.get(reverse('main_app:inbox'))
+        self.assertEqual([section['count'] for section in response.context['sections']], [1, 0, 1, 1, 0])
+
+    def test_listing_reads_in_index_order(self, localdate):
+        task = Task.objects.create(title='Someday', project=self.mine, assigned_to=self.user)
+        first = inbox.page_querysets(inbox.listing(self.user))
+        after_undated = inbox.page_querysets(inbox.listing(self.user), encode_cursor(task, inbox.LISTING_KEYS))
+        for queryset in first + after_undated:
+            plan = queryset.explain()
+            self.assertIn('task_assignee_open_due_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_api_returns_counts_buckets_and_cursor(self, localdate):
+        url = reverse('main_app:api_inbox')
+        body = self.client.get(url, {'limit': 3, 'fields': 'title,project_name'}).json()
+        self.assertEqual(body['counts'], {'overdue': 1, 'today': 1, 'this_week': 2, 'later': 1, 'no_date': 0})
+        self.assertEqual(body['results'], {
+            'overdue': [{'title': 'Late', 'project_name': 'Castle'}],
+            'today': [{'title': 'Now', 'project_name': 'Tower'}],
+            'this_week': [{'title': 'Friday', 'project_name': 'Castle'}],
+            'later': [],
+            'no_date': [],
+        })
+        rest = self.client.get(body['next']).json()
+        self.assertEqual(rest['results']['this_week'], [{'title': 'Sunday', 'project_name': 'Tower'}])
+        self.assertEqual(rest['results']['later'], [{'title': 'Next week', 'project_name': 'Castle'}])
+        self.assertIsNone(rest['next'])
+
+
+class ActivityTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.project = Project.objects.create(name='Castle', user=self.user)
+        self.tag = Tag.objects.create(name='bug')
+        self.client.force_login(self.user)
+
+    def log(self, task_id):
+        return list(TaskActivity.objects.filter(task_id=task_id).order_by('id').values_list('kind', 'status', 'changes'))
+
+    def test_saves_log_only_what_changed(self):
+        task = Task.objects.create(title='Siege', project=self.project)
+        task = Task.objects.get(id=task.id)
+        task.status = 'in_progress'
+        task.description = 'A long plan'
+        task.save()
+        task.save()
+        task.tags.add(self.tag)
+        task.tags.clear()
+        task_id = task.id
+        task.delete()
+        self.assertEqual(self.log(task_id), [
+            (TaskActivity.CREATED, 'todo', {'title': 'Siege', 'priority': 'medium'}),
+            (TaskActivity.UPDATED, 'in_progress', {'description': True}),
+            (TaskActivity.UPDATED, '', {'tags_added': [self.tag.id]}),
+            (TaskActivity.UPDATED, '', {'tags_removed': [self.tag.id]}),
+            (TaskActivity.DELETED, '', {}),
+        ])
+        self.project.delete()
+        self.assertFalse(TaskActivity.objects.exists())
+
+    def test_bulk_update_logs_real_changes_in_one_insert(self):
+        done = Task.objects.create(title='Done', project=self.project, status='done')
+        done.tags.add(self.tag)
+        open_task = Task.objects.create(title='Open', project=self.project)
+        with CaptureQueriesContext(connection) as queries:
+            bulk.bulk_update_tasks(self.project.id, [done.id, open_task.id], status='done', add_tags=[self.tag.id])
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "main_app_taskactivity"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self.log(done.id)[2:], [])
+        self.assertEqual(self.log(open_task.id)[1:], [(TaskActivity.UPDATED, 'done', {'tags_added': [self.tag.id]})])
+
+    def test_cycle_time_and_throughput_reports(self):
+        day = timezone.make_aware(datetime(2026, 10, 5, 9))
+        first = Task.objects.create(title='Siege', project=self.project)
+        second = Task.objects.create(title='Storm', project=self.project)
+        TaskActivity.objects.all().delete()
+        activity.log([
+            activity.entry(first, TaskActivity.CREATED, {'status': 'todo'}, day - timedelta(days=5)),
+            activity.entry(first, TaskActivity.UPDATED, {'status': 'in_progress'}, day - timedelta(days=2)),
+            activity.entry(first, TaskActivity.UPDATED, {'status': 'done'}, day),
+            activity.entry(second, TaskActivity.CREATED, {'status': 'todo'}, day),
+            activity.entry(second, TaskActivity.UPDATED, {'status': 'done'}, day + timedelta(days=1)),
+        ])
+        report = activity.cycle_time(self.project.id, date(2026, 10, 1), date(2026, 10, 7))
+        self.assertEqual(report['tasks'], 2)
+        self.assertEqual((report['shortest'], report['longest']), (timedelta(days=1), timedelta(days=2)))
+        url = reverse('main_app:api_throughput', args=[self.project.id])
+        body = self.client.get(url, {'start': '2026-10-04', 'end': '2026-10-07'}).json()
+        self.assertEqual(body['done'], 2)
+        self.assertEqual([day['done'] for day in body['days']], [0, 1, 1, 0])
+        url = reverse('main_app:api_cycle_time', args=[self.project.id])
+        body = self.client.get(url, {'start': '2026-10-01', 'end': '2026-10-07'}).json()
+        self.assertEqual(body['average_seconds'], 36 * 3600)
+        self.assertEqual(self.client.get(url, {'start': '2026-10-08', 'end': '2026-10-07'}).status_code, 400)
+
+    def test_prune_and_purge_remove_entries(self):
+        task = Task.objects.create(title='Siege', project=self.project)
+        task.delete()
+        TaskActivity.objects.filter(kind=TaskActivity.CREATED).update(created_at=timezone.now() - timedelta(days=400))
+        self.assertEqual(activity.prune(size=1), 1)
+        self.assertEqual(purge.purge_project(self.project.id)['activity'], 1)
+
+
+class PurgeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.project = Project.objects.create(name='Castle', description='Keep', user=self.user)
+        self.keep = Project.objects.create(name='Keep', description='Stays', user=self.user)
+        self.tag = Tag.objects.create(name='bug')
+        self.kept_task = Task.objects.create(title='Kept siege', project=self.keep)
+        self.client.force_login(self.user)
+
+    def add_tasks(self, count):
+        tasks = Task.objects.bulk_create([Task(title=f'Siege {i}', project=self.project) for i in range(count)])
+        Task.tags.through.objects.bulk_create([Task.tags.through(task=task, tag=self.tag) for task in tasks])
+        search.index_objects('task', tasks)
+
+    def test_purge_deletes_in_batches_without_loading_tasks(self):
+        self.add_tasks(25)
+        with CaptureQueriesContext(connection) as queries:
+            result = purge.purge_project(self.project.id, size=10)
+        self.assertEqual((result['tasks'], result['tag_links']), (25, 25))
+        self.assertLess(len(queries), 40)
+        self.assertFalse(Project.all_objects.filter(id=self.project.id).exists())
+        self.assertFalse(ProjectMember.objects.filter(project_id=self.project.id).exists())
+        self.assertFalse(ProjectStats.objects.filter(project_id=self.project.id).exists())
+        self.assertEqual(list(Task.tags.through.objects.values_list('task_id', flat=True)), [])
+        self.assertEqual([t.title for t in search.search(Task, 'siege', self.user)[0]], ['Kept siege'])
+        self.assertTrue(Tag.objects.filter(id=self.tag.id).exists())
+
+    def test_delete_view_purges_in_the_request(self):
+        self.add_tasks(3)
+        self.client.post(reverse('main_app:delete_project', args=[self.project.id]))
+        self.assertFalse(Task.objects.filter(project_id=self.project.id).exists())
+        self.assertTrue(Task.objects.filter(id=self.kept_task.id).exists())
+
+    @override_settings(PROJECT_SOFT_DELETE=True)
+    def test_soft_delete_hides_at_once_and_queues_the_purge(self):
+        self.add_tasks(3)
+        task = Task.objects.filter(project=self.project).first()
+        self.client.post(reverse('main_app:delete_project', args=[self.project.id]))
+        self.assertEqual(Task.objects.filter(project_id=self.project.id).count(), 3)
+        self.assertNotContains(self.client.get(reverse('main_app:projects_index')), 'Castle')
+        self.assertEqual(self.client.get(reverse('main_app:task_detail', args=[self.project.id, task.id])).status_code, 404)
+        job = jobs.run_next()
+        self.assertEqual((job.kind, job.status, job.result['tasks']), ('purge_project', Job.DONE, 3))
+        self.assertFalse(Task.objects.filter(project_id=self.project.id).exists())
+        self.assertEqual(purge.purge_deleted(), {})
+
+
+class JobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.project = Project.objects.create(name='Castle', description='Keep', user=self.user)
+        self.tasks = [Task.objects.create(title=f'Task {i}', project=self.project) for i in range(3)]
+        self.client.force_login(self.user)
+        self.calls = []
+
+    def flaky(self, job, fail_times):
+        self.calls.append(job.attempts)
+        job.report_progress(len(self.calls), 10)
+        if len(self.calls) <= fail_times:
+            raise RuntimeError('flaky')
+        return {'calls': len(self.calls)}
+
+    def test_retries_with_backoff_then_succeeds_or_fails(self):
+        with mock.patch.dict(jobs.HANDLERS, {'flaky': self.flaky}):
+            job = jobs.enqueue('flaky', max_attempts=2, fail_times=1)
+            self.assertEqual(jobs.run_next().status, Job.QUEUED)
+            self.assertIsNone(jobs.run_next())
+            Job.objects.filter(id=job.id).update(run_after=timezone.now())
+            self.assertEqual(jobs.run_next().status, Job.DONE)
+            job.refresh_from_db()
+            self.assertEqual((job.attempts, job.result, job.progress_done), (2, {'calls': 2}, 2))
+            failing = jobs.enqueue('flaky', max_attempts=1, fail_times=5)
+            self.assertEqual(jobs.run_next().status, Job.FAILED)
+            failing.refresh_from_db()
+            self.assertIn('RuntimeError: flaky', failing.error)
+
+    def test_a_claimed_job_is_not_claimed_twice(self):
+        job = jobs.enqueue('rebuild_project_stats', project_ids=[self.project.id])
+        self.assertEqual(jobs.claim('first').id, job.id)
+        self.assertIsNone(jobs.claim('second'))
+        Job.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(jobs.claim('second').locked_by, 'second')
+
+    def test_bulk_edit_in_the_background_is_pollable(self):
+        response = self.client.post(reverse('main_app:bulk_tasks', args=[self.project.id]), {
+            'task_ids': [task.id for task in self.tasks], 'status': 'done', 'background': 'on',
+        })
+        self.assertEqual(response.status_code, 202)
+        status_url = response['Location']
+        self.assertEqual(self.client.get(status_url).json()['status'], 'queued')
+        self.assertEqual(Task.objects.filter(status='done').count(), 0)
+        jobs.run_next()
+        self.assertEqual(self.client.get(status_url).json()['status'], 'done')
+        self.assertEqual(Task.objects.filter(status='done').count(), 3)
+        self.client.force_login(User.objects.create_user(username='rival', password='secret-pass-123'))
+        self.assertEqual(self.client.get(status_url).status_code, 404)
+
+    def test_background_export_and_import(self):
+        with self.settings(MEDIA_ROOT=self.enterContext(TemporaryDirectory())):
+            response = self.client.get(
+                reverse('main_app:export_project_tasks', args=[self.project.id]), {'background': '1'}
+            )
+            job = jobs.run_next()
+            self.assertEqual(job.result['rows'], 3)
+            download = self.client.get(reverse('main_app:job_download', args=[job.id]))
+            self.assertIn(b'Task 2', b''.join(download.streaming_content))
+            upload = SimpleUploadedFile('tasks.csv', b'title,status\nSiege,todo\n', 'text/csv')
+            response = self.client.post(
+                reverse('main_app:import_tasks', args=[self.project.id]), {'file': upload, 'background': '1'}
+            )
+            self.assertEqual(response.json()['max_attempts'], 1)
+            self.assertEqual(jobs.run_next().result['created'], 1)
+            self.assertTrue(Task.objects.filter(title='Siege').exists())
+
+
+class BulkTaskTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.project = Project.objects.create(name='Castle', description='Keep', user=self.user)
+        self.tasks = [Task.objects.create(title=f'Task {i}', project=self.project) for i in range(3)]
+        self.bug, self.idea = Tag.objects.create(name='bug'), Tag.objects.create(name='idea')
+        self.tasks[0].tags.add(self.idea)
+        self.client.force_login(self.user)
+        self.url = reverse('main_app:bulk_tasks', args=[self.project.id])
+
+    def test_bulk_update_fields_and_tags(self):
+        response = self.client.post(self.url, {
+            'task_ids': [t.id for t in self.tasks],
+            'status': 'done',
+            'priority': 'urgent',
+            'add_tags': [self.bug.id],
+            'remove_tags': [self.idea.id],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 3)
+        self.assertIn('update', response.json()['timings'])
+        for task in Task.objects.filter(project=self.project):
+            self.assertEqual((task.status, task.priority_rank), ('done', Task.PRIORITY_RANKS['urgent']))
+            self.assertEqual([t.name for t in task.tags.all()], ['bug'])
+        self.assertEqual(ProjectStats.objects.get(project=self.project).done_count, 3)
+
+    def test_rejects_tasks_from_other_users(self):
+        other = User.objects.create_user(username='stranger', password='secret-pass-123')
+        foreign = Task.objects.create(
+            title='Foreign',
+            project=Project.objects.create(name='Elsewhere', description='Keep', user=other)
+        )
+        response = self.client.post(self.url, {'task_ids': [self.tasks[0].id, foreign.id], 'status': 'done'})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'error': 'Task not found'})
+        self.assertEqual(Task.objects.get(id=foreign.id).status, 'todo')
+
+    def test_moves_counters_from_each_tasks_old_values(self):
+        today = timezone.localdate()
+        Task.objects.filter(id=self.tasks[0].id).update(status='done', status_rank=Task.STATUS_RANKS['done'])
+        Task.objects.filter(id=self.tasks[1].id).update(due_date=today + timedelta(days=1))
+        Task.objects.filter(id=self.tasks[2].id).update(due_date=today - timedelta(days=1))
+        Task.objects.filter(id=self.tasks[2].id).update(priority='high', priority_rank=Task.PRIORITY_RANKS['high'])
+        ProjectStats.rebuild([self.project.id])
+        with mock.patch.object(ProjectStats, 'rebuild') as rebuild:
+            response = self.client.post(self.url, {
+                'task_ids': [self.tasks[1].id, self.tasks[2].id], 'status': 'in_progress', 'priority': 'low',
+            })
+        self.assertEqual(response.status_code, 200)
+        rebuild.assert_not_called()
+        stats = ProjectStats.objects.get(project=self.project)
+        self.assertEqual((stats.in_progress_count, stats.low_priority_count, stats.overdue_count), (2, 2, 1))
+        self.assertEqual(list(ProjectStats.find_drift()), [])
+
+        self.client.post(self.url, {'task_ids': [t.id for t in self.tasks], 'status': 'done'})
+        stats.refresh_from_db()
+        self.assertEqual((stats.done_count, stats.overdue_count, stats.next_due_date), (3, 0, None))
+        self.assertEqual(list(ProjectStats.find_drift()), [])
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.project = Project.objects.create(name='Castle', description='Keep', user=self.user)
+        self.task = Task.objects.create(title='Siege', project=self.project, assigned_to=self.user)
+        self.task.tags.add(Tag.objects.create(name='bug'), Tag.objects.create(name='idea'))
+        other = User.objects.create_user(username='stranger', password='secret-pass-123')
+        Task.objects.create(
+            title='Foreign', project=Project.objects.create(name='Elsewhere', description='Keep', user=other)
+        )
+        self.client.force_login(self.user)
+
+    def test_jsonl_export_streams_only_own_tasks(self):
+        response = self.client.get(reverse('main_app:export_tasks'), {'format': 'jsonl'})
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['tags'], ['bug', 'idea'])
+        self.assertEqual(rows[0]['assigned_to'], 'eyler')
+
+    def test_csv_export_of_project(self):
+        response = self.client.get(reverse('main_app:export_project_tasks', args=[self.project.id]))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'project_id', 'project'])
+        self.assertIn('bug|idea', lines[1])
+
+    async def test_export_streams_asynchronously_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('main_app:export_project_tasks', args=[self.project.id]))
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('bug|idea', lines[1])
+
+    def test_export_streams_synchronously_under_wsgi(self):
+        response = self.client.get(reverse('main_app:export_tasks'), {'format': 'jsonl'})
+        self.assertFalse(response.is_async)
+
+    def test_tags_are_prefetched_per_chunk(self):
+        for i in range(9):
+            Task.objects.create(title=f'Task {i}', project=self.project).tags.add(self.task.tags.first())
+        # One streamed task query plus one tag query per chunk of five.
+        with self.assertNumQueries(3):
+            list(exports.export_rows(exports.user_tasks(self.user), chunk_size=5))
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.project = Project.objects.create(name='Castle', description='Keep', user=self.user)
+        Tag.objects.create(name='bug')
+        self.client.force_login(self.user)
+
+    def test_csv_import_creates_tasks_and_tags(self):
+        data = (
+            'title,status,priority,due_date,assigned_to,tags\n'
+            'Siege,done,urgent,2025-03-01,eyler,bug|idea\n'
+            'Moat,,,,,idea\n'
+            ',todo,low,,,\n'
+            'Ghost,bogus,low,,,\n'
+        )
+        report = imports.TaskImporter(self.project, batch_size=1).run(
+            imports.read_rows(io.StringIO(data), 'csv')
+        )
+        self.assertEqual((report['created'], report['error_count']), (2, 2))
+        siege = Task.objects.get(title='Siege')
+        self.assertEqual((siege.status, siege.priority_rank, siege.assigned_to), ('done', 4, self.user))
+        self.assertEqual(sorted(t.name for t in siege.tags.all()), ['bug', 'idea'])
+        self.assertEqual(Task.objects.get(title='Moat').status, 'todo')
+        self.assertEqual(Tag.objects.filter(name='idea').count(), 1)
+        self.assertEqual(ProjectStats.objects.get(project=self.project).task_count, 2)
+
+    def test_unreadable_jsonl_lines_are_reported_as_row_errors(self):
+        data = '{"title": "Siege"}\n{"title": \n1\n{"title": "Moat"}\n'
+        report = imports.TaskImporter(self.project, batch_size=1).run(
+            imports.read_rows(io.StringIO(data), 'jsonl')
+        )
+        self.assertEqual((report['created'], report['error_count']), (2, 2))
+        self.assertEqual([error['line'] for error in report['errors']], [2, 3])
+        self.assertEqual(ProjectStats.objects.get(project=self.project).task_count, 2)
+
+    def test_stats_are_rebuilt_when_the_file_breaks_off(self):
+        def rows():
+            yield {'title': 'Siege'}
+            raise csv.Error('line contains NUL')
+
+        with self.assertRaises(csv.Error):
+            imports.TaskImporter(self.project, batch_size=1).run(rows())
+        self.assertEqual(ProjectStats.objects.get(project=self.project).task_count, 1)
+
+    def test_upload_endpoint_accepts_jsonl(self):
+        upload = SimpleUploadedFile(
+            'tasks.jsonl', b'{"title": "Siege", "tags": ["bug"]}\n{"title": "Moat"}\n'
+        )
+        response = self.client.post(
+            reverse('main_app:import_tasks', args=[self.project.id]), {'file': upload}
+        )
+        self.assertEqual(response.json()['created'], 2)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.project = Project.objects.create(name='Castle walls', description='Keep', user=self.user)
+        self.siege = Task.objects.create(title='Plan the siege', description='Ladders', project=self.project)
+        Task.objects.create(title='Dig moat', description='Mention siege once', project=self.project)
+        other = User.objects.create_user(username='stranger', password='secret-pass-123')
+        Task.objects.create(
+            title='Foreign siege',
+            project=Project.objects.create(name='Elsewhere', description='Keep', user=other)
+        )
+        self.client.force_login(self.user)
+
+    def test_ranked_results_are_scoped_to_user(self):
+        tasks, has_next = search.search(Task, 'sieg', self.user)
+        self.assertEqual([t.title for t in tasks], ['Plan the siege', 'Dig moat'])
+        self.assertFalse(has_next)
+
+    def test_index_follows_edits_and_deletes(self):
+        self.siege.title = 'Plan the assault'
+        self.siege.description = ''
+        self.siege.save()
+        self.assertEqual([t.title for t in search.search(Task, 'assault', self.user)[0]], ['Plan the assault'])
+        self.siege.delete()
+        self.assertEqual(search.search(Task, 'assault', self.user)[0], [])
+
+    def test_admin_search_spans_every_owner(self):
+        found = Task.objects.filter(id__in=search.matching_ids('task', 'siege'))
+        self.assertEqual(sorted(t.title for t in found), ['Dig moat', 'Foreign siege', 'Plan the siege'])
+
+    def test_ranking_is_bounded_to_the_newest_candidates(self):
+        newest = Task.objects.create(title='Siege engines', project=self.project)
+        with mock.patch.object(search, 'SEARCH_CANDIDATES', 2):
+            ids = search.ranked_ids('task', 'siege', self.user, limit=10)
+        # Only the two newest matches are ranked, the title match first.
+        self.assertEqual(ids, [newest.id, Task.objects.get(title='Dig moat').id])
+
+    def test_fixtures_are_indexed_by_the_rebuild_command(self):
+        data = serializers.serialize('json', [self.siege])
+        search.unindex('task', [self.siege.id])
+        for obj in serializers.deserialize('json', data):
+            obj.save()
+        self.assertEqual(search.search(Task, 'ladders', self.user)[0], [])
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertEqual([t.title for t in search.search(Task, 'ladders', self.user)[0]], ['Plan the siege'])
+
+    def test_search_view_finds_projects_and_tasks(self):
+        response = self.client.get(reverse('main_app:search'), {'q': 'castle"*'})
+        self.assertEqual([p.name for p in response.context['projects']], ['Castle walls'])
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.other = User.objects.create_user(username='rival', password='secret-pass-123')
+        self.project = Project.objects.create(name='Castle', description='Keep', user=self.user)
+        self.task = Task.objects.create(title='Siege', project=self.project, assigned_to=self.user)
+        self.task.tags.add(Tag.objects.create(name='bug'))
+
+    async def test_read_views_render_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        urls = [
+            reverse('main_app:projects_index'),
+            reverse('main_app:projects_detail', args=[self.project.id]),
+            reverse('main_app:tasks_index', args=[self.project.id]) + f'?assigned_to={self.user.id}',
+            reverse('main_app:task_detail', args=[self.project.id, self.task.id]),
+            reverse('main_app:tags_index'),
+        ]
+        for url in urls:
+            response = await self.async_client.get(url)
+            self.assertContains(response, 'eyler')
+
+    async def test_login_and_ownership_checks(self):
+        url = reverse('main_app:projects_detail', args=[self.project.id])
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/accounts/login/', response['Location'])
+        await self.async_client.aforce_login(self.other)
+        self.assertEqual((await self.async_client.get(url)).status_code, 404)
+        task_url = reverse('main_app:task_detail', args=[self.project.id, self.task.id])
+        self.assertEqual((await self.async_client.get(task_url)).status_code, 404)
+
+
+class LiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.project = Project.objects.create(name='Castle', user=self.user)
+        self.other = Project.objects.create(name='Tower', user=self.user)
+        patcher = mock.patch.object(live, 'current', live.LocalBroker())
+        self.broker = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def kinds(self, events):
+        return [event.kind for event in events]
+
+    def test_signals_publish_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(title='Siege', project=self.project)
+            task.tags.add(Tag.objects.create(name='bug', color='#123456'))
+        with self.captureOnCommitCallbacks(execute=True):
+            task.delete()
+        events = [event for _, event in self.broker.history]
+        self.assertEqual(self.kinds(events), ['task.created', 'tag.changed', 'task.tags', 'task.deleted'])
+        self.assertEqual(events[2].data['tags'], [{'id': events[1].data['id'], 'name': 'bug', 'color': '#123456'}])
+        self.assertEqual([event.project_id for event in events], [self.project.id, None, self.project.id, self.project.id])
+
+    async def test_resume_replays_the_projects_missed_events(self):
+        broker = live.LocalBroker(backlog=3)
+        start = broker.last_id()
+        broker.publish('task.created', self.project.id)
+        broker.publish('task.created', self.other.id)
+        broker.publish('tag.changed')
+        subscription, replay = broker.subscribe(self.project.id, start)
+        self.assertEqual(self.kinds(replay), ['task.created', 'tag.changed'])
+        broker.publish('task.deleted', self.project.id)
+        self.assertEqual((await subscription.get()).kind, 'task.deleted')
+        # Fell out of the backlog, or from another process: start over.
+        self.assertEqual(self.kinds(broker.subscribe(self.project.id, start)[1]), ['reset'])
+        self.assertEqual(self.kinds(broker.subscribe(self.project.id, '1-1')[1]), ['reset'])
+
+    async def test_stream_view_sends_missed_events(self):
+        await self.async_client.aforce_login(self.user)
+        url = reverse('main_app:project_events', args=[self.project.id])
+        start = self.broker.last_id()
+        event = self.broker.publish('task.deleted', self.project.id, {'id': 7})
+        response = await self.async_client.get(url, headers={'last-event-id': start})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), f'retry: {live.RETRY_MS}\n\n'.encode())
+        self.assertEqual(await anext(chunks), f'id: {event.id}\nevent: task.deleted\ndata: {{"id": 7}}\n\n'.encode())
+        await self.async_client.aforce_login(await User.objects.acreate_user(username='rival'))
+        self.assertEqual((await self.async_client.get(url)).status_code, 404)
+
+    async def test_stale_page_position_starts_from_now(self):
+        # A board served again with a 304 after the broker restarted must not
+        # be told to reload, or the reload gets the same page and loops.
+        await self.async_client.aforce_login(self.user)
+        url = reverse('main_app:project_events', args=[self.project.id])
+        response = await self.async_client.get(url, {'since': '1-1'})
+        chunks = aiter(response.streaming_content)
+        await anext(chunks)
+        self.broker.publish('task.deleted', self.project.id, {'id': 7})
+        self.assertIn(b'event: task.deleted', await anext(chunks))
+        response = await self.async_client.get(url, headers={'last-event-id': '1-1'})
+        chunks = aiter(response.streaming_content)
+        await anext(chunks)
+        self.assertIn(b'event: reset', await anext(chunks))
+
+    def test_no_stream_under_wsgi(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('main_app:project_events', args=[self.project.id]))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(self.broker.subscribers)
+        page = self.client.get(reverse('main_app:tasks_index', args=[self.project.id]))
+        self.assertNotContains(page, 'data-live-url')
+
+
+@override_settings(REQUEST_METRICS=True)
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        instrumentation.reset()
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123', is_staff=True)
+        self.project = Project.objects.create(name='Castle', description='Keep', user=self.user)
+        self.client.force_login(self.user)
+
+    def test_records_per_view_metrics(self):
+        response = self.client.get(reverse('main_app:tasks_index', args=[self.project.id]))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        report = self.client.get(reverse('main_app:perf_stats')).json()['views']
+        tasks_index = report['main_app:tasks_index']
+        self.assertEqual(tasks_index['count'], 1)
+        self.assertGreater(tasks_index['queries']['p50'], 0)
+        self.assertGreater(tasks_index['template_ms']['p50'], 0)
+
+    def test_flags_repeated_queries(self):
+        metrics = instrumentation.RequestMetrics()
+        token = instrumentation.current.set(metrics)
+        try:
+            for _ in range(3):
+                Project.objects.get(id=self.project.id)
+        finally:
+            instrumentation.current.reset(token)
+        self.assertEqual(list(metrics.duplicates().values()), [3])
+        self.assertEqual(instrumentation.record('test', metrics, 0.01)[4], 2)
+
+    def test_stats_are_staff_only(self):
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('main_app:perf_stats')).status_code, 302)
+
+    @override_settings(REQUEST_METRICS=False)
+    def test_disabled_middleware_is_skipped(self):
+        response = self.client.get(reverse('main_app:projects_index'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(instrumentation.report(), {})
+
+
+class BenchmarkTests(TestCase):
+    def test_seed_and_suite_cover_every_url(self):
+        counts = benchmark.seed(users=2, projects_per_user=2, tasks_per_project=10, tags=5)
+        self.assertEqual(counts, {'users': 2, 'projects': 4, 'tasks': 40, 'tags': 5})
+        self.assertEqual(list(ProjectStats.find_drift()), [])
+        results = benchmark.run(self.client, User.objects.get(username='bench-0'), iterations=1)
+        self.assertEqual(set(results), {f'main_app:{pattern.name}' for pattern in urls.urlpatterns})
+        for name, result in results.items():
+            self.assertTrue(all(status < 500 for status in result['status']), name)
+        self.assertEqual(benchmark.compare(results, results), [])
+
+    def test_compare_flags_extra_queries_and_slowdowns(self):
+        baseline = {'main_app:home': {'status': [200], 'queries': 2, 'p50_ms': 10.0, 'p95_ms': 12.0}}
+        current = {'main_app:home': {'status': [200], 'queries': 3, 'p50_ms': 40.0, 'p95_ms': 50.0}}
+        self.assertEqual(len(benchmark.compare(current, baseline)), 2)
+
+
+class QueryPlanCheckTests(TestCase):
+    def test_index_scans_count_as_full_scans(self):
+        command = check_query_plans.Command()
+        self.assertTrue(command.is_sqlite_scan('SCAN main_app_task'))
+        self.assertTrue(command.is_sqlite_scan('SCAN main_app_task USING COVERING INDEX task_project_status_idx'))
+        self.assertFalse(command.is_sqlite_scan('SEARCH main_app_task USING INDEX task_project_priority_idx (project_id=?)'))
+        self.assertFalse(command.is_sqlite_scan('SCAN main_app_tag USING INDEX sqlite_autoindex_main_app_tag_1'))
+
+    def test_views_make_no_full_scans(self):
+        call_command('check_query_plans', projects=2, tasks=20, tags=5, stdout=io.StringIO(), stderr=io.StringIO())
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.other = User.objects.create_user(username='rival', password='secret-pass-123')
+        self.project = Project.objects.create(name='Castle', description='Keep', user=self.user)
+        self.tag = Tag.objects.create(name='bug')
+        self.tasks = [Task.objects.create(title=f'Task {i}', project=self.project) for i in range(5)]
+        self.tasks[0].tags.add(self.tag)
+        self.client.force_login(self.user)
+        self.tasks_url = reverse('main_app:api_tasks', args=[self.project.id])
+
+    def test_sparse_fields_and_cursor_pages(self):
+        seen = []
+        url = self.tasks_url + '?fields=title,tags&limit=2'
+        while url:
+            page = self.client.get(url).json()
+            seen += page['results']
+            url = page['next']
+        self.assertEqual(sorted(task['title'] for task in seen), [f'Task {i}' for i in range(5)])
+        self.assertEqual(set(seen[0]), {'title', 'tags'})
+        self.assertEqual(self.client.get(self.tasks_url + '?fields=owner').status_code, 400)
+
+    def test_ownership_rules(self):
+        task_url = reverse('main_app:api_task', args=[self.project.id, self.tasks[0].id])
+        self.client.logout()
+        self.assertEqual(self.client.get(task_url).status_code, 401)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(task_url).status_code, 404)
+        self.assertEqual(self.client.get(self.tasks_url).status_code, 404)
+        self.assertEqual(self.client.get(reverse('main_app:api_projects')).json()['results'], [])
+
+    def test_etag_revalidation(self):
+        task_url = reverse('main_app:api_task', args=[self.project.id, self.tasks[0].id])
+        for url in [task_url, self.tasks_url]:
+            response = self.client.get(url)
+            self.assertEqual(response['Cache-Control'], 'private, no-cache')
+            self.assertIn('Cookie', response['Vary'])
+            etag = response['ETag']
+            with self.assertNumQueries(3):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.tag.name = f'defect-{url}'
+            self.tag.save()
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_task_list_validates_without_reading_tasks(self):
+        response = self.client.get(self.tasks_url)
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.tasks_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertFalse(any('main_app_task' in query['sql'] for query in queries.captured_queries))
+        for change in [
+            lambda: Task.objects.get(id=self.tasks[1].id).save(),
+            lambda: self.tasks[2].tags.add(self.tag),
+            lambda: self.client.post(reverse('main_app:bulk_tasks', args=[self.project.id]), {
+                'task_ids': [self.tasks[3].id], 'assigned_to': self.user.id,
+            }),
+        ]:
+            change()
+            response = self.client.get(self.tasks_url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            etag = response['ETag']
+
+    def test_tag_changes_move_task_updated_at(self):
+        task = self.tasks[1]
+        before = Task.objects.get(id=task.id).updated_at
+        task.tags.add(self.tag)
+        self.assertGreater(Task.objects.get(id=task.id).updated_at, before)
+        before = Task.objects.get(id=task.id).updated_at
+        self.tag.delete()
+        self.assertGreater(Task.objects.get(id=task.id).updated_at, before)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='eyler', password='secret-pass-123')
+        self.project = Project.objects.create(name='Castle', description='Keep', user=self.user)
+        self.task = Task.objects.create(title='Siege', project=self.project)
+        self.tag = Tag.objects.create(name='bug')
+        self.task.tags.add(self.tag)
+        self.client.force_login(self.user)
+        self.urls = [
+            reverse('main_app:projects_detail', args=[self.project.id]),
+            reverse('main_app:tasks_index', args=[self.project.id]),
+            reverse('main_app:task_detail', args=[self.project.id, self.task.id]),
+        ]
+
+    def etags(self):
+        etags = {}
+        for url in self.urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Cache-Control'], 'private, no-cache')
+            self.assertIn('Cookie', response['Vary'])
+            etags[url] = response['ETag']
+        return etags
+
+    def assert_status(self, etags, status):
+        for url, etag in etags.items():
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status, url)
+
+    def test_unchanged_pages_are_not_modified(self):
+        etags = self.etags()
+        self.assert_status(etags, 304)
+
+    def test_task_edits_and_tag_changes_invalidate(self):
+        etags = self.etags()
+        self.task.title = 'Storm'
+        self.task.save()
+        self.assert_status(etags, 200)
+        etags = self.etags()
+        self.tag.name = 'defect'
+        self.tag.save()
+        self.assert_status(etags, 200)
+
+    def test_other_users_still_get_404(self):
+        etags = self.etags()
+        self.client.force_login(User.objects.create_user(username='rival', password='secret-pass-123'))
+        self.assert_status(etags, 404)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'main_app'
 
@@ -14,16 +14,56 @@ urlpatterns = [
     path('projects/<int:project_id>/edit/', views.edit_project, name='edit_project'),
     path('projects/<int:project_id>/delete/', views.delete_project, name='delete_project'),
     
+    # Members
+    path('projects/<int:project_id>/members/', views.project_members, name='project_members'),
+    path('projects/<int:project_id>/members/autocomplete/', views.members_autocomplete, name='members_autocomplete'),
+    path('projects/<int:project_id>/members/<int:user_id>/remove/', views.remove_member, name='remove_member'),
+    
+    # Jobs
+    path('jobs/<int:job_id>/', views.job_status, name='job_status'),
+    path('jobs/<int:job_id>/download/', views.job_download, name='job_download'),
+    
     # Tag
     path('tags/', views.tags_index, name='tags_index'),
+    path('tags/autocomplete/', views.tags_autocomplete, name='tags_autocomplete'),
     path('tags/add/', views.add_tag, name='add_tag'),
     path('tags/<int:tag_id>/edit/', views.edit_tag, name='edit_tag'),
     path('tags/<int:tag_id>/delete/', views.delete_tag, name='delete_tag'),
     
+    # Inbox
+    path('inbox/', views.inbox_view, name='inbox'),
+    
     # Task
     path('projects/<int:project_id>/tasks/', views.tasks_index, name='tasks_index'),
+    path('projects/<int:project_id>/events/', views.project_events, name='project_events'),
     path('projects/<int:project_id>/tasks/<int:task_id>/', views.task_detail, name='task_detail'),
     path('projects/<int:project_id>/tasks/add/', views.add_task, name='add_task'),
+    path('projects/<int:project_id>/tasks/bulk/', views.bulk_tasks, name='bulk_tasks'),
+    path('projects/<int:project_id>/tasks/import/', views.import_tasks, name='import_tasks'),
     path('projects/<int:project_id>/tasks/<int:task_id>/edit/', views.edit_task, name='edit_task'),
     path('projects/<int:project_id>/tasks/<int:task_id>/delete/', views.delete_task, name='delete_task'),
+    
+    # Search
+    path('search/', views.search_view, name='search'),
+    
+    # Export
+    path('export/tasks/', views.export_tasks, name='export_tasks'),
+    path('projects/<int:project_id>/export/', views.export_tasks, name='export_project_tasks'),
+    
+    # Cache
+    path('cache/stats/', views.cache_stats, name='cache_stats'),
+    
+    # Performance
+    path('perf/stats/', views.perf_stats, name='perf_stats'),
+    
+    # API
+    path('api/projects/', api.project_list, name='api_projects'),
+    path('api/projects/<int:project_id>/', api.project_detail, name='api_project'),
+    path('api/projects/<int:project_id>/tasks/', api.task_list, name='api_tasks'),
+    path('api/projects/<int:project_id>/tasks/<int:task_id>/', api.task_detail, name='api_task'),
+    path('api/projects/<int:project_id>/cycle-time/', api.cycle_time, name='api_cycle_time'),
+    path('api/projects/<int:project_id>/throughput/', api.throughput, name='api_throughput'),
+    path('api/tags/', api.tag_list, name='api_tags'),
+    path('api/tags/<int:tag_id>/', api.tag_detail, name='api_tag'),
+    path('api/inbox/', api.inbox_list, name='api_inbox'),
 ]
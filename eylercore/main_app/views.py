@@ -1,9 +1,27 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import csv
+import io
+from django.conf import settings
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib.auth import login
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.decorators import login_required
-from .models import Project, Task, Tag
-from .forms import ProjectForm, TaskForm, TagForm
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse, JsonResponse, Http404, StreamingHttpResponse
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+from . import exports, fragment_cache, imports, inbox, instrumentation, jobs, live, purge, search, tag_catalogue
+from .bulk import bulk_update_tasks, owned_task_ids, timed
+from .conditional import page_etag, private_condition
+from .decorators import async_login_required
+from .models import Job, Project, ProjectMember, ProjectStats, Task, Tag
+from .forms import ProjectForm, TaskForm, TagForm, TaskFilterForm, BulkTaskForm, MemberForm
+from .pagination import apaginate_keyset, paginate_keyset
+
+TASKS_PAGE_SIZE = 50
 
 # Home
 def home(request):
@@ -24,16 +42,64 @@ def signup(request):
     context = {'form': form, 'error_message': error_message}
     return render(request, 'registration/signup.html', context)
 
+# Conditional GET
+# One query for what a page is built from, plus the project and tag versions
+# from the cache, so an unchanged page costs a 304 instead of a render.
+async def project_page_validators(request, project_id):
+    found = await Project.objects.filter(id=project_id, user=request.user).annotate(
+        task_count=Count('tasks'), tasks_updated=Max('tasks__updated_at')
+    ).values('updated_at', 'task_count', 'tasks_updated').afirst()
+    if found is None:
+        return None
+    project_version = (await fragment_cache.aversions('project', [project_id]))[project_id]
+    tags_version = (await fragment_cache.aversions('tags'))[None]
+    etag = page_etag(request, timezone.localdate(), project_version, tags_version, *found.values())
+    changed = [
+        found['updated_at'], found['tasks_updated'],
+        fragment_cache.version_time(project_version), fragment_cache.version_time(tags_version),
+    ]
+    return etag, max(value for value in changed if value)
+
+async def task_page_validators(request, project_id, task_id):
+    found = await Task.objects.owned_by(request.user).filter(id=task_id).values(
+        'updated_at', 'project__updated_at', 'assigned_to__username'
+    ).afirst()
+    if found is None:
+        return None
+    tags_version = (await fragment_cache.aversions('tags'))[None]
+    etag = page_etag(request, tags_version, *found.values())
+    return etag, max(found['updated_at'], found['project__updated_at'], fragment_cache.version_time(tags_version))
+
 # Projects
-@login_required
-def projects_index(request):
-    projects = Project.objects.filter(user=request.user)
+# The read-heavy views are async: every query goes through the async ORM and is
+# materialised before render(), since templates can't query from the event loop.
+@async_login_required
+async def projects_index(request):
+    projects = [
+        project async for project in
+        Project.objects.filter(user=request.user).select_related('stats').order_by('-created_at')
+    ]
+    await ProjectStats.aensure_fresh(projects)
     return render(request, 'main_app/projects_index.html', {'projects': projects})
 
-@login_required
-def projects_detail(request, project_id):
-    project = get_object_or_404(Project, id=project_id, user=request.user)
-    return render(request, 'main_app/projects_detail.html', {'project': project})
+@async_login_required
+@private_condition(project_page_validators)
+async def projects_detail(request, project_id):
+    project = await aget_object_or_404(
+        Project.objects.select_related('user', 'stats'), id=project_id, user=request.user
+    )
+    await ProjectStats.aensure_fresh([project])
+    await fragment_cache.aattach_project_version(project)
+    recent_tasks = [task async for task in Task.objects.filter(project=project).for_listing()[:5]]
+    fragments = await fragment_cache.aprefetch('project_summary', request.user.id, [project])
+    response = render(request, 'main_app/projects_detail.html', {
+        'project': project,
+        'project_tags': await tag_catalogue.aproject_tags(project),
+        'recent_tasks': recent_tasks,
+        'fragments': fragments
+    })
+    await fragments.asave()
+    return response
 
 @login_required
 def add_project(request):
@@ -50,7 +116,7 @@ def add_project(request):
 
 @login_required
 def edit_project(request, project_id):
-    project = get_object_or_404(Project, id=project_id, user=request.user)
+    project = get_object_or_404(Project.objects.select_related('user'), id=project_id, user=request.user)
     if request.method == 'POST':
         form = ProjectForm(request.POST, instance=project)
         if form.is_valid():
@@ -64,48 +130,137 @@ def edit_project(request, project_id):
 def delete_project(request, project_id):
     project = get_object_or_404(Project, id=project_id, user=request.user)
     if request.method == 'POST':
-        project.delete()
+        if settings.PROJECT_SOFT_DELETE:
+            purge.soft_delete(project, user=request.user)
+        else:
+            purge.purge_project(project.id)
         return redirect('main_app:projects_index')
     return render(request, 'main_app/delete_project.html', {'project': project})
 
-# Task
+# Members
+MEMBERS_PAGE_SIZE = 50
+MEMBER_AUTOCOMPLETE_LIMIT = 20
+
+@login_required
+def project_members(request, project_id):
+    project = get_object_or_404(Project, id=project_id, user=request.user)
+    if request.method == 'POST':
+        form = MemberForm(request.POST, project=project)
+        if form.is_valid():
+            ProjectMember.add(project.id, [form.user])
+            return redirect('main_app:project_members', project_id=project.id)
+    else:
+        form = MemberForm(project=project)
+    members, next_cursor = paginate_keyset(
+        project.memberships.select_related('user'), ProjectMember.LISTING_KEYS,
+        request.GET.get('cursor'), MEMBERS_PAGE_SIZE
+    )
+    return render(request, 'main_app/project_members.html', {
+        'project': project,
+        'members': members,
+        'form': form,
+        'next_cursor': next_cursor
+    })
+
 @login_required
-def tasks_index(request, project_id):
+@require_POST
+def remove_member(request, project_id, user_id):
     project = get_object_or_404(Project, id=project_id, user=request.user)
-    tasks = Task.objects.filter(project=project)
-    return render(request, 'tasks/index.html', {'tasks': tasks, 'project': project})
+    if user_id == project.user_id:
+        return JsonResponse({'error': 'The owner is always a member.'}, status=400)
+    get_object_or_404(ProjectMember, project=project, user_id=user_id).delete()
+    # Their tasks here go back to unassigned, with the same bookkeeping as a bulk edit.
+    task_ids = list(project.tasks.filter(assigned_to_id=user_id).values_list('id', flat=True))
+    if task_ids:
+        bulk_update_tasks(project.id, task_ids, unassign=True)
+    return redirect('main_app:project_members', project_id=project.id)
 
 @login_required
-def task_detail(request, project_id, task_id):
-    task = get_object_or_404(Task, id=task_id, project__user=request.user)
-    return render(request, 'tasks/detail.html', {
+def members_autocomplete(request, project_id):
+    get_object_or_404(Project, id=project_id, user=request.user)
+    try:
+        limit = min(max(int(request.GET.get('limit', MEMBER_AUTOCOMPLETE_LIMIT)), 1), 100)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a number'}, status=400)
+    members = ProjectMember.objects.filter(project_id=project_id).search(
+        request.GET.get('q', '').strip()
+    ).values_list('user_id', 'user__username')[:limit]
+    return JsonResponse({'results': [{'id': user_id, 'username': username} for user_id, username in members]})
+
+# Task
+@async_login_required
+@private_condition(project_page_validators)
+async def tasks_index(request, project_id):
+    project = await aget_object_or_404(Project, id=project_id, user=request.user)
+    # Taken before the tasks are read, so the board's stream resumes from here
+    # and can't miss a change made while the page was rendering.
+    live_since = live.broker().last_id() if live.can_stream(request) else None
+    assignees = [row async for row in TaskFilterForm.assignee_choices(project)]
+    filter_form = TaskFilterForm(request.GET, project=project, assignees=assignees)
+    tasks = filter_form.filter(Task.objects.filter(project=project).for_listing())
+    tasks, next_cursor = await apaginate_keyset(
+        tasks, Task.LISTING_KEYS, request.GET.get('cursor'), TASKS_PAGE_SIZE
+    )
+    await fragment_cache.aattach_task_versions(tasks)
+    fragments = await fragment_cache.aprefetch('task_card', request.user.id, tasks)
+    next_query = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_query = params.urlencode()
+    response = render(request, 'tasks/index.html', {
+        'tasks': tasks,
+        'project': project,
+        # Only tags in use here can narrow the list, so only those are offered.
+        'all_tags': await tag_catalogue.aproject_tags(project),
+        'filter_form': filter_form,
+        'next_query': next_query,
+        'live_since': live_since,
+        'fragments': fragments
+    })
+    await fragments.asave()
+    return response
+
+@async_login_required
+@private_condition(task_page_validators)
+async def task_detail(request, project_id, task_id):
+    task = await aget_object_or_404(
+        Task.objects.owned_by(request.user).for_listing().select_related('project'), id=task_id
+    )
+    await fragment_cache.aattach_task_versions([task])
+    fragments = await fragment_cache.aprefetch('task_detail', request.user.id, [task])
+    response = render(request, 'tasks/detail.html', {
         'task': task,
-        'project': task.project
+        'project': task.project,
+        'fragments': fragments
     })
+    await fragments.asave()
+    return response
 @login_required
 def add_task(request, project_id):
     project = get_object_or_404(Project, id=project_id, user=request.user)
     if request.method == 'POST':
-        form = TaskForm(request.POST)
+        form = TaskForm(request.POST, project=project)
         if form.is_valid():
             task = form.save(commit=False)
             task.project = project
             task.save()
+            form.save_m2m()
             return redirect('main_app:projects_detail', project_id=project.id)
     else:
-        form = TaskForm()
+        form = TaskForm(project=project)
     return render(request, 'tasks/form.html', {'form': form, 'project': project})
 
 @login_required
 def edit_task(request, project_id, task_id):
-    task = get_object_or_404(Task, id=task_id, project__user=request.user)
+    task = get_object_or_404(Task.objects.owned_by(request.user).select_related('project'), id=task_id)
     if request.method == 'POST':
-        form = TaskForm(request.POST, instance=task)
+        form = TaskForm(request.POST, instance=task, project=task.project)
         if form.is_valid():
             task = form.save()
             return redirect('main_app:task_detail', project_id=task.project.id, task_id=task.id)
     else:
-        form = TaskForm(instance=task)
+        form = TaskForm(instance=task, project=task.project)
     
     return render(request, 'tasks/form.html', {
         'form': form, 
@@ -116,19 +271,177 @@ def edit_task(request, project_id, task_id):
 
 @login_required
 def delete_task(request, project_id, task_id):
-    task = get_object_or_404(Task, id=task_id, project__user=request.user)
+    task = get_object_or_404(Task.objects.owned_by(request.user), id=task_id)
     if request.method == 'POST':
         project_id = task.project.id
         task.delete()
         return redirect('main_app:projects_detail', project_id=project_id)
-    return render(request, 'tasks/delete.html', {'task': task})
+    return render(request, 'tasks/delete.html', {'task': task, 'project': task.project})
 
-# Tag
 @login_required
-def tags_index(request):
-    tags = Tag.objects.all()
+@require_POST
+def bulk_tasks(request, project_id):
+    form = BulkTaskForm(request.POST, project_id=project_id)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    data = form.cleaned_data
+    timings = {}
+    with timed(timings, 'ownership'):
+        task_ids = owned_task_ids(request.user, project_id, data['task_ids'])
+    if len(task_ids) != len(data['task_ids']):
+        return JsonResponse({'error': 'Task not found'}, status=404)
+    if data['background']:
+        return job_accepted(jobs.enqueue(
+            'bulk_update_tasks', user=request.user, project_id=project_id, task_ids=task_ids,
+            status=data['status'], priority=data['priority'],
+            assigned_to=data['assigned_to'].id if data['assigned_to'] else None,
+            unassign=data['unassign'], add_tags=data['add_tags'], remove_tags=data['remove_tags'],
+        ))
+    timings.update(bulk_update_tasks(
+        project_id, task_ids,
+        status=data['status'],
+        priority=data['priority'],
+        assigned_to=data['assigned_to'],
+        unassign=data['unassign'],
+        add_tags=data['add_tags'],
+        remove_tags=data['remove_tags'],
+    ))
+    return JsonResponse({'updated': len(task_ids), 'timings': timings})
+
+# Live updates
+@async_login_required
+async def project_events(request, project_id):
+    """Server-sent events for a project's task board; needs the ASGI server to stream."""
+    if not await Project.objects.filter(id=project_id, user=request.user).aexists():
+        raise Http404
+    if not live.can_stream(request):
+        # EventSource gives up on a 204 instead of reconnecting.
+        return HttpResponse(status=204)
+    # EventSource sends Last-Event-ID itself on reconnect; the first
+    # connection passes the page's position in the query string.
+    last_event_id = request.headers.get('Last-Event-ID')
+    if last_event_id:
+        subscription, replay = live.broker().subscribe(project_id, last_event_id)
+    else:
+        subscription, replay = live.broker().subscribe(project_id, request.GET.get('since'), reset=False)
+    response = StreamingHttpResponse(live.stream(subscription, replay), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+# Inbox
+@async_login_required
+async def inbox_view(request):
+    today = timezone.localdate()
+    bucket_counts = await inbox.assigned(request.user).aaggregate(**inbox.counts(today))
+    tasks, next_cursor = await inbox.apaginate(inbox.listing(request.user), request.GET.get('cursor'))
+    return render(request, 'tasks/inbox.html', {
+        'sections': inbox.sections(tasks, bucket_counts, today),
+        'total': sum(bucket_counts.values()),
+        'next_cursor': next_cursor
+    })
+
+# Search
+@login_required
+def search_view(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    tasks, projects, has_next = [], [], False
+    if query:
+        tasks, more_tasks = search.search(Task, query, request.user, page)
+        projects, more_projects = search.search(Project, query, request.user, page)
+        has_next = more_tasks or more_projects
+    return render(request, 'main_app/search.html', {
+        'query': query,
+        'tasks': tasks,
+        'projects': projects,
+        'page': page,
+        'has_next': has_next
+    })
+
+# Export
+@login_required
+def export_tasks(request, project_id=None):
+    if project_id is not None:
+        get_object_or_404(Project, id=project_id, user=request.user)
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in exports.FORMATS:
+        return JsonResponse({'error': f'Unknown format {export_format!r}'}, status=400)
+    if request.GET.get('background'):
+        return job_accepted(jobs.enqueue(
+            'export_tasks', user=request.user, project_id=project_id, export_format=export_format
+        ))
+    tasks = exports.user_tasks(request.user, project_id)
+    if isinstance(request, ASGIRequest):
+        content = exports.arender(exports.aexport_rows(tasks), export_format)
+    else:
+        content = exports.render(exports.export_rows(tasks), export_format)
+    response = StreamingHttpResponse(content, content_type=exports.FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{exports.filename(project_id, export_format)}"'
+    return response
+
+# Import
+@login_required
+@require_POST
+def import_tasks(request, project_id):
+    project = get_object_or_404(Project, id=project_id, user=request.user)
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': 'Upload a CSV or JSON Lines file as "file".'}, status=400)
+    import_format = request.POST.get('format') or ('jsonl' if upload.name.endswith(('.jsonl', '.ndjson')) else 'csv')
+    if import_format not in exports.FORMATS:
+        return JsonResponse({'error': f'Unknown format {import_format!r}'}, status=400)
+    if request.POST.get('background'):
+        path = default_storage.save(f'jobs/import-{project.id}.{import_format}', upload)
+        return job_accepted(jobs.enqueue(
+            'import_tasks', user=request.user, max_attempts=1,
+            project_id=project.id, path=path, import_format=import_format,
+        ))
+    stream = io.TextIOWrapper(upload.file, encoding='utf-8', newline='')
+    try:
+        report = imports.TaskImporter(project).run(imports.read_rows(stream, import_format))
+    except (ValueError, csv.Error) as error:
+        return JsonResponse({'error': f'Could not read file: {error}'}, status=400)
+    return JsonResponse(report)
+
+# Jobs
+def job_accepted(job):
+    response = JsonResponse(job.as_dict(), status=202)
+    response['Location'] = reverse('main_app:job_status', args=[job.id])
+    return response
+
+@login_required
+def job_status(request, job_id):
+    job = get_object_or_404(Job, id=job_id, user=request.user)
+    return JsonResponse(job.as_dict())
+
+@login_required
+def job_download(request, job_id):
+    job = get_object_or_404(Job, id=job_id, user=request.user, kind='export_tasks', status=Job.DONE)
+    result = job.result
+    return FileResponse(
+        default_storage.open(result['file'], 'rb'), as_attachment=True,
+        filename=result['filename'], content_type=result['content_type'],
+    )
+
+# Tag
+@async_login_required
+async def tags_index(request):
+    tags = list(await tag_catalogue.aget())
     return render(request, 'tags/index.html', {'tags': tags})
 
+@login_required
+def tags_autocomplete(request):
+    try:
+        limit = min(max(int(request.GET.get('limit', tag_catalogue.AUTOCOMPLETE_LIMIT)), 1), 100)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a number'}, status=400)
+    tags = tag_catalogue.get().search(request.GET.get('q', '').strip(), limit)
+    return JsonResponse({'results': [tag._asdict() for tag in tags]})
+
 @login_required
 def add_tag(request):
     if request.method == 'POST':
@@ -158,4 +471,14 @@ def delete_tag(request, tag_id):
     if request.method == 'POST':
         tag.delete()
         return redirect('main_app:tags_index')
-    return render(request, 'tags/delete.html', {'tag': tag})
\ No newline at end of file
+    return render(request, 'tags/delete.html', {'tag': tag})
+
+# Cache
+@staff_member_required
+def cache_stats(request):
+    return JsonResponse({'fragments': fragment_cache.stats()})
+
+# Performance
+@staff_member_required
+def perf_stats(request):
+    return JsonResponse({'views': instrumentation.report()})